@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Minimal Prometheus metrics for the lookup API, rendered in the text exposition
+format (version 0.0.4) without a prometheus_client dependency.
+
+Usage:
+  from scripts.api_metrics import Registry
+  metrics = Registry()
+  hits = metrics.counter("noaa_api_cache_hits_total", "Cache hits", ("cache",))
+  hits.inc("nearest")
+  lat = metrics.histogram("noaa_api_request_duration_seconds", "Latency", ("route",))
+  lat.observe(0.004, "/lookup/{zipcode}")
+  metrics.callback("noaa_api_cache_entries", "gauge", "Entries", lambda: [({"cache": "nearest"}, 12)])
+  text = metrics.render()
+
+Notes:
+  - Single-process: each uvicorn worker exposes its own series (scrape per worker
+    or aggregate with sum() in PromQL)
+  - Label values are positional, in the order given by labelnames
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        for labels, v in sorted(self._values.items()):
+            out.append(f"{self.name}{_labels(self.labelnames, labels)} {_num(v)}")
+        return out
+
+
+class Histogram:
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        s = self._series.get(labels)
+        if s is None:
+            s = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        i = bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            s[i] += 1
+        s[-2] += value
+        s[-1] += 1
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        for labels, s in sorted(self._series.items()):
+            acc = 0
+            for b, c in zip(self.buckets, s):
+                acc += c
+                le = 'le="%s"' % _num(b)
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {acc}")
+            le = 'le="+Inf"'
+            out.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {s[-1]}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_num(s[-2])}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, labels)} {s[-1]}")
+        return out
+
+
+class Callback:
+    """Series computed at scrape time, e.g. cache statistics kept elsewhere."""
+
+    def __init__(self, name: str, kind: str, doc: str,
+                 fn: Callable[[], Iterable[Tuple[Dict[str, str], float]]]) -> None:
+        self.name = name
+        self.kind = kind
+        self.doc = doc
+        self.fn = fn
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        for labels, v in self.fn():
+            out.append(f"{self.name}{_labels(list(labels), list(labels.values()))} {_num(v)}")
+        return out
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[object] = []
+
+    def counter(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> Counter:
+        m = Counter(name, doc, labelnames)
+        self._metrics.append(m)
+        return m
+
+    def histogram(self, name: str, doc: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        m = Histogram(name, doc, labelnames, buckets)
+        self._metrics.append(m)
+        return m
+
+    def callback(self, name: str, kind: str, doc: str,
+                 fn: Callable[[], Iterable[Tuple[Dict[str, str], float]]]) -> Callback:
+        m = Callback(name, kind, doc, fn)
+        self._metrics.append(m)
+        return m
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics:
+            lines.extend(m.render())  # type: ignore[attr-defined]
+        return "\n".join(lines) + "\n"
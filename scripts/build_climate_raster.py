@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Interpolate station HDD65/CDD65 onto fixed lat/lon grids (CONUS, Alaska, Hawaii, Puerto Rico +
+USVI, Guam + CNMI, Wake Island, American Samoa) for the API's constant-time /grid lookups and
+for batch jobs.
+
+Input:  data/master_climate_index.min.jsonl (stations)
+Output: data/climate_raster.bin (mmap-able tiles, see scripts/climate_raster.py)
+
+Usage:
+  python scripts/build_climate_raster.py
+  python scripts/build_climate_raster.py --step 0.1 --neighbors 6 --max-km 100
+
+Notes:
+  - Each node is the inverse-distance-weighted (power 2) mean of its nearest stations with a
+    value, at most --max-km away; nodes with no station that close are NaN
+  - Nodes are processed in 1-degree blocks against the stations bucketed around the block,
+    so the build is plain NumPy and takes seconds at 0.05 degrees
+  - The header records the JSONL's dataset_version; the API ignores a raster built from a
+    different station file, so rerun this after build_min_master_index.py
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scripts.climate_raster import FIELDS, TILES, ClimateRaster, RasterTile, write_raster  # noqa: E402
+from scripts.station_index import EARTH_KM, dataset_version, iter_station_records  # noqa: E402
+
+STATIONS_PATH = Path("data/master_climate_index.min.jsonl")
+OUT_PATH = Path("data/climate_raster.bin")
+STEP = 0.05
+NEIGHBORS = 8
+MAX_KM = 150.0
+POWER = 2.0
+MIN_KM = 0.1  # closer than this a station counts as coincident (caps its weight)
+BLOCK_DEG = 1.0
+
+
+def _xyz(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    la, lo = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(la) * np.cos(lo), np.cos(la) * np.sin(lo), np.sin(la)], axis=-1)
+
+
+def _buckets(lat: np.ndarray, lon: np.ndarray) -> Dict[Tuple[int, int], np.ndarray]:
+    b: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for i, (la, lo) in enumerate(zip(lat, lon)):
+        b[(int(math.floor(la / BLOCK_DEG)), int(math.floor(lo / BLOCK_DEG)) % int(360 / BLOCK_DEG))].append(i)
+    return {k: np.asarray(v, dtype=np.intp) for k, v in b.items()}
+
+
+def interpolate_tile(name: str, lat0: float, lat1: float, lon0: float, lon1: float,
+                     st_lat: np.ndarray, st_lon: np.ndarray, st_vals: np.ndarray,
+                     step: float, neighbors: int, max_km: float) -> RasterTile:
+    """IDW of each field onto the tile's nodes; st_vals is (len(FIELDS), n) with NaN = missing."""
+    rows = int(round((lat1 - lat0) / step)) + 1
+    cols = int(round((lon1 - lon0) / step)) + 1
+    out = np.full((len(FIELDS), rows, cols), np.nan, dtype=np.float32)
+    st_xyz = _xyz(st_lat, st_lon)
+    buckets = _buckets(st_lat, st_lon)
+    pad_lat = max_km / (EARTH_KM * math.pi / 180.0)
+    max_chord2 = (2.0 * math.sin(max_km / (2.0 * EARTH_KM))) ** 2
+    per_block = max(1, int(round(BLOCK_DEG / step)))
+    n_lon_buckets = int(360 / BLOCK_DEG)
+    for r0 in range(0, rows, per_block):
+        r1 = min(rows, r0 + per_block)
+        la_lo, la_hi = lat0 + r0 * step, lat0 + (r1 - 1) * step
+        coslat = max(math.cos(math.radians(min(89.0, max(abs(la_lo), abs(la_hi)) + pad_lat))), 1e-3)
+        pad_lon = pad_lat / coslat
+        for c0 in range(0, cols, per_block):
+            c1 = min(cols, c0 + per_block)
+            lo_lo, lo_hi = lon0 + c0 * step, lon0 + (c1 - 1) * step
+            cand = [buckets[(bi, bj % n_lon_buckets)]
+                    for bi in range(int(math.floor((la_lo - pad_lat) / BLOCK_DEG)),
+                                    int(math.floor((la_hi + pad_lat) / BLOCK_DEG)) + 1)
+                    for bj in range(int(math.floor((lo_lo - pad_lon) / BLOCK_DEG)),
+                                    int(math.floor((lo_hi + pad_lon) / BLOCK_DEG)) + 1)
+                    if (bi, bj % n_lon_buckets) in buckets]
+            if not cand:
+                continue
+            idx = np.unique(np.concatenate(cand))
+            glat, glon = np.meshgrid(lat0 + np.arange(r0, r1) * step, lon0 + np.arange(c0, c1) * step,
+                                     indexing="ij")
+            d2 = ((_xyz(glat.ravel(), glon.ravel())[:, None, :] - st_xyz[idx][None, :, :]) ** 2).sum(axis=2)
+            for f in range(len(FIELDS)):
+                vals = st_vals[f, idx]
+                ok = np.isfinite(vals)
+                if not ok.any():
+                    continue
+                fd2, fv = d2[:, ok], vals[ok]
+                k = min(neighbors, fv.shape[0])
+                near = np.argpartition(fd2, k - 1, axis=1)[:, :k] if k < fv.shape[0] else \
+                    np.broadcast_to(np.arange(k), (fd2.shape[0], k))
+                nd2 = np.take_along_axis(fd2, near, axis=1)
+                km = 2.0 * EARTH_KM * np.arcsin(np.minimum(1.0, np.sqrt(nd2) / 2.0))
+                w = np.where(nd2 <= max_chord2, 1.0 / np.maximum(km, MIN_KM) ** POWER, 0.0)
+                den = w.sum(axis=1)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    v = np.where(den > 0, (w * fv[near]).sum(axis=1) / den, np.nan)
+                out[f, r0:r1, c0:c1] = v.reshape(r1 - r0, c1 - c0)
+    return RasterTile(name, lat0, lon0, step, out)
+
+
+def main(argv: List[str]) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--stations", default=str(STATIONS_PATH))
+    ap.add_argument("--out", default=str(OUT_PATH))
+    ap.add_argument("--step", type=float, default=STEP, help="grid spacing in degrees")
+    ap.add_argument("--neighbors", type=int, default=NEIGHBORS, help="stations blended per node")
+    ap.add_argument("--max-km", type=float, default=MAX_KM, help="ignore stations farther than this")
+    args = ap.parse_args(argv)
+
+    path = Path(args.stations)
+    if not path.exists():
+        raise SystemExit(f"Input not found: {path}")
+    start = time.time()
+    stations = list(iter_station_records(path))
+    if not stations:
+        raise SystemExit(f"No stations in {path}")
+    st_lat = np.array([r["lat"] for r in stations], dtype=np.float64)
+    st_lon = np.array([r["lon"] for r in stations], dtype=np.float64)
+    st_vals = np.array([[np.nan if r[f] is None else r[f] for r in stations] for f in FIELDS], dtype=np.float64)
+    print(f"[load] {len(stations):,} stations from {path} in {time.time() - start:.2f}s")
+
+    tiles = []
+    for name, lat0, lat1, lon0, lon1 in TILES:
+        t0 = time.time()
+        tile = interpolate_tile(name, lat0, lat1, lon0, lon1, st_lat, st_lon, st_vals,
+                                args.step, args.neighbors, args.max_km)
+        covered = float(np.isfinite(tile.values[0]).mean())
+        print(f"[tile] {name}: {tile.rows:,} x {tile.cols:,} nodes, {covered:.0%} covered, "
+              f"{time.time() - t0:.2f}s")
+        tiles.append(tile)
+
+    out = Path(args.out)
+    out.parent.mkdir(exist_ok=True)
+    raster = ClimateRaster(tiles, dataset_version(path),
+                           {"neighbors": args.neighbors, "max_km": args.max_km, "power": POWER})
+    size = write_raster(raster, out)
+    print(json.dumps({
+        "tiles": len(tiles),
+        "nodes": sum(t.rows * t.cols for t in tiles),
+        "step": args.step,
+        "elapsed_sec": round(time.time() - start, 2),
+        "output_bytes": size,
+        "output_path": str(out),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
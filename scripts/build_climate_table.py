@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Build the ZIP -> county / design-temperature join table behind the API's /climate/{zip}
+endpoint, so the calculator no longer needs Zippopotam + the FCC block API + the county
+files to place a ZIP.
+
+Input:  Census 2020 ZCTA -> county relationship file (pipe separated: GEOID_ZCTA5_20,
+        GEOID_COUNTY_20, NAMELSAD_COUNTY_20, AREALAND_PART ...), a local .txt/.zip or
+        downloaded from census.gov
+        ashrae_county_data.js (ASHRAE_COUNTY_DATA: county FIPS -> design temps)
+        resnet_ashrae_data.js (RESNET_ASHRAE_DATA: ZIP -> design temps)
+Output: data/climate_table.json
+        {"counties": {"41051": ["Multnomah County", "OR"], ...},
+         "zip_county": {"97219": "41051", ...},
+         "county_design": {"41051": {"name", "state", "heating", "cooling", "source", "lat", "lon"}},
+         "zip_design": {"97201": {"name", "heating", "cooling", "source", "lat", "lon"}}}
+
+Usage (download the relationship file):
+  python scripts/build_climate_table.py
+
+Usage (local file, extra county design data layered on top):
+  python scripts/build_climate_table.py --relationship tab20_zcta520_county20_natl.txt \
+      --county-design ashrae_county_data.js --county-design ashrae_county_data_expanded.js
+
+Notes:
+  - A ZCTA that straddles counties is assigned to the county holding most of its land area
+  - Design files are the same JS object literals the calculator loads; later
+    --county-design files override earlier ones FIPS by FIPS
+  - Only the design fields are kept: HDD/CDD come from the station index at request time
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scripts.build_zip_centroids import read_gazetteer_text  # noqa: E402
+from scripts.station_index import to_float  # noqa: E402
+
+RELATIONSHIP_URL = (
+    "https://www2.census.gov/geo/docs/maps-data/data/rel2020/zcta520/"
+    "tab20_zcta520_county20_natl.txt"
+)
+COUNTY_DESIGN_PATHS = ["ashrae_county_data.js"]
+ZIP_DESIGN_PATH = "resnet_ashrae_data.js"
+OUT_PATH = Path("data/climate_table.json")
+DESIGN_FIELDS = ("name", "state", "heating", "cooling", "source", "lat", "lon")
+
+STATE_ABBR = {
+    "01": "AL", "02": "AK", "04": "AZ", "05": "AR", "06": "CA", "08": "CO", "09": "CT", "10": "DE",
+    "11": "DC", "12": "FL", "13": "GA", "15": "HI", "16": "ID", "17": "IL", "18": "IN", "19": "IA",
+    "20": "KS", "21": "KY", "22": "LA", "23": "ME", "24": "MD", "25": "MA", "26": "MI", "27": "MN",
+    "28": "MS", "29": "MO", "30": "MT", "31": "NE", "32": "NV", "33": "NH", "34": "NJ", "35": "NM",
+    "36": "NY", "37": "NC", "38": "ND", "39": "OH", "40": "OK", "41": "OR", "42": "PA", "44": "RI",
+    "45": "SC", "46": "SD", "47": "TN", "48": "TX", "49": "UT", "50": "VT", "51": "VA", "53": "WA",
+    "54": "WV", "55": "WI", "56": "WY", "60": "AS", "66": "GU", "69": "MP", "72": "PR", "78": "VI",
+}
+
+_IDENT_RE = re.compile(r"[A-Za-z_$][\w$]*")
+
+
+def parse_js_object(text: str, name: str) -> Dict[str, Any]:
+    """Parse `const NAME = { ... };` from a data-only JS file (quoted strings, bare keys,
+    comments, trailing commas) by rewriting it to JSON."""
+    m = re.search(r"\b" + re.escape(name) + r"\s*=\s*\{", text)
+    if not m:
+        raise RuntimeError(f"{name} object not found")
+    i, n, depth = m.end() - 1, len(text), 0
+    out: List[str] = []
+    while i < n:
+        c = text[i]
+        if c in "'\"":
+            j, buf = i + 1, []
+            while text[j] != c:
+                if text[j] == "\\":
+                    j += 1
+                buf.append(text[j])
+                j += 1
+            out.append(json.dumps("".join(buf), ensure_ascii=False))
+            i = j + 1
+            continue
+        if text.startswith("//", i):
+            i = text.find("\n", i) if "\n" in text[i:] else n
+            continue
+        if text.startswith("/*", i):
+            i = text.index("*/", i) + 2
+            continue
+        ident = _IDENT_RE.match(text, i) if (c.isalpha() or c in "_$") else None
+        if ident:
+            word = ident.group(0)
+            is_key = text[ident.end():].lstrip().startswith(":")
+            out.append(json.dumps(word) if is_key else word)
+            i = ident.end()
+            continue
+        out.append(c)
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                break
+        i += 1
+    return json.loads(re.sub(r",(\s*[}\]])", r"\1", "".join(out)))
+
+
+def design_entry(rec: Dict[str, Any]) -> Dict[str, Any]:
+    out = {k: rec.get(k) for k in DESIGN_FIELDS if rec.get(k) is not None}
+    for k in ("heating", "cooling", "lat", "lon"):
+        if k in out and not isinstance(out[k], (int, float)):
+            out[k] = to_float(out[k])
+    return out
+
+
+def parse_relationship(text: str) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+    """-> (ZIP -> county FIPS by largest land overlap, FIPS -> [county name, state])."""
+    rows = csv.reader(io.StringIO(text), delimiter="|")
+    header = [h.strip().lower() for h in next(rows, [])]
+
+    def col(*names: str) -> int:
+        for n in names:
+            if n in header:
+                return header.index(n)
+        raise RuntimeError(f"Missing column {names[0]!r} in header {header}")
+
+    iz = col("geoid_zcta5_20", "zcta5", "zcta")
+    ic = col("geoid_county_20", "county", "geoid")
+    iname = col("namelsad_county_20", "county_name")
+    iland = col("arealand_part", "arealand")
+    best: Dict[str, Tuple[float, str]] = {}
+    counties: Dict[str, List[str]] = {}
+    for row in rows:
+        if len(row) <= max(iz, ic, iname, iland):
+            continue
+        z, fips = row[iz].strip(), row[ic].strip().zfill(5)
+        if len(fips) == 5 and fips.isdigit() and fips not in counties:
+            counties[fips] = [row[iname].strip(), STATE_ABBR.get(fips[:2], "")]
+        if len(z) != 5 or not z.isdigit():
+            continue  # counties with no ZCTA have an empty ZCTA column
+        land = to_float(row[iland]) or 0.0
+        if z not in best or land > best[z][0]:
+            best[z] = (land, fips)
+    return {z: fips for z, (_land, fips) in best.items()}, counties
+
+
+def main(argv: List[str]) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--relationship", default=RELATIONSHIP_URL,
+                    help="Census ZCTA -> county relationship .txt/.zip path or URL")
+    ap.add_argument("--county-design", action="append", default=None,
+                    help=f"JS file defining ASHRAE_COUNTY_DATA (repeatable; default {COUNTY_DESIGN_PATHS[0]})")
+    ap.add_argument("--zip-design", default=ZIP_DESIGN_PATH, help="JS file defining RESNET_ASHRAE_DATA")
+    ap.add_argument("--out", default=str(OUT_PATH))
+    args = ap.parse_args(argv)
+
+    zip_county, counties = parse_relationship(read_gazetteer_text(args.relationship))
+    print(f"[relationship] {len(zip_county):,} ZCTAs in {len(counties):,} counties")
+
+    county_design: Dict[str, Dict[str, Any]] = {}
+    for path in args.county_design or COUNTY_DESIGN_PATHS:
+        obj = parse_js_object(Path(path).read_text(encoding="utf-8", errors="replace"), "ASHRAE_COUNTY_DATA")
+        for key, rec in obj.items():
+            fips = str(rec.get("fips") or key).zfill(5)
+            entry = design_entry(rec)
+            if entry.get("heating") is not None and entry.get("cooling") is not None:
+                county_design[fips] = entry
+        print(f"[county-design] {path}: {len(obj):,} counties")
+
+    zip_design: Dict[str, Dict[str, Any]] = {}
+    if args.zip_design:
+        obj = parse_js_object(Path(args.zip_design).read_text(encoding="utf-8", errors="replace"),
+                              "RESNET_ASHRAE_DATA")
+        for z, rec in obj.items():
+            entry = design_entry(rec)
+            if entry.get("heating") is not None and entry.get("cooling") is not None:
+                zip_design[str(z).zfill(5)] = entry
+        print(f"[zip-design] {args.zip_design}: {len(zip_design):,} ZIPs")
+
+    missing = sorted(f for f in county_design if f not in counties)
+    if missing and counties:
+        print(f"[warn] design counties not in the relationship file: {', '.join(missing)}")
+
+    out = Path(args.out)
+    out.parent.mkdir(exist_ok=True)
+    table = {
+        "counties": dict(sorted(counties.items())),
+        "zip_county": dict(sorted(zip_county.items())),
+        "county_design": dict(sorted(county_design.items())),
+        "zip_design": dict(sorted(zip_design.items())),
+    }
+    out.write_text(json.dumps(table, ensure_ascii=False, separators=(",", ":")) + "\n", encoding="utf-8")
+    print(json.dumps({
+        "zips": len(zip_county),
+        "counties": len(counties),
+        "county_design": len(county_design),
+        "zip_design": len(zip_design),
+        "output_bytes": out.stat().st_size,
+        "output_path": str(out),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -5,38 +5,34 @@ the fields used by the UI for fast client-side loading.
 
 Input:  data/master_climate_index.jsonl (large, full records)
 Output: data/master_climate_index.min.jsonl (small, station/name/lat/lon/hdd65/cdd65)
+        data/master_climate_index.min.bin   (mmap-able binary snapshot of the same stations
+                                             plus KD-tree layout, opened by the lookup API)
 
 Usage:
   python scripts/build_min_master_index.py
 
 Notes:
-  - Streams line-by-line; memory usage stays low
+  - Streams the input line-by-line, but every kept (minimal) record is held in memory to
+    build the snapshot and its KD-tree, so memory grows with the station count
   - Skips malformed lines and records missing coordinates
   - Prints progress every N lines and a final size summary
+  - The snapshot header records the JSONL's dataset_version so derived tables can be matched
 """
 from __future__ import annotations
 
 import json
+import sys
 import time
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scripts.station_index import (StationKDTree, StationStore, dataset_version, station_record,  # noqa: E402
+                                   write_snapshot)
 
 IN_PATH = Path("data/master_climate_index.jsonl")
 OUT_PATH = Path("data/master_climate_index.min.jsonl")
-
-
-def to_float(value: Any):
-    try:
-        if value is None:
-            return None
-        if isinstance(value, str):
-            v = value.strip()
-            if v == "" or v.upper() in {"NA", "N/A", "-9999", "-9999.0"}:
-                return None
-            return float(v)
-        return float(value)
-    except Exception:
-        return None
+SNAPSHOT_PATH = Path("data/master_climate_index.min.bin")
 
 
 def main() -> None:
@@ -47,6 +43,7 @@ def main() -> None:
 
     total_in = 0
     total_out = 0
+    kept: List[Dict[str, Any]] = []
     start = time.time()
     last_report = start
     report_every = 100000  # lines
@@ -63,20 +60,11 @@ def main() -> None:
             except Exception:
                 continue
 
-            lat = to_float(obj.get("lat"))
-            lon = to_float(obj.get("lon"))
-            if lat is None or lon is None:
+            rec = station_record(obj)
+            if rec is None:
                 continue
-
-            rec = {
-                "station": obj.get("station"),
-                "name": obj.get("name"),
-                "lat": lat,
-                "lon": lon,
-                "hdd65": to_float(obj.get("hdd65")),
-                "cdd65": to_float(obj.get("cdd65")),
-            }
             fout.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            kept.append(rec)
             total_out += 1
 
             if total_in % report_every == 0:
@@ -85,6 +73,10 @@ def main() -> None:
                     print(f"[progress] lines_in={total_in:,} lines_out={total_out:,} elapsed={now-start:.1f}s")
                     last_report = now
 
+    store = StationStore.from_records(kept)
+    snapshot_size = write_snapshot(store, StationKDTree(store.coords()), SNAPSHOT_PATH,
+                                   dataset_version(OUT_PATH))
+
     elapsed = time.time() - start
     out_size = OUT_PATH.stat().st_size if OUT_PATH.exists() else 0
     print(json.dumps({
@@ -92,7 +84,9 @@ def main() -> None:
         "lines_out": total_out,
         "elapsed_sec": round(elapsed, 2),
         "output_bytes": out_size,
-        "output_path": str(OUT_PATH)
+        "output_path": str(OUT_PATH),
+        "snapshot_bytes": snapshot_size,
+        "snapshot_path": str(SNAPSHOT_PATH)
     }, indent=2))
 
 
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Build the national ZIP -> lat/lon centroid table used by the lookup API's
+offline geocoder.
+
+Input:  Census Gazetteer ZCTA file (2020+ layout, tab separated: GEOID ... INTPTLAT INTPTLONG),
+        either a local .txt/.zip or downloaded from census.gov
+        data/zip_centroids_min.json (hand-curated overrides, merged on top)
+Output: data/zip_centroids.json  ({"97219": [45.458, -122.7], ...}, sorted by ZIP)
+
+Usage (download the current Gazetteer):
+  python scripts/build_zip_centroids.py
+
+Usage (local file):
+  python scripts/build_zip_centroids.py --gazetteer 2023_Gaz_zcta_national.zip
+
+Notes:
+  - ZCTAs cover ~33.8k of the ~41k USPS ZIPs; PO-box and unique ZIPs that have no
+    ZCTA can be added with --extra (CSV with zip,lat,lon columns)
+  - Coordinates are rounded to 4 decimals (~11 m), far below the centroid error itself
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import sys
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+from urllib.request import urlopen
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scripts.station_index import to_float  # noqa: E402
+
+GAZETTEER_URL = (
+    "https://www2.census.gov/geo/docs/maps-data/data/gazetteer/"
+    "2023_Gazetteer/2023_Gaz_zcta_national.zip"
+)
+OVERRIDES_PATH = Path("data/zip_centroids_min.json")
+OUT_PATH = Path("data/zip_centroids.json")
+
+
+def read_gazetteer_text(src: str) -> str:
+    if src.startswith("http://") or src.startswith("https://"):
+        print(f"[download] {src}")
+        with urlopen(src) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"HTTP {resp.status} for {src}")
+            raw = resp.read()
+    else:
+        raw = Path(src).read_bytes()
+    if raw[:2] == b"PK":
+        with zipfile.ZipFile(io.BytesIO(raw)) as zf:
+            names = [n for n in zf.namelist() if n.lower().endswith(".txt")]
+            if not names:
+                raise RuntimeError(f"No .txt member in {src}")
+            raw = zf.read(names[0])
+    return raw.decode("utf-8", errors="replace")
+
+
+def parse_rows(rows: Iterable[List[str]], zip_cols: Tuple[str, ...], lat_cols: Tuple[str, ...],
+               lon_cols: Tuple[str, ...]) -> Dict[str, Tuple[float, float]]:
+    it = iter(rows)
+    header = [h.strip().lower() for h in next(it, [])]
+
+    def col(names: Tuple[str, ...]) -> int:
+        for n in names:
+            if n in header:
+                return header.index(n)
+        raise RuntimeError(f"Missing column {names[0]!r} in header {header}")
+
+    iz, ila, ilo = col(zip_cols), col(lat_cols), col(lon_cols)
+    out: Dict[str, Tuple[float, float]] = {}
+    for row in it:
+        if len(row) <= max(iz, ila, ilo):
+            continue
+        z = row[iz].strip().zfill(5)
+        lat = to_float(row[ila])
+        lon = to_float(row[ilo])
+        if len(z) != 5 or not z.isdigit() or lat is None or lon is None:
+            continue
+        out[z] = (round(lat, 4), round(lon, 4))
+    return out
+
+
+def main(argv: List[str]) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--gazetteer", default=GAZETTEER_URL, help="Gazetteer ZCTA .txt/.zip path or URL")
+    ap.add_argument("--extra", action="append", default=[], help="CSV with zip,lat,lon columns (repeatable)")
+    ap.add_argument("--out", default=str(OUT_PATH))
+    args = ap.parse_args(argv)
+
+    text = read_gazetteer_text(args.gazetteer)
+    table = parse_rows(csv.reader(io.StringIO(text), delimiter="\t"),
+                       ("geoid", "zcta5", "zip"), ("intptlat",), ("intptlong", "intptlon"))
+    print(f"[gazetteer] {len(table):,} ZCTAs")
+
+    for path in args.extra:
+        with open(path, "r", encoding="utf-8", errors="replace", newline="") as fh:
+            extra = parse_rows(csv.reader(fh), ("zip", "zipcode", "zip_code"),
+                               ("lat", "latitude"), ("lon", "lng", "longitude"))
+        added = sum(1 for z in extra if z not in table)
+        for z, ll in extra.items():
+            table.setdefault(z, ll)
+        print(f"[extra] {path}: {len(extra):,} rows, {added:,} new ZIPs")
+
+    if OVERRIDES_PATH.exists():
+        overrides = json.loads(OVERRIDES_PATH.read_text(encoding="utf-8"))
+        for z, o in overrides.items():
+            lat, lon = to_float(o.get("lat")), to_float(o.get("lon"))
+            if lat is not None and lon is not None:
+                table[z] = (round(lat, 4), round(lon, 4))
+        print(f"[overrides] {len(overrides):,} from {OVERRIDES_PATH}")
+
+    out = Path(args.out)
+    out.parent.mkdir(exist_ok=True)
+    body = ",\n".join(f'"{z}":[{table[z][0]},{table[z][1]}]' for z in sorted(table))
+    out.write_text("{\n" + body + "\n}\n", encoding="utf-8")
+    print(json.dumps({
+        "zips": len(table),
+        "output_bytes": out.stat().st_size,
+        "output_path": str(out),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
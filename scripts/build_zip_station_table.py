@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Precompute the nearest station for every ZIP in the centroid table so the lookup
+API can answer /lookup/{zip} with a single keyed read.
+
+Input:  data/master_climate_index.min.jsonl (stations)
+        data/zip_centroids.json + data/zip_centroids_min.json (ZIP centroids)
+Output: data/zip_station_table.json
+
+Output layout (compact; rows sorted by ZIP):
+  {
+    "dataset_version": "<sha256[:16] of the stations file>",
+    "stations": [[station, name, hdd65, cdd65], ...],
+    "zips": {"97219": [lat, lon, station_row, dist_km], ...}
+  }
+
+Usage:
+  python scripts/build_zip_station_table.py
+
+Notes:
+  - The API ignores the table if dataset_version doesn't match the stations file it
+    loaded, so rerun this after build_min_master_index.py
+  - ~41k ZIPs x KD-tree query takes a second or two
+"""
+from __future__ import annotations
+
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scripts.station_index import StationKDTree, dataset_version, iter_station_records, load_zip_centroids  # noqa: E402
+
+STATIONS_PATH = Path("data/master_climate_index.min.jsonl")
+CENTROID_PATHS = [Path("data/zip_centroids.json"), Path("data/zip_centroids_min.json")]
+OUT_PATH = Path("data/zip_station_table.json")
+
+
+def main() -> None:
+    if not STATIONS_PATH.exists():
+        raise SystemExit(f"Input not found: {STATIONS_PATH}")
+    start = time.time()
+    stations = list(iter_station_records(STATIONS_PATH))
+    centroids = load_zip_centroids(CENTROID_PATHS)
+    if not stations or not centroids:
+        raise SystemExit(f"Nothing to do: {len(stations)} stations, {len(centroids)} ZIP centroids")
+    tree = StationKDTree([(r["lat"], r["lon"]) for r in stations])
+
+    zips = sorted(centroids)
+    hits = tree.nearest_many([centroids[z] for z in zips])
+    # Only keep stations that some ZIP actually resolves to
+    used: Dict[int, int] = {}
+    rows: Dict[str, List[Any]] = {}
+    for z, hit in zip(zips, hits):
+        if hit is None:
+            continue
+        pos, km = hit
+        row = used.setdefault(pos, len(used))
+        lat, lon = centroids[z]
+        rows[z] = [round(lat, 5), round(lon, 5), row, round(km, 1)]
+    station_rows = [None] * len(used)
+    for pos, row in used.items():
+        r = stations[pos]
+        station_rows[row] = [r["station"], r["name"], r["hdd65"], r["cdd65"]]
+
+    OUT_PATH.parent.mkdir(exist_ok=True)
+    with OUT_PATH.open("w", encoding="utf-8") as fout:
+        json.dump({
+            "dataset_version": dataset_version(STATIONS_PATH),
+            "stations": station_rows,
+            "zips": rows,
+        }, fout, ensure_ascii=False, separators=(",", ":"))
+
+    print(json.dumps({
+        "zips": len(rows),
+        "stations_used": len(station_rows),
+        "elapsed_sec": round(time.time() - start, 2),
+        "output_bytes": OUT_PATH.stat().st_size,
+        "output_path": str(OUT_PATH),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Gridded HDD65/CDD65: station values interpolated onto fixed lat/lon tiles, so any coordinate
+resolves by array indexing plus bilinear interpolation, whatever the station count.
+
+The raster file is written and mapped by station_index's write_sections/read_sections, the
+same container as the station snapshot: an 8-byte magic, a little-endian u32 header length, a
+JSON header (dataset_version, step, fields, interpolation settings, tile table, section table),
+then 64-byte aligned sections, one float32 (fields, rows, cols) array per tile. open_raster maps
+it read-only, so opening is O(1) and workers share the page cache.
+
+Usage:
+  from scripts.climate_raster import open_raster
+  raster = open_raster(Path("data/climate_raster.bin"))
+  raster.sample(45.45, -122.68)   # -> {"hdd65": ..., "cdd65": ...} or None outside coverage
+  hdd, cdd = raster.sample_many(lats, lons)   # NumPy arrays, NaN outside coverage
+
+Notes:
+  - Row 0 of a tile is its southern edge (lat0), column 0 its western edge (lon0); node (i, j)
+    sits at (lat0 + i * step, lon0 + j * step)
+  - Tile longitudes run eastward from lon0 and may pass 180 (Alaska's tile starts at 172E to
+    take in the western Aleutians); lookups wrap the query longitude into the tile
+  - Nodes too far from any station are NaN (ocean, empty tundra); bilinear interpolation
+    renormalizes over the finite corners and only gives up when all four are NaN
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from scripts.station_index import read_sections, write_sections
+
+RASTER_MAGIC = b"NOAAGRD\x01"
+RASTER_FORMAT = 2  # 1 kept section offsets in the tile table, before the shared container helpers
+FIELDS = ("hdd65", "cdd65")
+
+# (name, lat0, lat1, lon0, lon1) in degrees; lon1 may exceed 180 for tiles crossing the antimeridian
+TILES: Tuple[Tuple[str, float, float, float, float], ...] = (
+    ("conus", 24.0, 50.0, -125.0, -66.0),
+    ("alaska", 51.0, 72.0, 172.0, 230.0),
+    ("hawaii", 18.5, 22.5, -160.5, -154.5),
+    ("puerto_rico_vi", 17.5, 18.75, -67.5, -64.5),
+    ("guam_cnmi", 13.0, 21.0, 144.5, 146.5),
+    ("wake", 18.75, 19.75, 166.0, 167.25),
+    ("american_samoa", -14.75, -11.0, -171.25, -168.0),
+)
+
+
+@dataclass
+class RasterTile:
+    name: str
+    lat0: float
+    lon0: float
+    step: float
+    values: np.ndarray  # (len(FIELDS), rows, cols) float32, NaN = no data
+
+    @property
+    def rows(self) -> int:
+        return int(self.values.shape[1])
+
+    @property
+    def cols(self) -> int:
+        return int(self.values.shape[2])
+
+    def grid_coords(self, lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Fractional (row, col) of each point and whether it falls inside the tile."""
+        y = (lat - self.lat0) / self.step
+        x = np.mod(lon - self.lon0, 360.0) / self.step
+        inside = (y >= 0) & (y <= self.rows - 1) & (x >= 0) & (x <= self.cols - 1)
+        return y, x, inside
+
+    def bilinear(self, y: np.ndarray, x: np.ndarray) -> np.ndarray:
+        """(len(FIELDS), n) values at in-tile fractional positions; NaN corners are skipped."""
+        i = np.minimum(np.floor(y).astype(np.intp), self.rows - 2)
+        j = np.minimum(np.floor(x).astype(np.intp), self.cols - 2)
+        fy = (y - i)[None, :]
+        fx = (x - j)[None, :]
+        num = np.zeros((self.values.shape[0], y.shape[0]))
+        den = np.zeros_like(num)
+        for di, dj, w in ((0, 0, (1 - fy) * (1 - fx)), (0, 1, (1 - fy) * fx),
+                          (1, 0, fy * (1 - fx)), (1, 1, fy * fx)):
+            v = self.values[:, i + di, j + dj].astype(np.float64)
+            ok = np.isfinite(v)
+            num += np.where(ok, v * w, 0.0)
+            den += np.where(ok, w, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(den > 1e-12, num / den, np.nan)
+
+
+class ClimateRaster:
+    """Read-only set of tiles from one raster file (or freshly built)."""
+
+    def __init__(self, tiles: List[RasterTile], dataset_version: str, meta: Optional[Dict[str, Any]] = None) -> None:
+        self.tiles = tiles
+        self.dataset_version = dataset_version
+        self.meta = meta or {}
+
+    @property
+    def step(self) -> float:
+        return self.tiles[0].step if self.tiles else 0.0
+
+    def sample_many(self, lat: Any, lon: Any) -> Tuple[np.ndarray, ...]:
+        """One array per field (FIELDS order), NaN where a point is outside coverage."""
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        out = np.full((len(FIELDS), lat.shape[0]), np.nan)
+        todo = np.isfinite(lat) & np.isfinite(lon)
+        for tile in self.tiles:
+            if not todo.any():
+                break
+            y, x, inside = tile.grid_coords(lat, lon)
+            hit = todo & inside
+            if hit.any():
+                out[:, hit] = tile.bilinear(y[hit], x[hit])
+                todo &= ~hit  # tiles don't overlap; the first one containing a point owns it
+        return tuple(out)
+
+    def sample(self, lat: float, lon: float) -> Optional[Dict[str, Optional[float]]]:
+        """Scalar lookup (plain Python arithmetic, no array temporaries); None outside coverage."""
+        if lat != lat or lon != lon:
+            return None
+        for tile in self.tiles:
+            y = (lat - tile.lat0) / tile.step
+            x = ((lon - tile.lon0) % 360.0) / tile.step
+            if not (0.0 <= y <= tile.rows - 1 and 0.0 <= x <= tile.cols - 1):
+                continue
+            i = min(int(y), tile.rows - 2)
+            j = min(int(x), tile.cols - 2)
+            fy, fx = y - i, x - j
+            corners = ((i, j, (1 - fy) * (1 - fx)), (i, j + 1, (1 - fy) * fx),
+                       (i + 1, j, fy * (1 - fx)), (i + 1, j + 1, fy * fx))
+            out: Dict[str, Optional[float]] = {}
+            for f, name in enumerate(FIELDS):
+                plane = tile.values[f]
+                num = den = 0.0
+                for ci, cj, w in corners:
+                    v = float(plane[ci, cj])
+                    if v == v:
+                        num += v * w
+                        den += w
+                out[name] = round(num / den, 1) if den > 1e-12 else None
+            return None if all(v is None for v in out.values()) else out
+        return None
+
+
+def write_raster(raster: ClimateRaster, path: Path) -> int:
+    """Write tiles as a mappable raster file (one section per tile); returns bytes written."""
+    header = {
+        "format": RASTER_FORMAT,
+        "dataset_version": raster.dataset_version,
+        "step": raster.step,
+        "fields": list(FIELDS),
+        **raster.meta,
+        "tiles": [{"name": t.name, "lat0": t.lat0, "lon0": t.lon0} for t in raster.tiles],
+    }
+    sections = {t.name: np.ascontiguousarray(t.values, dtype="<f4") for t in raster.tiles}
+    return write_sections(path, RASTER_MAGIC, header, sections)
+
+
+def open_raster(path: Path) -> ClimateRaster:
+    """Map a raster written by write_raster."""
+    header, sections = read_sections(path, RASTER_MAGIC, "climate raster")
+    if header.get("format") != RASTER_FORMAT:
+        raise ValueError(f"Unsupported raster format {header.get('format')} in {path}; rebuild it")
+    if tuple(header.get("fields") or ()) != FIELDS:
+        raise ValueError(f"Unexpected raster fields {header.get('fields')} in {path}")
+    step = float(header["step"])
+    tiles = [RasterTile(rec["name"], float(rec["lat0"]), float(rec["lon0"]), step, sections[rec["name"]])
+             for rec in header["tiles"]]
+    meta = {k: v for k, v in header.items()
+            if k not in ("format", "dataset_version", "step", "fields", "tiles", "sections")}
+    return ClimateRaster(tiles, header["dataset_version"], meta)
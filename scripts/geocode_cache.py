@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Persistent ZIP -> lat/lon cache for upstream geocoder results, shared by every API worker on
+a host and kept across restarts.
+
+Storage: one SQLite file in WAL mode, table geocode(zip, lat, lon, expires_at). A row with
+NULL lat/lon is a negative entry (the geocoder does not know the ZIP).
+
+Usage:
+  from scripts.geocode_cache import GeocodeStore
+  store = GeocodeStore(Path("data/geocode_cache.sqlite3"))
+  store.put("97219", {"lat": 45.45, "lon": -122.7}, ttl=30 * 86400)
+  store.get("97219")   # -> ({"lat": 45.45, "lon": -122.7}, expires_at), or None if absent/expired
+
+Notes:
+  - WAL lets every worker read while one writes; writers wait up to busy_timeout for the lock
+  - Expired rows are ignored on read and deleted when a store is opened
+  - Any SQLite error is logged and treated as a miss: the cache must never fail a lookup
+  - One connection per process, serialised with a lock, so it is safe to call from worker threads
+    (the API does, since a write can wait up to busy_timeout)
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+BUSY_TIMEOUT_MS = 2000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocode (
+    zip TEXT PRIMARY KEY,
+    lat REAL,
+    lon REAL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+
+class GeocodeStore:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0  # expired rows purged
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT_MS / 1000.0,
+                                   isolation_level=None, check_same_thread=False)
+        self._db.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(_SCHEMA)
+        self.purge()
+
+    def __len__(self) -> int:
+        try:
+            with self._lock:
+                return self._db.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def get(self, zipcode: str) -> Optional[Tuple[Optional[Dict[str, float]], float]]:
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT lat, lon, expires_at FROM geocode WHERE zip = ? AND expires_at > ?",
+                    (zipcode, time.time()),
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"[geocode-cache] read failed: {e}")
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        lat, lon, expires_at = row
+        value = {"lat": lat, "lon": lon} if lat is not None and lon is not None else None
+        return value, expires_at
+
+    def put(self, zipcode: str, value: Optional[Dict[str, float]], ttl: float) -> None:
+        lat = value["lat"] if value else None
+        lon = value["lon"] if value else None
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO geocode (zip, lat, lon, expires_at) VALUES (?, ?, ?, ?)",
+                    (zipcode, lat, lon, time.time() + ttl),
+                )
+        except sqlite3.Error as e:
+            print(f"[geocode-cache] write failed: {e}")
+
+    def purge(self) -> int:
+        try:
+            with self._lock:
+                n = self._db.execute("DELETE FROM geocode WHERE expires_at <= ?", (time.time(),)).rowcount
+        except sqlite3.Error as e:
+            print(f"[geocode-cache] purge failed: {e}")
+            return 0
+        self.evictions += n
+        return n
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Vectorized port of the calculator's cost model (hvac_cost_comparison.html): annual heat pump,
+furnace and hybrid heating costs and their TCO, for whole arrays of locations x parameter sets.
+
+Mirrors the browser functions one to one:
+  calculateHeatPumpEfficiency      -> heat_pump_share
+  computeAutoCrossoverTemperature  -> auto_crossover_temperature
+  calculateHVACCosts (+ calculateSystemCosts) -> annual_costs
+  npvOfSeries                      -> npv_of_series
+  computeTCO                       -> compute_tco
+
+Usage (library; every argument broadcasts, so a (L, 1) location column against a (1, P)
+parameter row prices L x P scenarios in one pass):
+  from scripts.hvac_cost_engine import compare, grid
+  kw = grid({"hdd": [4500, 6800], "heating_design": [24, 5]},
+            {"electricity_rate": [0.12, 0.18, 0.24], "gas_rate": [1.64, 1.64, 1.2]})
+  out = compare(**kw)
+  out["hybrid"]["total"]   # (2, 3) annual $ (rounded like the page)
+
+Usage (CLI; locations CSV with id,hdd,heating columns, e.g. from POST /lookup/batch +
+/climate, crossed with every combination of the parameter lists):
+  python -m scripts.hvac_cost_engine --locations territory.csv \
+      --electricity-rate 0.12,0.15,0.18 --gas-rate 1.2,1.64 --cop 3.0,3.6 --out scenarios.csv
+
+Notes:
+  - Reproduces the JS including its quirks, so numbers match the page exactly: inputs read
+    with `parseFloat(x) || default` treat 0 and NaN as "use the default" (a 0 $/kWh rate
+    prices at 0.12), Math.round rounds halves up, a missing/non-positive HDD gives the hybrid
+    a 50% heat pump share, and years are truncated to whole years in the TCO
+  - One deliberate difference: the page's computeTCO prices carbon against annual emissions
+    hard-coded to 0, so its carbon price changes nothing. compare() prices the emissions the
+    page charts (annual_tons: grid kg/kWh, 5.3 kg/therm), as tco_monte_carlo does; at the
+    page's default carbon price of 0 the TCO is the page's
+  - Cooling loads are computed by the page but never priced (cooling cost is 0 for every
+    system), so cooling inputs are not taken here
+  - Parity with the browser code: python scripts/test_hvac_cost_engine.py (needs node). Annual
+    costs and energy are bit-identical; discounted values (NPV/TCO) can differ in the last bit
+    because V8's Math.pow is not the C library's pow
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import sys
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+
+SYSTEMS = ("heatPump", "furnace", "hybrid")
+BASE_TEMP = 65.0  # °F, HDD base and indoor design temperature
+BTU_PER_THERM = 100000.0
+BTU_PER_KWH = 3412.0
+HSPF_PER_COP = 3.4  # the page's HSPF <-> COP conversion
+MAX_TCO_YEARS = 30
+
+# Fallbacks the JS applies when an input is blank/0/NaN
+JS_ELECTRICITY_RATE = 0.12
+JS_GAS_RATE = 1.20
+JS_COP = 3.5
+JS_FURNACE_EFF = 95.0
+JS_CROSSOVER = 35.0
+JS_HEATING_LOAD = 50000.0
+JS_TCO_YEARS = 15.0
+PAGE_HEATING_DESIGN = 20.0  # °F the page assumes when it has no design temperature for a ZIP
+GRID_KG_PER_KWH = 0.9 * 0.453592  # kg CO2 per kWh, the page's default "balanced" electricity mix
+GAS_T_PER_THERM = 5.3 / 1000  # 5.3 kg CO2 per therm, as on the page
+
+# The page's initial input values (what a visitor sees before touching anything)
+PAGE_DEFAULTS: Dict[str, Any] = {
+    "electricity_rate": 0.18,
+    "gas_rate": 1.64,
+    "cop": 3.6,
+    "furnace_eff": 90.0,
+    "crossover": 35.0,
+    "auto_crossover": True,
+    "heating_load": 50000.0,
+    "years": 15.0,
+    "discount_pct": 3.0,
+    "install": {"heatPump": 9000.0, "furnace": 4500.0, "hybrid": 12000.0},
+    "maint": {"heatPump": 150.0, "furnace": 120.0, "hybrid": 220.0},
+    "rebate": {"heatPump": 2000.0, "furnace": 0.0, "hybrid": 2000.0},
+    "carbon_price": 0.0,
+}
+
+
+def _f(x: Any) -> np.ndarray:
+    return np.asarray(x, dtype=np.float64)
+
+
+def js_or(x: Any, default: float) -> np.ndarray:
+    """`x || default` for numbers: 0 and NaN fall back."""
+    x = _f(x)
+    return np.where(np.isnan(x) | (x == 0), default, x)
+
+
+def _js_min(a: Any, b: Any) -> np.ndarray:
+    return np.minimum(a, b)  # like Math.min, NaN in -> NaN out
+
+
+def _js_max(a: Any, b: Any) -> np.ndarray:
+    return np.maximum(a, b)
+
+
+def js_round(x: Any) -> np.ndarray:
+    """Math.round: halves round up (toward +inf), unlike np.round's half-to-even."""
+    x = _f(x)
+    r = np.floor(x)
+    with np.errstate(invalid="ignore"):
+        return np.where(x - r >= 0.5, r + 1.0, r)
+
+
+def heat_pump_share(heating_design: Any, crossover: Any, hdd: Any) -> np.ndarray:
+    """Share of the heating load the heat pump carries in hybrid mode; NaN where the JS
+    returns null (no HDD)."""
+    hd, xo, hdd = _f(heating_design), _f(crossover), _f(hdd)
+    total_range = BASE_TEMP - hd
+    hp_range = BASE_TEMP - xo
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = _js_min(1.0, hp_range / total_range)
+    share = np.where(total_range <= 0, 0.0, share)
+    share = np.where(xo <= hd, 1.0, share)
+    share = np.where(xo >= BASE_TEMP, 1.0, share)
+    return np.where(~(hdd > 0), np.nan, share)
+
+
+def auto_crossover_temperature(electricity_rate: Any, gas_rate: Any, furnace_eff: Any, cop: Any) -> np.ndarray:
+    """Economic break-even outdoor temperature (°F, 0..70) from prices, AFUE and a linear
+    COP curve (COP at 17°F = COP at 47°F - 1.5, floored at 1)."""
+    afue = _js_max(0.5, _js_min(1.0, js_or(furnace_eff, JS_FURNACE_EFF) / 100))
+    e = _js_max(0.01, js_or(electricity_rate, JS_ELECTRICITY_RATE))
+    g = _js_max(0.01, js_or(gas_rate, JS_GAS_RATE))
+    cop47 = _js_max(1.0, js_or(cop, JS_COP))
+    cop17 = _js_max(1.0, cop47 - 1.5)
+    slope = (cop17 - cop47) / (17 - 47)
+    cop_threshold = 29.3 * afue * (e / g)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = 47 + (cop_threshold - cop47) / slope
+    t = np.where(np.abs(slope) < 1e-6, 35.0, t)
+    return _js_max(0.0, _js_min(70.0, t))
+
+
+def annual_costs(hdd: Any, heating_design: Any, electricity_rate: Any = JS_ELECTRICITY_RATE,
+                 gas_rate: Any = JS_GAS_RATE, cop: Any = JS_COP, furnace_eff: Any = JS_FURNACE_EFF,
+                 crossover: Any = JS_CROSSOVER, auto_crossover: Any = False,
+                 heating_load: Any = JS_HEATING_LOAD) -> Dict[str, Any]:
+    """calculateHVACCosts: annual cost and energy per system.
+
+    Returns {"crossover": used crossover °F, "hp_share": hybrid heat pump share,
+    system: {"total": $/yr rounded, "kwh", "therms"}} with all arrays broadcast together.
+    """
+    hdd, hd = _f(hdd), _f(heating_design)
+    e = js_or(electricity_rate, JS_ELECTRICITY_RATE)
+    g = js_or(gas_rate, JS_GAS_RATE)
+    cop = js_or(cop, JS_COP)
+    fe = js_or(furnace_eff, JS_FURNACE_EFF)
+    xo = _f(crossover)
+    xo = np.where(np.isfinite(xo), xo, JS_CROSSOVER)
+    auto = np.asarray(auto_crossover, dtype=bool)
+    if auto.any():
+        auto_xo = _js_max(20.0, _js_min(50.0, js_round(auto_crossover_temperature(e, g, fe, cop))))
+        xo = np.where(auto, auto_xo, xo)
+
+    afue = fe / 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        heat_loss_rate = js_or(heating_load, JS_HEATING_LOAD) / (BASE_TEMP - hd)  # BTU/hr/°F
+        load = heat_loss_rate * hdd * 24  # BTU/yr
+
+        furnace_therms = load / (BTU_PER_THERM * afue)
+        furnace_cost = furnace_therms * g
+
+        hp_kwh = load / (cop * BTU_PER_KWH)
+        hp_cost = hp_kwh * e
+
+        share = heat_pump_share(hd, xo, hdd)
+        share = np.where(np.isfinite(share), share, 0.5)
+        share = _js_max(0.0, _js_min(1.0, share))
+        hyb_kwh = load * share / (cop * BTU_PER_KWH)
+        hyb_therms = load * (1 - share) / (BTU_PER_THERM * afue)
+        hyb_cost = (hyb_kwh * e) + (hyb_therms * g)
+
+    shape = np.broadcast_shapes(hyb_cost.shape, xo.shape)
+    zero = np.zeros(shape)
+    full = lambda a: np.broadcast_to(a, shape)  # noqa: E731
+    out: Dict[str, Any] = {"crossover": full(xo), "hp_share": full(share)}
+    for name, cost, kwh, therms in (("heatPump", hp_cost, hp_kwh, zero),
+                                     ("furnace", furnace_cost, zero, furnace_therms),
+                                     ("hybrid", hyb_cost, hyb_kwh, hyb_therms)):
+        out[name] = {"total": full(js_round(cost)), "kwh": full(kwh), "therms": full(therms)}
+    return out
+
+
+def npv_of_series(years: Any, rate_pct: Any, annual_series: Any) -> np.ndarray:
+    """npvOfSeries: present value of year-end cash flows; annual_series has the years on its
+    last axis. `years` may vary per scenario (flows past it are ignored)."""
+    series = _f(annual_series)
+    r = js_or(rate_pct, 0.0) / 100
+    years = _f(years)
+    npv = np.zeros(np.broadcast_shapes(series.shape[:-1], r.shape, years.shape))
+    for y in range(1, series.shape[-1] + 1):
+        cf = js_or(series[..., y - 1], 0.0)
+        npv = np.where(y <= years, npv + cf / np.power(1 + r, y), npv)
+    return npv
+
+
+def compute_tco(totals: Mapping[str, Any], years: Any = JS_TCO_YEARS, discount_pct: Any = 0.0,
+                install: Optional[Mapping[str, Any]] = None, maint: Optional[Mapping[str, Any]] = None,
+                rebate: Optional[Mapping[str, Any]] = None, carbon_price: Any = 0.0,
+                annual_tons: Optional[Mapping[str, Any]] = None) -> Dict[str, np.ndarray]:
+    """computeTCO: max(0, install - rebate) + NPV of (annual run cost + maintenance + carbon)."""
+    years = _js_max(1.0, _js_min(float(MAX_TCO_YEARS), js_or(years, JS_TCO_YEARS)))
+    n = int(np.nanmax(np.floor(years))) if years.size else 0
+    out: Dict[str, np.ndarray] = {}
+    for k in SYSTEMS:
+        carbon = js_or((annual_tons or {}).get(k, 0.0), 0.0) * js_or(carbon_price, 0.0)
+        annual = (_f(totals[k]) + _f((maint or {}).get(k, 0.0))) + carbon
+        upfront = _js_max(0.0, _f((install or {}).get(k, 0.0)) - _f((rebate or {}).get(k, 0.0)))
+        series = np.broadcast_to(annual[..., None], annual.shape + (n,))
+        out[k] = upfront + npv_of_series(years, discount_pct, series)
+    return out
+
+
+def annual_tons(costs: Mapping[str, Any], grid_kg_per_kwh: Any = GRID_KG_PER_KWH) -> Dict[str, np.ndarray]:
+    """Metric tons of CO2 per year per system from annual_costs' kWh and therms (the page's CO2 chart)."""
+    return {k: costs[k]["kwh"] * (_f(grid_kg_per_kwh) / 1000) + costs[k]["therms"] * GAS_T_PER_THERM
+            for k in SYSTEMS}
+
+
+def compare(hdd: Any, heating_design: Any, electricity_rate: Any = PAGE_DEFAULTS["electricity_rate"],
+            gas_rate: Any = PAGE_DEFAULTS["gas_rate"], cop: Any = PAGE_DEFAULTS["cop"],
+            furnace_eff: Any = PAGE_DEFAULTS["furnace_eff"], crossover: Any = PAGE_DEFAULTS["crossover"],
+            auto_crossover: Any = PAGE_DEFAULTS["auto_crossover"],
+            heating_load: Any = PAGE_DEFAULTS["heating_load"], years: Any = PAGE_DEFAULTS["years"],
+            discount_pct: Any = PAGE_DEFAULTS["discount_pct"],
+            install: Optional[Mapping[str, Any]] = None, maint: Optional[Mapping[str, Any]] = None,
+            rebate: Optional[Mapping[str, Any]] = None, carbon_price: Any = 0.0,
+            grid_kg_per_kwh: Any = GRID_KG_PER_KWH) -> Dict[str, Any]:
+    """Annual costs plus TCO per system, defaulting every input to the page's initial values."""
+    out = annual_costs(hdd, heating_design, electricity_rate, gas_rate, cop, furnace_eff,
+                       crossover, auto_crossover, heating_load)
+    tco = compute_tco({k: out[k]["total"] for k in SYSTEMS}, years, discount_pct,
+                      {**PAGE_DEFAULTS["install"], **(install or {})},
+                      {**PAGE_DEFAULTS["maint"], **(maint or {})},
+                      {**PAGE_DEFAULTS["rebate"], **(rebate or {})}, carbon_price,
+                      annual_tons(out, grid_kg_per_kwh))
+    for k in SYSTEMS:
+        out[k]["tco"] = np.broadcast_to(tco[k], out[k]["total"].shape)
+    return out
+
+
+def grid(locations: Mapping[str, Any], params: Mapping[str, Any]) -> Dict[str, Any]:
+    """Shape location arrays (length L) as columns and parameter arrays (length P) as rows,
+    so compare(**grid(...)) yields (L, P) results. Per-system dicts (install, maint, rebate)
+    are reshaped value by value."""
+    def shape(v: Any, axis: int) -> Any:
+        if isinstance(v, Mapping):
+            return {k: shape(x, axis) for k, x in v.items()}
+        a = np.asarray(v)
+        return a[:, None] if axis == 0 else a[None, :]
+    return {**{k: shape(v, 0) for k, v in locations.items()}, **{k: shape(v, 1) for k, v in params.items()}}
+
+
+def _floats(text: str) -> List[float]:
+    return [float(v) for v in text.split(",") if v.strip()]
+
+
+def main(argv: List[str]) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--locations", required=True, help="CSV with id (or zip), hdd, heating columns")
+    ap.add_argument("--out", default="-", help="output CSV (default stdout)")
+    d = PAGE_DEFAULTS
+    for name in ("electricity_rate", "gas_rate", "cop", "furnace_eff", "crossover", "heating_load",
+                 "years", "discount_pct"):
+        ap.add_argument("--" + name.replace("_", "-"), type=_floats, default=[d[name]],
+                        help=f"comma-separated values (default {d[name]})")
+    ap.add_argument("--hspf", type=_floats, default=None, help="heat pump HSPF instead of --cop (COP = HSPF / 3.4)")
+    ap.add_argument("--fixed-crossover", action="store_true", help="use --crossover instead of the auto break-even")
+    args = ap.parse_args(argv)
+
+    ids: List[str] = []
+    hdd: List[float] = []
+    heating: List[float] = []
+    with open(args.locations, "r", encoding="utf-8", newline="") as fh:
+        for row in csv.DictReader(fh):
+            row = {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
+            ids.append(row.get("id") or row.get("zip") or str(len(ids)))
+            hdd.append(float(row.get("hdd") or row.get("hdd65") or "nan"))
+            heating.append(float(row.get("heating") or row.get("heating_design") or "nan"))
+
+    cops = [h / HSPF_PER_COP for h in args.hspf] if args.hspf else args.cop
+    names = ("electricity_rate", "gas_rate", "cop", "furnace_eff", "crossover", "heating_load",
+             "years", "discount_pct")
+    combos = list(itertools.product(args.electricity_rate, args.gas_rate, cops, args.furnace_eff,
+                                    args.crossover, args.heating_load, args.years, args.discount_pct))
+    params = {n: np.array([c[i] for c in combos]) for i, n in enumerate(names)}
+    res = compare(**grid({"hdd": hdd, "heating_design": heating}, params),
+                  auto_crossover=not args.fixed_crossover)
+
+    fh = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8", newline="")
+    try:
+        w = csv.writer(fh)
+        w.writerow(["id", "hdd", "heating", *names, "crossover_used",
+                    *(f"{k}_{m}" for k in SYSTEMS for m in ("total", "tco", "kwh", "therms"))])
+        for i, j in itertools.product(range(len(ids)), range(len(combos))):
+            w.writerow([ids[i], hdd[i], heating[i], *combos[j], float(res["crossover"][i, j]),
+                        *(round(float(res[k][m][i, j]), 2) for k in SYSTEMS
+                          for m in ("total", "tco", "kwh", "therms"))])
+    finally:
+        if fh is not sys.stdout:
+            fh.close()
+    print(f"[compare] {len(ids):,} locations x {len(combos):,} parameter sets", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Load generator for the lookup API (scripts/noaa_api_service.py): drives /lookup/{zip} with a
+reproducible ZIP stream and reports throughput, latency percentiles and cache hit ratio.
+
+Targets:
+  inproc   (default) the ASGI app in this process via httpx.ASGITransport; upstream
+           geocoding goes to an in-memory stub (httpx.MockTransport)
+  uvicorn  starts `uvicorn scripts.noaa_api_service:app` on a free localhost port with
+           ZIP_GEOCODER_URL pointed at a stub HTTP geocoder run by this script
+  --url    an already running server (upstream geocoding is whatever that server uses)
+
+Distributions:
+  uniform  every 5-digit ZIP 00501-99950 equally likely (national spread)
+  zipf     Zipf(s) over a seeded hot set of --zipf-keys ZIPs (realistic repeat traffic)
+  misses   every request is a ZIP not requested before (cold cache, upstream-bound)
+
+Output: reports/load_test_<distribution>.md (latest run) and one JSON line appended to
+        reports/load_test_history.jsonl per run, for regression tracking
+
+Usage (from the repo root):
+  python -m scripts.load_test_api --distribution zipf --requests 20000 --concurrency 32
+  python -m scripts.load_test_api --target uvicorn --distribution uniform --max-p95-ms 100
+
+Notes:
+  - Same --seed, same request stream; the stub geocoder answers every ZIP with a fixed
+    coordinate derived from the ZIP, after --stub-latency-ms
+  - The on-disk geocode cache is disabled for the inproc/uvicorn targets (no stub data in it,
+    and every run starts from the same state)
+  - Latency is measured client side, per request; hit ratios come from /metrics deltas
+  - --max-p95-ms / --max-p99-ms exit 1 when exceeded, so a CI job can gate on the README's
+    "<100 ms after warm-up" claim
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+REPORT_DIR = Path("reports")
+HISTORY_PATH = REPORT_DIR / "load_test_history.jsonl"
+ZIP_RANGE = (501, 99950)
+READY_TIMEOUT_SECONDS = 120
+
+
+def stub_latlon(zipcode: str) -> Tuple[float, float]:
+    """Deterministic pseudo-location inside the CONUS box for any ZIP."""
+    z = int(zipcode)
+    return 25.0 + (z * 7919 % 2400) / 100.0, -124.0 + (z * 104729 % 5700) / 100.0
+
+
+def stub_body(zipcode: str) -> bytes:
+    lat, lon = stub_latlon(zipcode)
+    return json.dumps({
+        "post code": zipcode,
+        "country": "United States",
+        "places": [{"place name": "Stub", "latitude": str(lat), "longitude": str(lon)}],
+    }).encode("utf-8")
+
+
+def zip_stream(distribution: str, n: int, seed: int, zipf_keys: int, zipf_s: float) -> List[str]:
+    rng = random.Random(seed)
+    universe = [f"{z:05d}" for z in range(ZIP_RANGE[0], ZIP_RANGE[1] + 1)]
+    if distribution == "uniform":
+        return [rng.choice(universe) for _ in range(n)]
+    if distribution == "zipf":
+        hot = rng.sample(universe, min(zipf_keys, len(universe)))
+        cum = list(accumulate(1.0 / (rank ** zipf_s) for rank in range(1, len(hot) + 1)))
+        return rng.choices(hot, cum_weights=cum, k=n)
+    if distribution == "misses":
+        if n > len(universe):
+            raise SystemExit(f"misses: at most {len(universe):,} distinct ZIPs per run")
+        return rng.sample(universe, n)
+    raise SystemExit(f"unknown distribution {distribution!r}")
+
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        key, _, value = line.rpartition(" ")
+        try:
+            out[key] = float(value)
+        except ValueError:
+            continue
+    return out
+
+
+def hit_ratio(before: Dict[str, float], after: Dict[str, float], cache: str) -> Optional[float]:
+    hits_key = f'noaa_api_cache_hits_total{{cache="{cache}"}}'
+    misses_key = f'noaa_api_cache_misses_total{{cache="{cache}"}}'
+    hits = after.get(hits_key, 0.0) - before.get(hits_key, 0.0)
+    misses = after.get(misses_key, 0.0) - before.get(misses_key, 0.0)
+    return round(hits / (hits + misses), 4) if hits + misses else None
+
+
+def upstream_calls(before: Dict[str, float], after: Dict[str, float]) -> int:
+    total = 0.0
+    for key, v in after.items():
+        if key.startswith("noaa_api_upstream_requests_total"):
+            total += v - before.get(key, 0.0)
+    return int(total)
+
+
+def percentile(sorted_ms: List[float], q: float) -> Optional[float]:
+    if not sorted_ms:
+        return None
+    i = min(len(sorted_ms) - 1, max(0, int(round(q / 100.0 * len(sorted_ms) + 0.5)) - 1))
+    return round(sorted_ms[i], 3)
+
+
+async def drive(client: httpx.AsyncClient, zips: List[str], concurrency: int,
+                params: Dict[str, Any]) -> Tuple[List[float], Dict[int, int], float]:
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    it = iter(zips)
+
+    async def worker() -> None:
+        for z in it:
+            t0 = time.perf_counter()
+            try:
+                r = await client.get(f"/lookup/{z}", params=params)
+                status = r.status_code
+            except httpx.HTTPError:
+                status = 0
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - t0
+
+
+async def run_phases(client: httpx.AsyncClient, args: argparse.Namespace,
+                     zips: List[str]) -> Dict[str, Any]:
+    params = {"k": args.k} if args.k > 1 else {}
+    warm, measured = zips[:args.warmup], zips[args.warmup:]
+    if warm:
+        await drive(client, warm, args.concurrency, params)
+    before = parse_metrics((await client.get("/metrics")).text)
+    latencies, statuses, seconds = await drive(client, measured, args.concurrency, params)
+    after = parse_metrics((await client.get("/metrics")).text)
+    ready = (await client.get("/ready")).json()
+    latencies.sort()
+    return {
+        "requests": len(measured),
+        "warmup": len(warm),
+        "status": {str(k): v for k, v in sorted(statuses.items())},
+        "errors": sum(v for k, v in statuses.items() if k not in (200, 404)),
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(len(measured) / seconds, 1) if seconds else None,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": round(latencies[-1], 3) if latencies else None,
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else None,
+        },
+        "cache_hit_ratio": {
+            "nearest": hit_ratio(before, after, "nearest"),
+            "geocode": hit_ratio(before, after, "geocode"),
+        },
+        "upstream_calls": upstream_calls(before, after),
+        "dataset_version": ready.get("dataset_version"),
+        "stations": ready.get("stations"),
+    }
+
+
+async def wait_ready(client: httpx.AsyncClient) -> None:
+    deadline = time.monotonic() + READY_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.1)
+    raise SystemExit(f"service not ready after {READY_TIMEOUT_SECONDS}s")
+
+
+async def run_inproc(args: argparse.Namespace, zips: List[str]) -> Dict[str, Any]:
+    # Must be set before the service module is imported
+    os.environ["DATASET_WATCH_SECONDS"] = "0"
+    os.environ["ZIP_GEOCODER_FALLBACK"] = "1"
+    os.environ["ZIP_GEOCODE_CACHE_DB"] = ""  # stub coordinates must not reach the shared cache
+    from scripts import noaa_api_service as svc
+
+    async def stub(request: httpx.Request) -> httpx.Response:
+        if args.stub_latency_ms:
+            await asyncio.sleep(args.stub_latency_ms / 1000.0)
+        return httpx.Response(200, content=stub_body(request.url.path.rsplit("/", 1)[-1]))
+
+    async with svc.app.router.lifespan_context(svc.app):
+        svc._HTTP = httpx.AsyncClient(transport=httpx.MockTransport(stub))
+        transport = httpx.ASGITransport(app=svc.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            await wait_ready(client)
+            return await run_phases(client, args, zips)
+
+
+class _StubGeocoder(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real upstream
+    latency = 0.0
+
+    def do_GET(self) -> None:
+        zipcode = self.path.rstrip("/").rsplit("/", 1)[-1]
+        if self.latency:
+            time.sleep(self.latency)
+        if len(zipcode) != 5 or not zipcode.isdigit():
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = stub_body(zipcode)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_http(args: argparse.Namespace, zips: List[str], url: str) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+        await wait_ready(client)
+        return await run_phases(client, args, zips)
+
+
+async def run_uvicorn(args: argparse.Namespace, zips: List[str]) -> Dict[str, Any]:
+    _StubGeocoder.latency = args.stub_latency_ms / 1000.0
+    stub = ThreadingHTTPServer(("127.0.0.1", 0), _StubGeocoder)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    port = free_port()
+    env = dict(os.environ,
+               DATASET_WATCH_SECONDS="0",
+               ZIP_GEOCODER_FALLBACK="1",
+               ZIP_GEOCODE_CACHE_DB="",
+               ZIP_GEOCODER_URL=f"http://127.0.0.1:{stub.server_address[1]}/us/{{zip}}")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "scripts.noaa_api_service:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        return await run_http(args, zips, f"http://127.0.0.1:{port}")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+        stub.shutdown()
+
+
+def write_report(result: Dict[str, Any]) -> Path:
+    REPORT_DIR.mkdir(exist_ok=True)
+    path = REPORT_DIR / f"load_test_{result['distribution']}.md"
+    with path.open("w", encoding="utf-8") as md:
+        md.write(f"# Lookup API Load Test ({result['distribution']}) – {result['started_at']}\n\n")
+        md.write("```json\n" + json.dumps(result, indent=2) + "\n```\n")
+    with HISTORY_PATH.open("a", encoding="utf-8") as fh:
+        fh.write(json.dumps(result, separators=(",", ":")) + "\n")
+    return path
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--target", choices=["inproc", "uvicorn"], default="inproc")
+    ap.add_argument("--url", default=None, help="drive an already running server instead")
+    ap.add_argument("--distribution", choices=["uniform", "zipf", "misses"], default="zipf")
+    ap.add_argument("--requests", type=int, default=10000, help="measured requests")
+    ap.add_argument("--warmup", type=int, default=2000, help="unmeasured requests sent first")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--k", type=int, default=1, help="k nearest stations per lookup")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--zipf-keys", type=int, default=5000, help="hot set size for zipf")
+    ap.add_argument("--zipf-s", type=float, default=1.1, help="Zipf exponent")
+    ap.add_argument("--stub-latency-ms", type=float, default=0.0, help="stub geocoder delay per call")
+    ap.add_argument("--max-p95-ms", type=float, default=None, help="exit 1 if p95 exceeds this")
+    ap.add_argument("--max-p99-ms", type=float, default=None, help="exit 1 if p99 exceeds this")
+    args = ap.parse_args(argv)
+
+    started = datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+    zips = zip_stream(args.distribution, args.warmup + args.requests, args.seed, args.zipf_keys, args.zipf_s)
+    target = args.url or args.target
+    print(f"[start] {started} target={target} distribution={args.distribution} "
+          f"requests={args.requests:,} warmup={args.warmup:,} concurrency={args.concurrency}")
+    if args.url:
+        stats = asyncio.run(run_http(args, zips, args.url))
+    elif args.target == "uvicorn":
+        stats = asyncio.run(run_uvicorn(args, zips))
+    else:
+        stats = asyncio.run(run_inproc(args, zips))
+
+    result = {
+        "started_at": started,
+        "target": target,
+        "distribution": args.distribution,
+        "concurrency": args.concurrency,
+        "k": args.k,
+        "seed": args.seed,
+        "stub_latency_ms": args.stub_latency_ms if not args.url else None,
+        **stats,
+    }
+    path = write_report(result)
+    print(json.dumps(result, indent=2))
+    print(f"[report] {path}")
+
+    failed = []
+    p95, p99 = result["latency_ms"]["p95"], result["latency_ms"]["p99"]
+    if args.max_p95_ms is not None and p95 is not None and p95 > args.max_p95_ms:
+        failed.append(f"p95 {p95} ms > {args.max_p95_ms} ms")
+    if args.max_p99_ms is not None and p99 is not None and p99 > args.max_p99_ms:
+        failed.append(f"p99 {p99} ms > {args.max_p99_ms} ms")
+    if result["errors"]:
+        failed.append(f"{result['errors']} errors")
+    for msg in failed:
+        print(f"[fail] {msg}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
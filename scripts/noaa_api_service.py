@@ -3,78 +3,501 @@
 FastAPI service to serve small JSON responses from data/master_climate_index.min.jsonl
 
 Endpoints:
-  - GET /ping -> { ok: true }
+  - GET /ping -> { ok: true } (process is up)
+  - GET /ready -> dataset version, record count and load time; 503 + Retry-After until loaded
   - GET /lookup/{zip} -> nearest station for a ZIP (HDD65, CDD65, lat, lon, station info)
+  - GET /lookup/{zip}?k=N&weighting=idw -> also the k nearest stations with distances and
+    weights; with weighting=idw, hdd65/cdd65 are inverse-distance-weighted (power 2) blends
+  - GET /climate/{zip} -> one-call payload for the calculator: nearest-station HDD65/CDD65
+    and distance, county FIPS, and design temperatures (ZIP table, county, or nearest county)
+  - POST /compare -> annual cost and TCO of heat pump / furnace / hybrid for every location
+    (ZIP or {hdd, heating}) x parameter set, via the vectorized port of the calculator's cost
+    model (scripts/hvac_cost_engine.py); results are [location][parameter set] matrices
+  - POST /compare/monte-carlo -> TCO distribution (P10/P50/P90, mean) and win probability of
+    each system per location for one parameter set, sampling price escalation, discount rate,
+    COP degradation and carbon price (scripts/tco_monte_carlo.py); seed makes it reproducible
+  - POST /lookup/batch -> NDJSON stream, one result per input item in input order; body is a
+    JSON array (or {"items": [...]}), NDJSON, or CSV of ZIPs or lat,lon pairs. Bad items get
+    an {"index", "error"} line instead of failing the request (geocoder_unavailable = retry later)
+  - GET /nearest?lat=..&lon=.. -> same as /lookup/{zip} (incl. k/weighting) for a coordinate,
+    skipping ZIP geocoding; POST /nearest/batch is the coordinate-only batch variant
+  - GET /grid?lat=..&lon=.. -> hdd65/cdd65 bilinearly interpolated from the precomputed raster:
+    constant time, no station search, and no jumps where the nearest station changes.
+    weighting=grid on /lookup and /nearest puts the same values next to the nearest station
+  - GET /stations?bbox=minLon,minLat,maxLon,maxLat -> every station in the box (input order);
+    GET /stations?lat=..&lon=..&radius_km=.. -> every station within the radius, closest first.
+    Paged with limit/offset; next_offset is null on the last page
+  - GET /export/stations.ndjson -> every station as NDJSON, streamed in chunks; optional
+    state=OR,WA, bbox= and fields= filters; {"_cursor": ...} checkpoint lines can be passed
+    back as ?cursor= to resume an interrupted export
+  - GET /metrics -> Prometheus text format: request/stage/upstream latency histograms, cache
+    hit/miss/eviction counters, dataset load time
+  - POST /admin/reload (X-Admin-Token: $NOAA_API_ADMIN_TOKEN) -> reload the dataset now
+  - POST /admin/warm (same token) -> pre-warm the lookup caches from an access log or hot-keys
+    list in the body (or CACHE_WARM_FILE when the body is empty); for cron jobs
 
 Run locally:
   uvicorn scripts.noaa_api_service:app --reload
 
 Notes:
-  - Loads the minimal JSONL once at startup into memory (list of dicts)
-  - Uses a simple LRU cache for ZIP lookups
-  - Resolves ZIP to lat/lon using Zippopotam; falls back to RESNET_ASHRAE_DATA if available
+  - Loads the dataset in a background task started from the app lifespan, so the process
+    binds immediately; data endpoints answer 503 + Retry-After until it is live
+  - Polls the input files every DATASET_WATCH_SECONDS (default 30, 0 disables) and hot-reloads
+    a newly published dataset: the new index is built and the cached results re-computed in a
+    worker thread, then both are swapped in at once. ZIP geocodes are kept (they don't depend
+    on the dataset)
+  - Loads the minimal JSONL once into a columnar NumPy store (StationStore), or
+    maps data/master_climate_index.min.bin (from scripts/build_min_master_index.py) when it
+    is up to date: O(1) startup, and all workers share the same page cache
+  - Builds a KD-tree over the stations at load time for nearest-station search
+  - Plain /lookup/{zip} reads are answered from data/zip_station_table.json when present
+    (built by scripts/build_zip_station_table.py for the same dataset version); other ZIPs
+    fall back to live search
+  - /climate joins the plain lookup with data/climate_table.json (ZIP -> county FIPS and
+    design temps, built by scripts/build_climate_table.py); without the table county and
+    design are null. Its encoded bodies have their own LRU, emptied on every dataset swap
+  - data/climate_raster.bin (built by scripts/build_climate_raster.py) is memory-mapped like the
+    station snapshot and used only when built from the loaded dataset; without it /grid is 404
+    and weighting=grid falls back to the nearest station (the response says weighting=nearest)
+  - Single-point searches (/nearest, geocoded ZIPs, k/weighting lookups) go through a spatial
+    cache: coordinates snap to a SPATIAL_CACHE_CELL_DEG cell (default 0.01, ~1 km; 0 disables)
+    that remembers every station that can be nearest to some point of it, so nearby GPS fixes
+    resolve among a handful of candidates instead of walking the KD-tree. Exact, not approximate,
+    with the KD-tree's tie-break (scripts/test_spatial_cache.py)
+  - Uses a simple LRU cache for ZIP lookups that holds the encoded response body, so a warm
+    /lookup is a dict lookup plus a raw Response; request time is in X-Elapsed-Ms, not the body
+  - JSON is encoded with orjson when it is installed (pip install orjson), else the stdlib
+  - CACHE_WARM_FILE (access log or hot-keys file): after the dataset loads, the top
+    CACHE_WARM_MAX_KEYS (default 5000) requested ZIP lookups are computed into the caches, and
+    /ready stays 503 until that finishes, so a new instance takes traffic warm
+  - Every response carries a Server-Timing header (geocode, search, serialize, total)
+  - /lookup, /climate, /nearest, /grid and /stations send a weak ETag (dataset content + request
+    key; weak because compression changes the bytes, not the meaning) and Cache-Control max-age
+    (LOOKUP_CACHE_MAX_AGE, default 1 day), and answer If-None-Match with 304 (for "*" only once
+    the resource is known to exist); bodies over 1 KB (batch results) are gzip-compressed, or brotli when
+    brotli-asgi is installed
+  - Upstream geocoding is async over one pooled keep-alive httpx.AsyncClient; concurrent
+    lookups for the same uncached ZIP share a single upstream call
+  - Resolves ZIP to lat/lon from the local centroid table (data/zip_centroids.json, built by
+    scripts/build_zip_centroids.py, plus data/zip_centroids_min.json); ZIPs not in the table
+    fall back to Zippopotam unless ZIP_GEOCODER_FALLBACK=0
+  - Zippopotam answers are kept in a SQLite (WAL) cache shared by all workers on the host and
+    across restarts (ZIP_GEOCODE_CACHE_DB, default data/geocode_cache.sqlite3; empty disables),
+    with an in-process LRU in front; found ZIPs expire after ZIP_GEOCODE_TTL_SECONDS (30 days),
+    unknown ZIPs after ZIP_GEOCODE_MISS_TTL_SECONDS (1 day); its reads and writes run in a
+    worker thread, so a busy SQLite lock never stalls the event loop
+  - Upstream timeouts/errors are not "ZIP not found": the lookup answers 503 + Retry-After,
+    nothing is cached except a short (ZIP_GEOCODE_FAILURE_TTL_SECONDS, 30 s) failure marker,
+    a circuit breaker fails fast after repeated failures, and at most
+    ZIP_GEOCODER_MAX_CONCURRENCY calls are in flight (an interactive lookup waits briefly for
+    a slot, then gets 503; batch, /compare and warm-up items queue for one instead, no more
+    than ZIP_GEOCODER_MAX_CONCURRENCY of them at a time)
 """
 from __future__ import annotations
 
+import asyncio
+import base64
+import csv
+import hashlib
+import hmac
+import io
 import json
+import math
+import os
+import re
 import time
-from functools import lru_cache
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Literal, Optional, Tuple
+from urllib.parse import parse_qs
 
 import httpx
-from fastapi import FastAPI, HTTPException
+import numpy as np
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+from scripts.api_metrics import Registry
+from scripts.climate_raster import ClimateRaster, open_raster
+from scripts.geocode_cache import GeocodeStore
+from scripts.hvac_cost_engine import HSPF_PER_COP, PAGE_DEFAULTS, PAGE_HEATING_DESIGN, SYSTEMS, compare, grid
+
+try:  # optional: pip install brotli-asgi (br with gzip fallback)
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+try:  # optional: pip install orjson (faster JSON encoding for response bodies)
+    import orjson
+except ImportError:
+    orjson = None
+from scripts.station_index import (StationKDTree, StationStore, chord2_to_km, dataset_version, iter_station_records,
+                                   load_zip_centroids, open_snapshot, to_float)
+from scripts.tco_monte_carlo import PERCENTILES, simulate
 
 DATA_PATH = Path("data/master_climate_index.min.jsonl")
+SNAPSHOT_PATH = Path("data/master_climate_index.min.bin")
+# Later paths override earlier ones (the min file holds hand-checked centroids)
+ZIP_CENTROID_PATHS = [Path("data/zip_centroids.json"), Path("data/zip_centroids_min.json")]
+ZIP_TABLE_PATH = Path("data/zip_station_table.json")
+CLIMATE_TABLE_PATH = Path("data/climate_table.json")
+RASTER_PATH = Path("data/climate_raster.bin")
+UPSTREAM_GEOCODER = os.environ.get("ZIP_GEOCODER_FALLBACK", "1") != "0"
+# Zippopotam-compatible endpoint; point it at a local stub for offline load tests
+UPSTREAM_URL = os.environ.get("ZIP_GEOCODER_URL", "https://api.zippopotam.us/us/{zip}")
+GEOCODE_DB_PATH = os.environ.get("ZIP_GEOCODE_CACHE_DB", "data/geocode_cache.sqlite3")
+GEOCODE_TTL_SECONDS = float(os.environ.get("ZIP_GEOCODE_TTL_SECONDS", str(30 * 86400)))
+GEOCODE_MISS_TTL_SECONDS = float(os.environ.get("ZIP_GEOCODE_MISS_TTL_SECONDS", "86400"))
+GEOCODE_FAILURE_TTL_SECONDS = float(os.environ.get("ZIP_GEOCODE_FAILURE_TTL_SECONDS", "30"))
+UPSTREAM_MAX_CONNECTIONS = int(os.environ.get("ZIP_GEOCODER_MAX_CONNECTIONS", "20"))
+UPSTREAM_MAX_CONCURRENCY = int(os.environ.get("ZIP_GEOCODER_MAX_CONCURRENCY", "10"))
+UPSTREAM_QUEUE_SECONDS = 0.5  # interactive lookups wait this long for a slot before failing fast
+UPSTREAM_TIMEOUT_SECONDS = float(os.environ.get("ZIP_GEOCODER_TIMEOUT_SECONDS", "2.5"))
+BREAKER_FAILURES = int(os.environ.get("ZIP_GEOCODER_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN_SECONDS = float(os.environ.get("ZIP_GEOCODER_BREAKER_COOLDOWN_SECONDS", "30"))
+MAX_BATCH_ITEMS = int(os.environ.get("LOOKUP_BATCH_MAX_ITEMS", "100000"))
+MAX_K = 32
+COMPARE_MAX_CELLS = int(os.environ.get("COMPARE_MAX_CELLS", "250000"))  # locations x parameter sets
+MONTE_CARLO_MAX_DRAWS = 100000
+MONTE_CARLO_MAX_SAMPLES = int(os.environ.get("MONTE_CARLO_MAX_SAMPLES", "20000000"))  # locations x draws
+MAX_STATIONS_PAGE = 1000
+MAX_RADIUS_KM = 20015.0  # half the Earth's circumference
+NEAREST_COUNTY_MAX_KM = 805.0  # 500 mi, the calculator's cap for borrowing an in-state county's design temps
+EXPORT_CHUNK = 1000  # stations scanned per NDJSON chunk; one cursor checkpoint per chunk
+EXPORT_FIELDS = ("station", "name", "state", "lat", "lon", "hdd65", "cdd65")
+# GHCN-style names end in ", <state> US" ("PORTLAND INTL AP, OR US")
+_STATE_RE = re.compile(r",\s*([A-Z]{2})\s+US\s*$")
+IDW_POWER = 2.0
+IDW_COINCIDENT_KM = 0.1  # a station this close is taken as-is instead of blended
+BATCH_CHUNK = 1000  # items geocoded + searched per pass; also the NDJSON flush size
+LOAD_RETRY_SECONDS = 5
+DATASET_WATCH_SECONDS = float(os.environ.get("DATASET_WATCH_SECONDS", "30"))  # 0 disables
+ADMIN_TOKEN = os.environ.get("NOAA_API_ADMIN_TOKEN")  # unset disables /admin/*
+LOOKUP_MAX_AGE = int(os.environ.get("LOOKUP_CACHE_MAX_AGE", "86400"))
+COMPRESS_MIN_BYTES = 1024
+CACHE_WARM_FILE = os.environ.get("CACHE_WARM_FILE")  # access log or hot-keys file
+CACHE_WARM_MAX_KEYS = int(os.environ.get("CACHE_WARM_MAX_KEYS", "5000"))
+CACHE_WARM_CONCURRENCY = 32
+SPATIAL_CELL_DEG = float(os.environ.get("SPATIAL_CACHE_CELL_DEG", "0.01"))  # 0 disables the cell cache
+SPATIAL_CACHE_SIZE = int(os.environ.get("SPATIAL_CACHE_SIZE", "65536"))
+
+
+def _load_min_index(path: Path) -> StationStore:
+    t0 = time.time()
+    if not path.exists():
+        raise FileNotFoundError(f"Missing dataset: {path}")
+
+    store = StationStore.from_records(iter_station_records(path))
+    t1 = time.time()
+    print(f"[load] loaded {len(store):,} stations from {path} in {t1 - t0:.2f}s")
+    return store
 
 
-def _to_float(value: Any) -> Optional[float]:
+def _load_stations(path: Path, snapshot: Path) -> Tuple[StationStore, StationKDTree, str]:
+    """Map the binary snapshot when it is at least as new as the JSONL, else parse the JSONL."""
+    if snapshot.exists() and (not path.exists() or snapshot.stat().st_mtime >= path.stat().st_mtime):
+        t0 = time.time()
+        try:
+            store, tree, version = open_snapshot(snapshot)
+        except Exception as e:
+            print(f"[load] skipping {snapshot}: {e}")
+        else:
+            t1 = time.time()
+            print(f"[load] mapped {len(store):,} stations from {snapshot} in {(t1 - t0) * 1000:.1f}ms")
+            return store, tree, version
+    store = _load_min_index(path)
+    return store, StationKDTree(store.coords()), dataset_version(path)
+
+
+def _load_zip_centroids(paths: List[Path]) -> Dict[str, Tuple[float, float]]:
+    t0 = time.time()
+    table = load_zip_centroids(paths)
+    t1 = time.time()
+    print(f"[load] loaded {len(table):,} ZIP centroids in {t1 - t0:.2f}s")
+    return table
+
+
+def _load_zip_table(path: Path, version: str) -> Tuple[List[List[Any]], Dict[str, List[Any]]]:
+    """Load the precomputed ZIP -> station table; ignored unless built from the loaded dataset."""
+    if not path.exists():
+        return [], {}
+    t0 = time.time()
     try:
-        if value is None:
-            return None
-        if isinstance(value, str):
-            v = value.strip()
-            if not v or v.upper() in {"NA", "N/A", "-9999", "-9999.0"}:
-                return None
-            return float(v)
-        return float(value)
-    except Exception:
+        obj = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"[load] skipping {path}: {e}")
+        return [], {}
+    if obj.get("dataset_version") != version:
+        print(f"[load] skipping {path}: built for dataset {obj.get('dataset_version')}, loaded {version}")
+        return [], {}
+    stations, zips = obj.get("stations") or [], obj.get("zips") or {}
+    t1 = time.time()
+    print(f"[load] loaded {len(zips):,} precomputed ZIP -> station rows from {path} in {t1 - t0:.2f}s")
+    return stations, zips
+
+
+def _load_raster(path: Path, version: str) -> Optional[ClimateRaster]:
+    """Map the HDD/CDD raster; ignored unless built from the loaded dataset."""
+    if not path.exists():
         return None
+    t0 = time.time()
+    try:
+        raster = open_raster(path)
+    except Exception as e:
+        print(f"[load] skipping {path}: {e}")
+        return None
+    if raster.dataset_version != version:
+        print(f"[load] skipping {path}: built for dataset {raster.dataset_version}, loaded {version}")
+        return None
+    nodes = sum(t.rows * t.cols for t in raster.tiles)
+    print(f"[load] mapped {len(raster.tiles)} raster tiles ({nodes:,} nodes at {raster.step} deg) from {path} "
+          f"in {time.time() - t0:.2f}s")
+    return raster
+
 
+@dataclass
+class _ClimateTable:
+    """ZIP -> county and design-temperature joins from scripts/build_climate_table.py."""
+    counties: Dict[str, List[str]]
+    zip_county: Dict[str, str]
+    county_design: Dict[str, Dict[str, Any]]
+    zip_design: Dict[str, Dict[str, Any]]
+    design_fips: List[str]
+    design_lat: np.ndarray  # radians, aligned with design_fips
+    design_lon: np.ndarray
+    design_state: np.ndarray
+    version: str
 
-def _load_min_index(path: Path) -> List[Dict[str, Any]]:
+
+def _load_climate_table(path: Path) -> _ClimateTable:
+    obj: Dict[str, Any] = {}
+    if path.exists():
+        t0 = time.time()
+        try:
+            obj = json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            print(f"[load] skipping {path}: {e}")
+        else:
+            print(f"[load] loaded {len(obj.get('zip_county') or {}):,} ZIP -> county rows and "
+                  f"{len(obj.get('county_design') or {}):,} county design temps from {path} "
+                  f"in {time.time() - t0:.2f}s")
+    county_design = {f: d for f, d in (obj.get("county_design") or {}).items()
+                     if to_float(d.get("lat")) is not None and to_float(d.get("lon")) is not None}
+    fips = sorted(county_design)
+    lat = np.radians(np.array([float(county_design[f]["lat"]) for f in fips], dtype=np.float64))
+    lon = np.radians(np.array([float(county_design[f]["lon"]) for f in fips], dtype=np.float64))
+    state = np.array([county_design[f].get("state") or "" for f in fips], dtype=object)
+    version = hashlib.sha256(json.dumps(obj, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    return _ClimateTable(obj.get("counties") or {}, obj.get("zip_county") or {}, county_design,
+                         obj.get("zip_design") or {}, fips, lat, lon, state, version)
+
+
+@dataclass
+class _Dataset:
+    """Everything derived from one dataset version; installed and swapped as a unit."""
+    stations: StationStore
+    index: StationKDTree
+    version: str
+    zip_centroids: Dict[str, Tuple[float, float]]
+    zip_table_stations: List[List[Any]]
+    zip_table: Dict[str, List[Any]]
+    climate: _ClimateTable
+    raster: Optional[ClimateRaster]
+    signature: Tuple[Any, ...]
+    etag_base: str
+    loaded_at: float
+    load_seconds: float
+
+
+def _dataset_signature() -> Tuple[Any, ...]:
+    """(path, mtime_ns, size) of every input file; a change means a new dataset was published."""
+    sig = []
+    for path in [DATA_PATH, SNAPSHOT_PATH, *ZIP_CENTROID_PATHS, ZIP_TABLE_PATH, CLIMATE_TABLE_PATH, RASTER_PATH]:
+        try:
+            st = path.stat()
+            sig.append((str(path), st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append((str(path), None, None))
+    return tuple(sig)
+
+
+def _load_dataset() -> _Dataset:
     t0 = time.time()
-    if not path.exists():
-        raise FileNotFoundError(f"Missing dataset: {path}")
-    recs: List[Dict[str, Any]] = []
-    with path.open("r", encoding="utf-8", errors="replace") as fh:
-        for line in fh:
-            s = line.strip()
-            if not s:
-                continue
-            try:
-                o = json.loads(s)
-            except Exception:
-                continue
-            lat = _to_float(o.get("lat"))
-            lon = _to_float(o.get("lon"))
-            if lat is None or lon is None:
-                continue
-            recs.append({
-                "station": o.get("station"),
-                "name": o.get("name"),
-                "lat": lat,
-                "lon": lon,
-                "hdd65": _to_float(o.get("hdd65")),
-                "cdd65": _to_float(o.get("cdd65")),
-            })
+    signature = _dataset_signature()
+    stations, index, version = _load_stations(DATA_PATH, SNAPSHOT_PATH)
+    centroids = _load_zip_centroids(ZIP_CENTROID_PATHS)
+    table_stations, table = _load_zip_table(ZIP_TABLE_PATH, version)
+    climate = _load_climate_table(CLIMATE_TABLE_PATH)
+    raster = _load_raster(RASTER_PATH, version)
+    # Responses depend on the stations, the centroids and the raster's build settings; the ZIP
+    # table derives from the first two
+    h = hashlib.sha256(version.encode("ascii"))
+    h.update(json.dumps(sorted(centroids.items())).encode("utf-8"))
+    if raster is not None:
+        h.update(json.dumps([raster.step, raster.meta], sort_keys=True).encode("utf-8"))
     t1 = time.time()
-    print(f"[load] loaded {len(recs):,} stations from {path} in {t1 - t0:.2f}s")
-    return recs
+    return _Dataset(stations, index, version, centroids, table_stations, table, climate, raster, signature,
+                    h.hexdigest()[:16], t1, t1 - t0)
+
+
+_DATA: Optional[_Dataset] = None
+_LOAD_ERROR: Optional[str] = None
+_RELOAD_LOCK = asyncio.Lock()
+
+
+def _dataset() -> _Dataset:
+    ds = _DATA
+    if ds is None:
+        raise HTTPException(status_code=503, detail="Dataset is still loading",
+                            headers={"Retry-After": str(LOAD_RETRY_SECONDS)})
+    return ds
+
+
+def _install_dataset(ds: _Dataset, warmed: Optional[List[Tuple[Any, Any]]] = None) -> None:
+    """Swap in a dataset; `warmed` replaces the result cache, None clears it."""
+    global _DATA, _LOAD_ERROR
+    _DATA = ds
+    _LOAD_ERROR = None
+    _DATASET_LOADS.inc()
+    if warmed is None:
+        _NEAREST_CACHE.clear()
+    else:
+        _NEAREST_CACHE.replace(warmed)
+    _CLIMATE_CACHE.clear()  # cheap to rebuild from the nearest results and the climate table
+    _CELL_CACHE.clear()  # candidates from the old stations; keys carry the version as well
+
+
+def _rewarm(ds: _Dataset, entries: List[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
+    """Recompute cached lookups against a new dataset so a swap doesn't start from a cold cache."""
+    out: List[Tuple[Any, Any]] = []
+    for key, old in entries:
+        if old is None:
+            continue
+        zipcode, k, weighting = key if isinstance(key, tuple) else (key, 1, "nearest")
+        plain = k == 1 and weighting == "nearest"
+        row = ds.zip_table.get(zipcode) if plain else None
+        if row is not None:
+            out.append((key, _dumps(_zip_table_result(zipcode, row, ds))))
+            continue
+        ll = ds.zip_centroids.get(zipcode)
+        if ll is None:
+            prev = json.loads(old)  # upstream-geocoded ZIP: reuse the coordinates already served
+            ll = (prev["lat"], prev["lon"])
+        # Runs in a worker thread: query the new tree directly. The shared (unlocked) cell cache
+        # belongs to the event loop, and new-version cells would be cleared on install anyway
+        if plain:
+            near = _nearest_for_latlon(ll[0], ll[1], ds, cells=False)
+        else:
+            near = _neighbors_for_latlon(ll[0], ll[1], k, weighting, ds, cells=False)
+        if near is not None:
+            out.append((key, _dumps({"zip": zipcode, **near})))
+    return out
+
+
+async def _reload_dataset() -> Dict[str, Any]:
+    # Build and re-warm off the request path, then swap dataset + cache in one step
+    async with _RELOAD_LOCK:
+        old = _DATA
+        ds = await asyncio.to_thread(_load_dataset)
+        entries = _NEAREST_CACHE.items()
+        if old is not None and old.etag_base == ds.etag_base:
+            warmed = entries  # nothing the cached results depend on changed (stations, centroids, raster)
+        else:
+            warmed = await asyncio.to_thread(_rewarm, ds, entries)
+        _install_dataset(ds, warmed)
+    print(f"[load] dataset {ds.version} installed (was {old.version if old else None}), "
+          f"{len(warmed):,} cached results carried over")
+    return {
+        "dataset_version": ds.version,
+        "previous_version": old.version if old else None,
+        "stations": len(ds.stations),
+        "load_ms": round(ds.load_seconds * 1000, 1),
+        "rewarmed": len(warmed),
+    }
+
+
+async def _load_in_background() -> None:
+    # Runs off the event loop so uvicorn binds immediately; retries until the dataset appears
+    global _LOAD_ERROR
+    while _DATA is None:
+        try:
+            ds = await asyncio.to_thread(_load_dataset)
+        except Exception as e:
+            _LOAD_ERROR = f"{type(e).__name__}: {e}"
+            print(f"[load] dataset load failed, retrying in {LOAD_RETRY_SECONDS}s: {_LOAD_ERROR}")
+            await asyncio.sleep(LOAD_RETRY_SECONDS)
+            continue
+        _install_dataset(ds)
+        print(f"[load] dataset {ds.version} ready: {len(ds.stations):,} stations in {ds.load_seconds:.2f}s")
+    if CACHE_WARM_FILE:
+        await _warm_from_file(Path(CACHE_WARM_FILE))
+    if DATASET_WATCH_SECONDS <= 0:
+        return
+    # Poll the input files; reload once a change has been stable for one interval so a
+    # half-published dataset (JSONL written, snapshot not yet) isn't picked up
+    pending = None
+    while True:
+        await asyncio.sleep(DATASET_WATCH_SECONDS)
+        sig = _dataset_signature()
+        if sig == _DATA.signature:
+            pending = None
+            continue
+        if sig != pending:
+            pending = sig
+            continue
+        pending = None
+        try:
+            await _reload_dataset()
+        except Exception as e:
+            print(f"[load] reload failed, keeping dataset {_DATA.version}: {type(e).__name__}: {e}")
+
+
+def _open_geocode_db() -> Optional[GeocodeStore]:
+    if not GEOCODE_DB_PATH or not UPSTREAM_GEOCODER:
+        return None
+    try:
+        store = GeocodeStore(Path(GEOCODE_DB_PATH))
+    except Exception as e:
+        print(f"[load] geocode cache disabled, cannot open {GEOCODE_DB_PATH}: {e}")
+        return None
+    print(f"[load] geocode cache {GEOCODE_DB_PATH}: {len(store):,} entries")
+    return store
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI) -> AsyncIterator[None]:
+    global _GEOCODE_DB
+    _GEOCODE_DB = _open_geocode_db()
+    if _GEOCODE_DB is not None:
+        _CACHES["geocode_disk"] = _GEOCODE_DB
+    loader = asyncio.create_task(_load_in_background())
+    yield
+    loader.cancel()
+    if _HTTP is not None:
+        await _HTTP.aclose()
+    if _GEOCODE_DB is not None:
+        _GEOCODE_DB.close()
+
+
+def _dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON; orjson when available (same output for the payloads served here)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
 
+class _JSONResponse(JSONResponse):
+    """JSONResponse encoded with _dumps; the default for dynamic payloads."""
 
-app = FastAPI(title="NOAA Climate Index API", version="0.1.0")
+    def render(self, content: Any) -> bytes:
+        return _dumps(content)
+
+
+app = FastAPI(title="NOAA Climate Index API", version="0.1.0", lifespan=_lifespan,
+              default_response_class=_JSONResponse)
 # CORS for local static site
 app.add_middleware(
     CORSMiddleware,
@@ -83,10 +506,10 @@ app.add_middleware(
         "http://localhost:8080",
     ],
     allow_credentials=False,
-    allow_methods=["GET"],
+    allow_methods=["GET", "POST"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Elapsed-Ms"],
 )
-_STATIONS: List[Dict[str, Any]] = _load_min_index(DATA_PATH)
 
 
 def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -98,50 +521,449 @@ def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     return 6371.0 * c
 
 
-@lru_cache(maxsize=4096)
-def _zip_to_latlon(zipcode: str) -> Optional[Dict[str, float]]:
+class _LRUCache:
+    """OrderedDict-backed LRU for the async lookup path (functools.lru_cache can't wrap coroutines).
+
+    Entries put with a ttl (seconds) read as misses once expired; others live until evicted.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+        self._expires: Dict[Any, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        if self._expires and self._expires.get(key, float("inf")) <= time.time():
+            del self._data[key]
+            del self._expires[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if ttl is not None:
+            self._expires[key] = time.time() + ttl
+        elif self._expires:
+            self._expires.pop(key, None)
+        while len(self._data) > self.maxsize:
+            old, _ = self._data.popitem(last=False)
+            self._expires.pop(old, None)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._expires.clear()
+
+    def items(self) -> List[Tuple[Any, Any]]:
+        """Entries from least to most recently used."""
+        return list(self._data.items())
+
+    def replace(self, entries: List[Tuple[Any, Any]]) -> None:
+        """Swap in entries (least recently used first); keys carried over keep their expiry."""
+        self._data = OrderedDict(entries[-self.maxsize:])
+        self._expires = {k: t for k, t in self._expires.items() if k in self._data}
+
+
+class _SingleFlight:
+    """Coalesce concurrent calls per key so only one coroutine does the work."""
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Any, "asyncio.Future[Any]"] = {}
+
+    async def do(self, key: Any, fn: Callable[[], Awaitable[Any]]) -> Any:
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(fn())
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda _f: self._inflight.pop(key, None))
+        # shield: a client disconnect must not cancel the call other waiters share
+        return await asyncio.shield(fut)
+
+
+class _UpstreamError(Exception):
+    """The upstream geocoder could not answer (as opposed to answering "no such ZIP")."""
+
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+class _CircuitBreaker:
+    """Consecutive-failure breaker: open after `threshold` failures, fail fast for `cooldown`
+    seconds, then half-open (calls go through; one success closes it, one failure re-opens it)."""
+
+    def __init__(self, threshold: int, cooldown: float) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if time.monotonic() - self.opened_at < self.cooldown else "half_open"
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def record(self, ok: bool) -> None:
+        if ok:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.threshold:
+            if self.state != "open":
+                print(f"[upstream] circuit open after {self.failures} failures, "
+                      f"failing fast for {self.cooldown:.0f}s")
+            self.opened_at = time.monotonic()
+
+
+_MISSING = object()
+_UPSTREAM_FAILED = object()  # short-lived geocode cache marker for a transient upstream failure
+_GEOCODE_CACHE = _LRUCache(maxsize=4096)
+_NEAREST_CACHE = _LRUCache(maxsize=8192)
+_CLIMATE_CACHE = _LRUCache(maxsize=8192)
+_CELL_CACHE = _LRUCache(maxsize=SPATIAL_CACHE_SIZE)
+_GEOCODE_FLIGHTS = _SingleFlight()
+_HTTP: Optional[httpx.AsyncClient] = None
+_GEOCODE_DB: Optional[GeocodeStore] = None  # opened in the lifespan
+_UPSTREAM_BREAKER = _CircuitBreaker(BREAKER_FAILURES, BREAKER_COOLDOWN_SECONDS)
+_UPSTREAM_SLOTS = asyncio.Semaphore(UPSTREAM_MAX_CONCURRENCY)
+# Bulk callers (batch, /compare, cache warm-up) queue for upstream slots instead of failing fast,
+# at most UPSTREAM_MAX_CONCURRENCY at a time so they never bury interactive lookups in the queue
+_BULK_UPSTREAM_SLOTS = asyncio.Semaphore(UPSTREAM_MAX_CONCURRENCY)
+_UPSTREAM_BULK: ContextVar[bool] = ContextVar("_UPSTREAM_BULK", default=False)
+
+_METRICS = Registry()
+_REQUEST_SECONDS = _METRICS.histogram(
+    "noaa_api_request_duration_seconds", "Request latency by route", ("method", "route"))
+_REQUESTS = _METRICS.counter(
+    "noaa_api_requests_total", "Requests by route and status", ("method", "route", "status"))
+_STAGE_SECONDS = _METRICS.histogram(
+    "noaa_api_stage_duration_seconds", "Time per request stage (geocode, search, serialize)", ("stage",))
+_GEOCODE_SOURCE = _METRICS.counter(
+    "noaa_api_geocode_total", "ZIP geocodes by source (table, disk, upstream)", ("source",))
+_UPSTREAM_SECONDS = _METRICS.histogram(
+    "noaa_api_upstream_duration_seconds", "Zippopotam request latency", ())
+_UPSTREAM_REQUESTS = _METRICS.counter(
+    "noaa_api_upstream_requests_total", "Zippopotam requests by outcome", ("outcome",))
+_UPSTREAM_REJECTED = _METRICS.counter(
+    "noaa_api_upstream_rejected_total", "Zippopotam calls not made (circuit_open, saturated)", ("reason",))
+_METRICS.callback("noaa_api_upstream_circuit_open", "gauge", "1 while the upstream circuit breaker is open",
+                  lambda: [({}, 1 if _UPSTREAM_BREAKER.state == "open" else 0)])
+_DATASET_LOADS = _METRICS.counter(
+    "noaa_api_dataset_loads_total", "Datasets installed (initial load + reloads)")
+_CACHES: Dict[str, Any] = {"geocode": _GEOCODE_CACHE, "nearest": _NEAREST_CACHE, "climate": _CLIMATE_CACHE,
+                           "spatial": _CELL_CACHE}
+for _name, _doc, _attr in [
+    ("noaa_api_cache_hits_total", "Result cache hits", "hits"),
+    ("noaa_api_cache_misses_total", "Result cache misses", "misses"),
+    ("noaa_api_cache_evictions_total", "Result cache LRU evictions", "evictions"),
+]:
+    _METRICS.callback(_name, "counter", _doc,
+                      lambda _attr=_attr: [({"cache": n}, getattr(c, _attr)) for n, c in _CACHES.items()])
+_METRICS.callback("noaa_api_cache_entries", "gauge", "Result cache size",
+                  lambda: [({"cache": n}, len(c)) for n, c in _CACHES.items()])
+_METRICS.callback("noaa_api_dataset_load_seconds", "gauge", "Load time of the live dataset",
+                  lambda: [({}, _DATA.load_seconds)] if _DATA is not None else [])
+_METRICS.callback("noaa_api_dataset_stations", "gauge", "Stations in the live dataset",
+                  lambda: [({}, len(_DATA.stations))] if _DATA is not None else [])
+_METRICS.callback("noaa_api_dataset_info", "gauge", "Live dataset version",
+                  lambda: [({"version": _DATA.version}, 1)] if _DATA is not None else [])
+
+# Per-request stage durations, filled by _stage() and emitted as Server-Timing
+_TIMINGS: ContextVar[Optional[Dict[str, float]]] = ContextVar("_TIMINGS", default=None)
+
+
+@contextmanager
+def _stage(name: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        _STAGE_SECONDS.observe(dt, name)
+        timings = _TIMINGS.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + dt
+
+
+class _TimingMiddleware:
+    """Pure ASGI middleware: request metrics plus a Server-Timing header per response."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings: Dict[str, float] = {}
+        token = _TIMINGS.set(timings)
+        t0 = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                parts = [f"{k};dur={v * 1000:.2f}" for k, v in timings.items()]
+                parts.append(f"total;dur={(time.perf_counter() - t0) * 1000:.2f}")
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", ", ".join(parts).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _TIMINGS.reset(token)
+            # route templates only, so per-ZIP paths don't explode label cardinality
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            _REQUEST_SECONDS.observe(time.perf_counter() - t0, scope["method"], route)
+            _REQUESTS.inc(scope["method"], route, str(status))
+
+
+app.add_middleware(_TimingMiddleware)
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESS_MIN_BYTES)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_BYTES)
+
+
+def _etag(ds: _Dataset, key: str) -> str:
+    """Weak validator: same dataset + same request key -> same content. Weak because the
+    compression middleware re-encodes the body per Accept-Encoding under the same tag."""
+    return f'W/"{ds.etag_base}-{hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]}"'
+
+
+def _cache_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": f"public, max-age={LOOKUP_MAX_AGE}"}
+
+
+def _not_modified(request: Request, etag: str, exists: bool = False) -> bool:
+    """If-None-Match check. A listed tag can be matched before any work (tags are only issued
+    for resources that exist); "*" only matches once the caller passes exists=True."""
+    inm = request.headers.get("if-none-match")
+    if not inm:
+        return False
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for tag in inm.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):  # If-None-Match uses weak comparison
+            tag = tag[2:]
+        if (tag == "*" and exists) or tag == opaque:
+            return True
+    return False
+
+
+def _http_client() -> httpx.AsyncClient:
+    # One pooled keep-alive client per process; created lazily, closed in lifespan
+    global _HTTP
+    if _HTTP is None or _HTTP.is_closed:
+        _HTTP = httpx.AsyncClient(
+            timeout=UPSTREAM_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=UPSTREAM_MAX_CONNECTIONS,
+                                max_keepalive_connections=UPSTREAM_MAX_CONNECTIONS,
+                                keepalive_expiry=30.0),
+        )
+    return _HTTP
+
+
+async def _zip_to_latlon(zipcode: str) -> Optional[Dict[str, float]]:
+    """ZIP -> {"lat", "lon"}, or None if the ZIP is unknown.
+
+    Raises _UpstreamError when the answer depends on an upstream call that can't be made now.
+    """
     zipcode = zipcode.strip()
     if len(zipcode) != 5 or not zipcode.isdigit():
         return None
-    url = f"https://api.zippopotam.us/us/{zipcode}"
-    try:
-        with httpx.Client(timeout=5.0) as client:
-            r = client.get(url)
-            if r.status_code != 200:
-                return None
-            js = r.json()
-            places = js.get("places") or []
-            if not places:
-                return None
-            lat = _to_float(places[0].get("latitude"))
-            lon = _to_float(places[0].get("longitude"))
-            if lat is None or lon is None:
-                return None
-            return {"lat": lat, "lon": lon}
-    except Exception:
+    ll = _dataset().zip_centroids.get(zipcode)
+    if ll is not None:
+        _GEOCODE_SOURCE.inc("table")
+        return {"lat": ll[0], "lon": ll[1]}
+    if not UPSTREAM_GEOCODER:
         return None
+    cached = _GEOCODE_CACHE.get(zipcode, _MISSING)
+    if cached is _UPSTREAM_FAILED:
+        raise _UpstreamError("recent_failure", GEOCODE_FAILURE_TTL_SECONDS)
+    if cached is not _MISSING:
+        return cached
+    if _GEOCODE_DB is not None:
+        # SQLite can wait up to busy_timeout on another worker's write: keep it off the event loop
+        stored = await asyncio.to_thread(_GEOCODE_DB.get, zipcode)
+        if stored is not None:
+            value, expires_at = stored
+            _GEOCODE_SOURCE.inc("disk")
+            _GEOCODE_CACHE.put(zipcode, value, ttl=expires_at - time.time())
+            return value
+    return await _GEOCODE_FLIGHTS.do(zipcode, lambda: _zippopotam_latlon(zipcode))
 
 
-@lru_cache(maxsize=8192)
-def _nearest_for_zip(zipcode: str) -> Optional[Dict[str, Any]]:
-    ll = _zip_to_latlon(zipcode)
-    if not ll:
-        return None
-    lat0, lon0 = ll["lat"], ll["lon"]
-    best = None
-    bestkm = float("inf")
-    for r in _STATIONS:
-        lat = r.get("lat"); lon = r.get("lon")
-        if not isinstance(lat, (int, float)) or not isinstance(lon, (int, float)):
-            continue
-        d = _haversine_km(lat0, lon0, float(lat), float(lon))
-        if d < bestkm:
-            bestkm = d
-            best = r
-    if best is None:
+@contextmanager
+def _bulk_upstream() -> Iterator[None]:
+    """Geocoding started inside this block (and tasks created in it) queues for upstream slots."""
+    token = _UPSTREAM_BULK.set(True)
+    try:
+        yield
+    finally:
+        _UPSTREAM_BULK.reset(token)
+
+
+async def _zippopotam_latlon(zipcode: str) -> Optional[Dict[str, float]]:
+    if _UPSTREAM_BREAKER.state == "open":
+        _UPSTREAM_REJECTED.inc("circuit_open")
+        raise _UpstreamError("circuit_open", _UPSTREAM_BREAKER.retry_after())
+    if _UPSTREAM_BULK.get():
+        async with _BULK_UPSTREAM_SLOTS, _UPSTREAM_SLOTS:
+            return await _zippopotam_call(zipcode)
+    # Bounded concurrency: in a brownout, excess lookups fail fast instead of queueing
+    try:
+        await asyncio.wait_for(_UPSTREAM_SLOTS.acquire(), UPSTREAM_QUEUE_SECONDS)
+    except asyncio.TimeoutError:
+        _UPSTREAM_REJECTED.inc("saturated")
+        raise _UpstreamError("saturated", 1)
+    try:
+        return await _zippopotam_call(zipcode)
+    finally:
+        _UPSTREAM_SLOTS.release()
+
+
+async def _zippopotam_call(zipcode: str) -> Optional[Dict[str, float]]:
+    url = UPSTREAM_URL.format(zip=zipcode)
+    res: Optional[Dict[str, float]] = None
+    _GEOCODE_SOURCE.inc("upstream")
+    t0 = time.perf_counter()
+    try:
+        r = await _http_client().get(url)
+        if r.status_code == 200:
+            outcome = "ok"
+            places = r.json().get("places") or []
+            if places:
+                lat = to_float(places[0].get("latitude"))
+                lon = to_float(places[0].get("longitude"))
+                if lat is not None and lon is not None:
+                    res = {"lat": lat, "lon": lon}
+        else:
+            outcome = "not_found" if r.status_code == 404 else "http_error"
+    except httpx.TimeoutException:
+        outcome = "timeout"
+    except Exception:
+        outcome = "error"
+    _UPSTREAM_SECONDS.observe(time.perf_counter() - t0)
+    _UPSTREAM_REQUESTS.inc(outcome)
+    ok = outcome in ("ok", "not_found")
+    _UPSTREAM_BREAKER.record(ok)
+    if not ok:
+        # Transient: remember briefly so a retry storm doesn't hammer upstream, never as a miss
+        _GEOCODE_CACHE.put(zipcode, _UPSTREAM_FAILED, ttl=GEOCODE_FAILURE_TTL_SECONDS)
+        raise _UpstreamError(outcome, GEOCODE_FAILURE_TTL_SECONDS)
+    # A definitive answer: share it with the other workers and the next restart
+    ttl = GEOCODE_TTL_SECONDS if res is not None else GEOCODE_MISS_TTL_SECONDS
+    _GEOCODE_CACHE.put(zipcode, res, ttl=ttl)
+    if _GEOCODE_DB is not None:
+        await asyncio.to_thread(_GEOCODE_DB.put, zipcode, res, ttl)
+    return res
+
+
+def _unit_xyz(lat: float, lon: float) -> Tuple[float, float, float]:
+    la, lo = math.radians(lat), math.radians(lon)
+    return (math.cos(la) * math.cos(lo), math.cos(la) * math.sin(lo), math.sin(la))
+
+
+def _cell_candidates(ds: _Dataset, lat0: float, lon0: float, k: int) -> Tuple[Tuple[int, float, float, float], ...]:
+    """(position, x, y, z) of every station that can be among the k nearest to some point of
+    the SPATIAL_CELL_DEG cell holding (lat0, lon0); cached per cell.
+
+    With c the cell center, r its half-diagonal and d_k the k-th nearest distance from c, a
+    point p in the cell has its k nearest within d_k + r of p, so within d_k + 2r of c.
+    """
+    iy, ix = math.floor(lat0 / SPATIAL_CELL_DEG), math.floor(lon0 / SPATIAL_CELL_DEG)
+    key = (ds.version, iy, ix, k)
+    cands = _CELL_CACHE.get(key)
+    if cands is not None:
+        return cands
+    lat_lo, lat_hi = max(-90.0, iy * SPATIAL_CELL_DEG), min(90.0, (iy + 1) * SPATIAL_CELL_DEG)
+    lon_lo, lon_hi = ix * SPATIAL_CELL_DEG, (ix + 1) * SPATIAL_CELL_DEG
+    clat, clon = (lat_lo + lat_hi) / 2, (lon_lo + lon_hi) / 2
+    want = k + 4  # a few spares usually already reach past the bound: one tree query per miss
+    hits = ds.index.nearest_k(clat, clon, want)
+    if hits:
+        r = max(_haversine_km(clat, clon, la, lo) for la in (lat_lo, lat_hi) for lo in (lon_lo, lon_hi))
+        bound = hits[min(k, len(hits)) - 1][1] + 2 * r + 1e-3
+        # Widen the k-nearest query until it passes the bound: cost follows the few candidates,
+        # where a radius query from an empty ocean cell would sweep much of the tree
+        while hits[-1][1] <= bound and len(hits) == want < len(ds.stations):
+            want = min(len(ds.stations), 2 * want + 4)
+            hits = ds.index.nearest_k(clat, clon, want)
+        cands = tuple((pos, *_unit_xyz(float(ds.stations.lat[pos]), float(ds.stations.lon[pos])))
+                      for pos, km in hits if km <= bound)
+    else:
+        cands = ()
+    _CELL_CACHE.put(key, cands)
+    return cands
+
+
+def _nearest_k(ds: _Dataset, lat0: float, lon0: float, k: int, cells: bool = True) -> List[Tuple[int, float]]:
+    """Same as ds.index.nearest_k, resolved among the cell's cached candidates when enabled.
+
+    Candidates are scored with the tree's arithmetic and ranked by (squared chord, position),
+    the tree's own tie-break, so stations sharing coordinates resolve the same way here.
+    cells=False queries the tree directly (used off the event loop, e.g. by _rewarm).
+    """
+    if SPATIAL_CELL_DEG <= 0 or not cells:
+        return ds.index.nearest_k(lat0, lon0, k)
+    x, y, z = _unit_xyz(lat0, lon0)
+    scored = []
+    for pos, cx, cy, cz in _cell_candidates(ds, lat0, lon0, k):
+        dx = x - cx
+        dy = y - cy
+        dz = z - cz
+        scored.append((dx * dx + dy * dy + dz * dz, pos))
+    scored.sort()
+    return [(pos, chord2_to_km(d2)) for d2, pos in scored[:k]]
+
+
+def _nearest_for_latlon(lat0: float, lon0: float, ds: Optional[_Dataset] = None,
+                        cells: bool = True) -> Optional[Dict[str, Any]]:
+    ds = ds or _dataset()
+    hits = _nearest_k(ds, lat0, lon0, 1, cells)
+    return _station_result(ds, lat0, lon0, hits[0] if hits else None)
+
+
+def _nearest_many(coords: List[Tuple[float, float]]) -> List[Optional[Dict[str, Any]]]:
+    ds = _dataset()
+    hits = ds.stations.nearest_many(coords)
+    return [_station_result(ds, lat0, lon0, hit) for (lat0, lon0), hit in zip(coords, hits)]
+
+
+def _station_result(ds: _Dataset, lat0: float, lon0: float,
+                    hit: Optional[Tuple[int, float]]) -> Optional[Dict[str, Any]]:
+    if hit is None:
         return None
+    pos, bestkm = hit
+    best = ds.stations.record(pos)
     return {
-        "zip": zipcode,
         "lat": round(lat0, 5),
         "lon": round(lon0, 5),
         "station": best.get("station"),
@@ -152,18 +974,857 @@ def _nearest_for_zip(zipcode: str) -> Optional[Dict[str, Any]]:
     }
 
 
+def _idw_value(neighbors: List[Tuple[Dict[str, Any], float]], field: str) -> Optional[float]:
+    """Inverse-distance-weighted mean of `field`; stations missing the value are skipped."""
+    num = 0.0
+    den = 0.0
+    for rec, km in neighbors:
+        v = rec.get(field)
+        if v is None:
+            continue
+        if km < IDW_COINCIDENT_KM:
+            return v
+        w = 1.0 / (km ** IDW_POWER)
+        num += w * v
+        den += w
+    return round(num / den, 1) if den else None
+
+
+def _neighbors_for_latlon(lat0: float, lon0: float, k: int, weighting: str,
+                          ds: Optional[_Dataset] = None, cells: bool = True) -> Optional[Dict[str, Any]]:
+    ds = ds or _dataset()
+    hits = _nearest_k(ds, lat0, lon0, k, cells)
+    if not hits:
+        return None
+    neighbors = [(ds.stations.record(pos), km) for pos, km in hits]
+    res = _station_result(ds, lat0, lon0, hits[0])
+    if weighting == "idw":
+        res["hdd65"] = _idw_value(neighbors, "hdd65")
+        res["cdd65"] = _idw_value(neighbors, "cdd65")
+    elif weighting == "grid":
+        vals = ds.raster.sample(lat0, lon0) if ds.raster is not None else None
+        if vals is None:
+            weighting = "nearest"  # no raster or outside it: keep the nearest station's values
+        else:
+            res.update({f: v for f, v in vals.items() if v is not None})
+    if hits[0][1] < IDW_COINCIDENT_KM:
+        weights = [1.0 if i == 0 else 0.0 for i in range(len(hits))]
+    else:
+        inv = [1.0 / (km ** IDW_POWER) for _pos, km in hits]
+        weights = [w / sum(inv) for w in inv]
+    res["k"] = k
+    res["weighting"] = weighting
+    res["stations"] = [
+        {
+            "station": rec.get("station"),
+            "name": rec.get("name"),
+            "lat": rec.get("lat"),
+            "lon": rec.get("lon"),
+            "dist_km": round(km, 1),
+            "hdd65": rec.get("hdd65"),
+            "cdd65": rec.get("cdd65"),
+            "weight": round(w, 4),
+        }
+        for (rec, km), w in zip(neighbors, weights)
+    ]
+    return res
+
+
+def _zip_table_result(zipcode: str, row: List[Any], ds: Optional[_Dataset] = None) -> Dict[str, Any]:
+    lat, lon, srow, km = row
+    station, name, hdd65, cdd65 = (ds or _dataset()).zip_table_stations[srow]
+    return {
+        "zip": zipcode,
+        "lat": lat,
+        "lon": lon,
+        "station": station,
+        "name": name,
+        "dist_km": km,
+        "hdd65": hdd65,
+        "cdd65": cdd65,
+    }
+
+
+async def _nearest_for_zip(zipcode: str, k: int = 1, weighting: str = "nearest") -> Optional[Dict[str, Any]]:
+    plain = k == 1 and weighting == "nearest"
+    if plain:
+        with _stage("search"):
+            row = _dataset().zip_table.get(zipcode)
+            if row is not None:
+                return _zip_table_result(zipcode, row)
+    with _stage("geocode"):
+        ll = await _zip_to_latlon(zipcode)
+    if not ll:
+        return None
+    with _stage("search"):
+        if plain:
+            near = _nearest_for_latlon(ll["lat"], ll["lon"])
+        else:
+            near = _neighbors_for_latlon(ll["lat"], ll["lon"], k, weighting)
+    return {"zip": zipcode, **near} if near is not None else None
+
+
+async def _lookup_body(zipcode: str, k: int = 1, weighting: str = "nearest") -> Optional[bytes]:
+    """Encoded /lookup body, cached as bytes so a warm hit skips search and serialization."""
+    # Plain single-station lookups keep the bare ZIP as their cache key
+    key = zipcode if k == 1 and weighting == "nearest" else (zipcode, k, weighting)
+    cached = _NEAREST_CACHE.get(key, _MISSING)
+    if cached is not _MISSING:
+        return cached
+    res = await _nearest_for_zip(zipcode, k, weighting)
+    body = None
+    if res is not None:
+        with _stage("serialize"):
+            body = _dumps(res)
+    # A miss expires like a geocoder miss, so a ZIP that later appears upstream is picked up
+    _NEAREST_CACHE.put(key, body, ttl=GEOCODE_MISS_TTL_SECONDS if body is None else None)
+    return body
+
+
+def _nearest_design_county(ct: _ClimateTable, lat: float, lon: float,
+                           state: Optional[str]) -> Optional[Tuple[str, float]]:
+    """Closest county with design temps (in `state` when known), within NEAREST_COUNTY_MAX_KM."""
+    if not ct.design_fips:
+        return None
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    a = (np.sin((ct.design_lat - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(ct.design_lat) * np.sin((ct.design_lon - lon1) / 2) ** 2)
+    km = 2 * 6371.0 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    if state:
+        km = np.where(ct.design_state == state, km, np.inf)
+    i = int(np.argmin(km))
+    if not km[i] <= NEAREST_COUNTY_MAX_KM:
+        return None
+    return ct.design_fips[i], float(km[i])
+
+
+def _design_temps(rec: Dict[str, Any], match: str) -> Dict[str, Any]:
+    return {
+        "heating": rec.get("heating"),
+        "cooling": rec.get("cooling"),
+        "name": rec.get("name"),
+        "source": rec.get("source"),
+        "match": match,
+    }
+
+
+def _climate_result(ds: _Dataset, near: Dict[str, Any]) -> Dict[str, Any]:
+    """Join a plain nearest-station result with the ZIP's county and design temperatures.
+
+    Design temps follow the calculator's order: ZIP-level table, the ZIP's county, then the
+    nearest in-state county with data.
+    """
+    ct = ds.climate
+    zipcode = near["zip"]
+    fips = ct.zip_county.get(zipcode)
+    county = None
+    if fips is not None:
+        name, state = ct.counties.get(fips) or [None, None]
+        county = {"fips": fips, "name": name, "state": state or None}
+    design = None
+    if zipcode in ct.zip_design:
+        design = _design_temps(ct.zip_design[zipcode], "zip")
+    elif fips in ct.county_design:
+        design = {**_design_temps(ct.county_design[fips], "county"), "fips": fips}
+    else:
+        hit = _nearest_design_county(ct, near["lat"], near["lon"], county and county["state"])
+        if hit is not None:
+            design = {**_design_temps(ct.county_design[hit[0]], "nearest_county"),
+                      "fips": hit[0], "dist_km": round(hit[1], 1)}
+    return {
+        "zip": zipcode,
+        "lat": near["lat"],
+        "lon": near["lon"],
+        "hdd65": near["hdd65"],
+        "cdd65": near["cdd65"],
+        "station": {
+            "id": near["station"],
+            "name": near["name"],
+            "state": _station_state(near["name"]),
+            "dist_km": near["dist_km"],
+        },
+        "county": county,
+        "design": design,
+    }
+
+
+async def _climate_body(zipcode: str) -> Optional[bytes]:
+    """Encoded /climate body, cached as bytes like _lookup_body."""
+    cached = _CLIMATE_CACHE.get(zipcode, _MISSING)
+    if cached is not _MISSING:
+        return cached
+    near = await _nearest_for_zip(zipcode)
+    body = None
+    if near is not None:
+        with _stage("serialize"):
+            body = _dumps(_climate_result(_dataset(), near))
+    _CLIMATE_CACHE.put(zipcode, body, ttl=GEOCODE_MISS_TTL_SECONDS if body is None else None)
+    return body
+
+
+def _parse_batch_item(obj: Any) -> Tuple[str, Any]:
+    """Normalise one batch input to ("zip", "97219"), ("point", (lat, lon)) or ("invalid", None)."""
+    if isinstance(obj, bool):
+        return "invalid", None
+    if isinstance(obj, int):
+        return "zip", str(obj).zfill(5)
+    if isinstance(obj, str):
+        return "zip", obj.strip()
+    if isinstance(obj, dict):
+        if obj.get("zip") is not None:
+            return _parse_batch_item(obj["zip"])
+        lat, lon = to_float(obj.get("lat")), to_float(obj.get("lon"))
+    elif isinstance(obj, (list, tuple)) and len(obj) == 2:
+        lat, lon = to_float(obj[0]), to_float(obj[1])
+    elif isinstance(obj, (list, tuple)) and len(obj) == 1:
+        return _parse_batch_item(obj[0])
+    else:
+        return "invalid", None
+    if lat is None or lon is None or not (-90.0 <= lat <= 90.0) or not (-180.0 <= lon <= 180.0):
+        return "invalid", None
+    return "point", (lat, lon)
+
+
+def _parse_batch_body(body: bytes, content_type: str) -> List[Any]:
+    """Accept a JSON array (or {"items": [...]}), NDJSON, or CSV (zip or lat,lon per row)."""
+    text = body.decode("utf-8", errors="replace")
+    ctype = content_type.split(";")[0].strip().lower()
+    if ctype in {"application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-seq"}:
+        items: List[Any] = []
+        for line in text.splitlines():
+            s = line.strip()
+            if not s:
+                continue
+            try:
+                items.append(json.loads(s))
+            except Exception:
+                items.append(None)  # keeps the output aligned with input lines
+        return items
+    if ctype in {"text/csv", "text/plain"}:
+        rows = [r for r in csv.reader(io.StringIO(text)) if r and any(c.strip() for c in r)]
+        if not rows:
+            return []
+        header = [c.strip().lower() for c in rows[0]]
+        if "zip" in header or ("lat" in header and "lon" in header):
+            return [dict(zip(header, (c.strip() for c in r))) for r in rows[1:]]
+        return [r[0] if len(r) == 1 else r for r in rows]
+    obj = json.loads(text)
+    if isinstance(obj, dict):
+        obj = obj.get("items")
+    if not isinstance(obj, list):
+        raise ValueError("expected a JSON array or an object with an 'items' array")
+    return obj
+
+
+async def _zip_to_latlon_or_error(zipcode: str) -> Any:
+    try:
+        return await _zip_to_latlon(zipcode)
+    except _UpstreamError as e:
+        return e
+
+
+async def _batch_records(items: List[Any], points_only: bool = False) -> AsyncIterator[bytes]:
+    for start in range(0, len(items), BATCH_CHUNK):
+        chunk = [_parse_batch_item(o) for o in items[start:start + BATCH_CHUNK]]
+        if points_only:
+            chunk = [(kind, v) if kind == "point" else ("invalid", None) for kind, v in chunk]
+        # Geocode the chunk concurrently (single-flight de-duplicates repeated ZIPs)
+        zips = sorted({v for kind, v in chunk if kind == "zip"})
+        with _bulk_upstream():
+            geo = dict(zip(zips, await asyncio.gather(*(_zip_to_latlon_or_error(z) for z in zips))))
+        coords: List[Tuple[float, float]] = []
+        for kind, v in chunk:
+            if kind == "point":
+                coords.append(v)
+            elif kind == "zip" and isinstance(geo[v], dict):
+                coords.append((geo[v]["lat"], geo[v]["lon"]))
+        # One nearest-station pass over the whole chunk. Batch results deliberately bypass
+        # _NEAREST_CACHE so a nightly 40k-ZIP job does not flush the interactive hot set.
+        near = iter(_nearest_many(coords))
+        lines = []
+        for i, (kind, v) in enumerate(chunk, start=start):
+            if kind == "invalid":
+                rec: Dict[str, Any] = {"index": i, "error": "invalid_item"}
+            elif kind == "zip" and isinstance(geo[v], _UpstreamError):
+                rec = {"index": i, "zip": v, "error": "geocoder_unavailable"}
+            elif kind == "zip" and not geo[v]:
+                rec = {"index": i, "zip": v, "error": "no_coords"}
+            else:
+                res = next(near)
+                if res is None:
+                    rec = {"index": i, "error": "no_station"}
+                elif kind == "zip":
+                    rec = {"index": i, "zip": v, **res}
+                else:
+                    rec = {"index": i, **res}
+            lines.append(_dumps(rec))
+        yield b"\n".join(lines) + b"\n"
+
+
+def _compare_params(sets: Any) -> Dict[str, Any]:
+    """Parameter sets (list of dicts, page defaults for missing keys) -> one array per input."""
+    if sets is None:
+        sets = [{}]
+    if not isinstance(sets, list) or not sets or not all(isinstance(p, dict) for p in sets):
+        raise HTTPException(status_code=400, detail="params must be a non-empty array of objects")
+    known = set(PAGE_DEFAULTS) | {"hspf"}
+    for p in sets:
+        unknown = sorted(set(p) - known)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown parameter(s): {', '.join(unknown)}")
+    out: Dict[str, Any] = {}
+    try:
+        for key, default in PAGE_DEFAULTS.items():
+            if isinstance(default, dict):
+                out[key] = {k: np.array([float((p.get(key) or {}).get(k, default[k])) for p in sets])
+                            for k in SYSTEMS}
+            elif key == "auto_crossover":
+                out[key] = np.array([bool(p.get(key, default)) for p in sets])
+            elif key == "cop":
+                out[key] = np.array([float(p["hspf"]) / HSPF_PER_COP if "hspf" in p else float(p.get(key, default))
+                                     for p in sets])
+            else:
+                out[key] = np.array([float(p.get(key, default)) for p in sets])
+    except (TypeError, ValueError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail=f"Bad parameter value: {e}")
+    return out
+
+
+async def _compare_location(obj: Any) -> Dict[str, Any]:
+    """A location item -> {"hdd", "heating", ...}; ZIPs take HDD from the nearest station and
+    the design temp from the /climate join (the page's 20°F when there is none)."""
+    if isinstance(obj, dict) and obj.get("zip") is None:
+        ident = {"id": obj["id"]} if obj.get("id") is not None else {}
+        hdd, heating = to_float(obj.get("hdd")), to_float(obj.get("heating"))
+        if hdd is None or heating is None:
+            return {**ident, "error": "invalid_item"}
+        return {**ident, "hdd": hdd, "heating": heating}
+    kind, zipcode = _parse_batch_item(obj)
+    if kind != "zip":
+        return {"error": "invalid_item"}
+    try:
+        near = await _nearest_for_zip(zipcode)
+    except _UpstreamError:
+        return {"zip": zipcode, "error": "geocoder_unavailable"}
+    if near is None:
+        return {"zip": zipcode, "error": "not_found"}
+    res = _climate_result(_dataset(), near)
+    design = res["design"]
+    return {
+        "zip": zipcode,
+        "hdd": res["hdd65"],
+        "heating": design["heating"] if design and design.get("heating") is not None else PAGE_HEATING_DESIGN,
+        "design": design["match"] if design else None,
+        "station": res["station"]["id"],
+    }
+
+
+def _matrix(a: np.ndarray, digits: int) -> List[Any]:
+    a = np.round(np.asarray(a, dtype=np.float64), digits)
+    return np.where(np.isfinite(a), a, None).tolist()
+
+
+def _compare_results(locations: List[Dict[str, Any]], params: Dict[str, Any]) -> Dict[str, Any]:
+    # Unresolved locations (and stations without HDD) price as NaN -> null rows
+    locs = {k: np.array([np.nan if loc.get(field) is None else loc[field] for loc in locations])
+            for k, field in (("hdd", "hdd"), ("heating_design", "heating"))}
+    res = compare(**grid(locs, params))
+    return {
+        "crossover": _matrix(res["crossover"], 1),
+        "systems": {
+            # The JS NPV counts a NaN year as 0; for an unpriced location that is not a TCO
+            k: {"total": _matrix(res[k]["total"], 0),
+                "tco": _matrix(np.where(np.isfinite(res[k]["total"]), res[k]["tco"], np.nan), 2),
+                "kwh": _matrix(res[k]["kwh"], 1), "therms": _matrix(res[k]["therms"], 1)}
+            for k in SYSTEMS
+        },
+    }
+
+
+def _monte_carlo_results(locations: List[Dict[str, Any]], params: Dict[str, Any], draws: int,
+                         seed: Optional[int], uncertainty: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    hdd = np.array([np.nan if loc.get("hdd") is None else loc["hdd"] for loc in locations])
+    heating = np.array([np.nan if loc.get("heating") is None else loc["heating"] for loc in locations])
+    one = {k: ({s: float(x[s][0]) for s in SYSTEMS} if isinstance(x, dict) else x[0].item())
+           for k, x in params.items()}
+    try:
+        res = simulate(hdd, heating, draws=draws, seed=seed, uncertainty=uncertainty, **one)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Bad uncertainty: {e}")
+    stats = ("deterministic", "mean", *(f"p{q}" for q in PERCENTILES))
+    return {
+        "params": one, "draws": res["draws"], "seed": res["seed"], "years": res["years"],
+        "uncertainty": res["uncertainty"],
+        "systems": {
+            k: {**{s: _matrix(res["systems"][k][s], 2) for s in stats},
+                "win_probability": _matrix(res["systems"][k]["win_probability"], 4)}
+            for k in SYSTEMS
+        },
+    }
+
+
+_LOOKUP_LINE_RE = re.compile(r"/lookup/(\d{5})(?:\?([^\s\"]*))?")
+# Readiness gate for the startup warm-up; "pending" until the dataset is in and warming starts
+_WARM: Dict[str, Any] = {"state": "pending" if CACHE_WARM_FILE else "off", "done": 0, "total": 0}
+
+
+def _warm_keys(text: str, limit: int) -> List[Tuple[str, int, str]]:
+    """Most requested (zip, k, weighting) first.
+
+    Lines are either access-log lines containing a /lookup/{zip} request (k and weighting are
+    read from its query string) or hot-keys lines: "97219" or "97219,1520" (ZIP, count).
+    """
+    counts: Counter = Counter()
+    for line in text.splitlines():
+        m = _LOOKUP_LINE_RE.search(line)
+        if m:
+            q = parse_qs(m.group(2) or "")
+            try:
+                k = min(MAX_K, max(1, int(q.get("k", ["1"])[0])))
+            except ValueError:
+                k = 1
+            weighting = q.get("weighting", ["nearest"])[0]
+            if weighting not in ("nearest", "idw", "grid"):
+                weighting = "nearest"
+            counts[(m.group(1), k, weighting)] += 1
+            continue
+        parts = [p for p in re.split(r"[\s,]+", line.strip()) if p]
+        if parts and len(parts[0]) == 5 and parts[0].isdigit():
+            n = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 1
+            counts[(parts[0], 1, "nearest")] += n
+    return [key for key, _n in counts.most_common(limit)]
+
+
+async def _warm_caches(keys: List[Tuple[str, int, str]]) -> Dict[str, Any]:
+    """Compute each lookup into the geocode and result caches, a few at a time."""
+    t0 = time.time()
+    stats = {"keys": len(keys), "warmed": 0, "not_found": 0, "failed": 0}
+    _WARM.update(done=0, total=len(keys))
+    sem = asyncio.Semaphore(CACHE_WARM_CONCURRENCY)
+
+    async def warm(key: Tuple[str, int, str]) -> None:
+        async with sem:
+            try:
+                body = await _lookup_body(*key)
+            except _UpstreamError:
+                stats["failed"] += 1
+            else:
+                stats["warmed" if body is not None else "not_found"] += 1
+            _WARM["done"] += 1
+
+    with _bulk_upstream():
+        await asyncio.gather(*(warm(key) for key in keys))
+    stats["seconds"] = round(time.time() - t0, 2)
+    return stats
+
+
+async def _warm_from_file(path: Path) -> None:
+    _WARM["state"] = "running"
+    try:
+        text = await asyncio.to_thread(path.read_text, encoding="utf-8", errors="replace")
+        stats = await _warm_caches(_warm_keys(text, CACHE_WARM_MAX_KEYS))
+        print(f"[warm] {path}: {stats}")
+    except Exception as e:
+        # A broken warm-up list must not keep the instance out of rotation
+        print(f"[warm] skipped {path}: {type(e).__name__}: {e}")
+    _WARM["state"] = "done"
+
+
 @app.get("/ping")
 def ping() -> Dict[str, Any]:
-    return {"ok": True, "stations": len(_STATIONS)}
+    return {"ok": True, "stations": len(_DATA.stations) if _DATA is not None else 0}
+
+
+@app.get("/ready")
+def ready() -> JSONResponse:
+    ds = _DATA
+    if ds is None:
+        return _JSONResponse(
+            {"ready": False, "error": _LOAD_ERROR},
+            status_code=503,
+            headers={"Retry-After": str(LOAD_RETRY_SECONDS)},
+        )
+    if _WARM["state"] in ("pending", "running"):
+        return _JSONResponse(
+            {"ready": False, "warming": {"done": _WARM["done"], "total": _WARM["total"]}},
+            status_code=503,
+            headers={"Retry-After": str(LOAD_RETRY_SECONDS)},
+        )
+    return _JSONResponse({
+        "ready": True,
+        "dataset_version": ds.version,
+        "stations": len(ds.stations),
+        "zip_centroids": len(ds.zip_centroids),
+        "zip_table": len(ds.zip_table),
+        "zip_county": len(ds.climate.zip_county),
+        "raster_step": ds.raster.step if ds.raster is not None else None,
+        "load_ms": round(ds.load_seconds * 1000, 1),
+        "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ds.loaded_at)),
+    })
+
+
+@app.get("/metrics")
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(_METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @app.get("/lookup/{zipcode}")
-def lookup_zip(zipcode: str) -> Dict[str, Any]:
-    t0 = time.time()
-    res = _nearest_for_zip(zipcode)
-    if not res:
+async def lookup_zip(
+    request: Request,
+    zipcode: str,
+    k: int = Query(1, ge=1, le=MAX_K, description="Number of nearest stations to return"),
+    weighting: Literal["nearest", "idw", "grid"] = Query(
+        "nearest", description="idw blends hdd65/cdd65 over the k stations; grid reads them from the raster"),
+) -> Response:
+    t0 = time.perf_counter()
+    etag = _etag(_dataset(), f"lookup:{zipcode}:{k}:{weighting}")
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    try:
+        body = await _lookup_body(zipcode, k, weighting)
+    except _UpstreamError as e:
+        raise HTTPException(status_code=503, detail=f"ZIP geocoder unavailable ({e.reason})",
+                            headers={"Retry-After": str(e.retry_after)})
+    if body is None:
         raise HTTPException(status_code=404, detail="ZIP not found or no nearby station")
-    res["elapsed_ms"] = int((time.time() - t0) * 1000)
-    return res
+    if _not_modified(request, etag, exists=True):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    headers = _cache_headers(etag)
+    headers["X-Elapsed-Ms"] = f"{(time.perf_counter() - t0) * 1000:.2f}"
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@app.get("/climate/{zipcode}")
+async def climate_zip(request: Request, zipcode: str) -> Response:
+    t0 = time.perf_counter()
+    ds = _dataset()
+    etag = _etag(ds, f"climate:{ds.climate.version}:{zipcode}")
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    try:
+        body = await _climate_body(zipcode)
+    except _UpstreamError as e:
+        raise HTTPException(status_code=503, detail=f"ZIP geocoder unavailable ({e.reason})",
+                            headers={"Retry-After": str(e.retry_after)})
+    if body is None:
+        raise HTTPException(status_code=404, detail="ZIP not found or no nearby station")
+    if _not_modified(request, etag, exists=True):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    headers = _cache_headers(etag)
+    headers["X-Elapsed-Ms"] = f"{(time.perf_counter() - t0) * 1000:.2f}"
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def _read_batch(request: Request) -> List[Any]:
+    try:
+        items = _parse_batch_body(await request.body(), request.headers.get("content-type", ""))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable batch body: {e}")
+    if len(items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {MAX_BATCH_ITEMS:,} items)")
+    return items
+
+
+@app.post("/lookup/batch")
+async def lookup_batch(request: Request) -> StreamingResponse:
+    _dataset()
+    items = await _read_batch(request)
+    return StreamingResponse(_batch_records(items), media_type="application/x-ndjson")
+
+
+@app.get("/nearest")
+async def nearest_point(
+    request: Request,
+    lat: float = Query(..., ge=-90.0, le=90.0),
+    lon: float = Query(..., ge=-180.0, le=180.0),
+    k: int = Query(1, ge=1, le=MAX_K, description="Number of nearest stations to return"),
+    weighting: Literal["nearest", "idw", "grid"] = Query(
+        "nearest", description="idw blends hdd65/cdd65 over the k stations; grid reads them from the raster"),
+) -> Response:
+    t0 = time.perf_counter()
+    etag = _etag(_dataset(), f"nearest:{lat!r}:{lon!r}:{k}:{weighting}")
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    with _stage("search"):
+        if k == 1 and weighting == "nearest":
+            res = _nearest_for_latlon(lat, lon)
+        else:
+            res = _neighbors_for_latlon(lat, lon, k, weighting)
+    if not res:
+        raise HTTPException(status_code=404, detail="No nearby station")
+    if _not_modified(request, etag, exists=True):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    headers = _cache_headers(etag)
+    headers["X-Elapsed-Ms"] = f"{(time.perf_counter() - t0) * 1000:.2f}"
+    with _stage("serialize"):
+        return _JSONResponse(res, headers=headers)
+
+
+@app.get("/grid")
+def grid_point(
+    request: Request,
+    lat: float = Query(..., ge=-90.0, le=90.0),
+    lon: float = Query(..., ge=-180.0, le=180.0),
+) -> Response:
+    t0 = time.perf_counter()
+    ds = _dataset()
+    etag = _etag(ds, f"grid:{lat!r}:{lon!r}")
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    if ds.raster is None:
+        raise HTTPException(status_code=404, detail="No climate raster loaded")
+    with _stage("search"):
+        vals = ds.raster.sample(lat, lon)
+    if vals is None:
+        raise HTTPException(status_code=404, detail="Outside the raster's coverage")
+    if _not_modified(request, etag, exists=True):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    headers = _cache_headers(etag)
+    headers["X-Elapsed-Ms"] = f"{(time.perf_counter() - t0) * 1000:.2f}"
+    with _stage("serialize"):
+        return _JSONResponse({"lat": round(lat, 5), "lon": round(lon, 5), **vals, "step": ds.raster.step},
+                             headers=headers)
+
+
+def _parse_bbox(bbox: str) -> Tuple[float, float, float, float]:
+    """"minLon,minLat,maxLon,maxLat" -> floats; minLon > maxLon crosses the antimeridian."""
+    parts = [to_float(p) for p in bbox.split(",")]
+    if len(parts) != 4 or any(p is None for p in parts):
+        raise HTTPException(status_code=400, detail="bbox must be minLon,minLat,maxLon,maxLat")
+    min_lon, min_lat, max_lon, max_lat = parts
+    if not (-180.0 <= min_lon <= 180.0 and -180.0 <= max_lon <= 180.0):
+        raise HTTPException(status_code=400, detail="bbox longitudes must be within [-180, 180]")
+    if not (-90.0 <= min_lat <= max_lat <= 90.0):
+        raise HTTPException(status_code=400, detail="bbox latitudes must be within [-90, 90], min <= max")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def _area_station(ds: _Dataset, pos: int, km: Optional[float] = None) -> Dict[str, Any]:
+    rec = ds.stations.record(pos)
+    if km is not None:
+        rec["dist_km"] = round(km, 1)
+    return rec
+
+
+@app.get("/stations")
+def stations_in_area(
+    request: Request,
+    bbox: Optional[str] = Query(None, description="minLon,minLat,maxLon,maxLat"),
+    lat: Optional[float] = Query(None, ge=-90.0, le=90.0),
+    lon: Optional[float] = Query(None, ge=-180.0, le=180.0),
+    radius_km: Optional[float] = Query(None, gt=0.0, le=MAX_RADIUS_KM),
+    limit: int = Query(100, ge=1, le=MAX_STATIONS_PAGE),
+    offset: int = Query(0, ge=0),
+) -> Response:
+    ds = _dataset()
+    radius = lat is not None or lon is not None or radius_km is not None
+    if (bbox is None) == (not radius) or (radius and None in (lat, lon, radius_km)):
+        raise HTTPException(status_code=400, detail="Pass either bbox, or lat, lon and radius_km")
+    etag = _etag(ds, f"stations:{bbox}:{lat!r}:{lon!r}:{radius_km!r}:{limit}:{offset}")
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    with _stage("search"):
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = _parse_bbox(bbox)
+            hits = [(pos, None) for pos in ds.index.within_box(min_lat, min_lon, max_lat, max_lon)]
+            query: Dict[str, Any] = {"bbox": [min_lon, min_lat, max_lon, max_lat]}
+        else:
+            hits = ds.index.within_km(lat, lon, radius_km)
+            query = {"lat": lat, "lon": lon, "radius_km": radius_km}
+        page = [_area_station(ds, pos, km) for pos, km in hits[offset:offset + limit]]
+    if _not_modified(request, etag, exists=True):  # bbox validated; an empty page still exists
+        return Response(status_code=304, headers=_cache_headers(etag))
+    end = offset + len(page)
+    res = {
+        **query,
+        "count": len(hits),
+        "offset": offset,
+        "limit": limit,
+        "next_offset": end if end < len(hits) else None,
+        "stations": page,
+    }
+    with _stage("serialize"):
+        return _JSONResponse(res, headers=_cache_headers(etag))
+
+
+def _station_state(name: Optional[str]) -> Optional[str]:
+    m = _STATE_RE.search(name) if name else None
+    return m.group(1) if m else None
+
+
+def _export_cursor(version: str, pos: int, qkey: str) -> str:
+    raw = f"{version}:{pos}:{qkey}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _parse_export_cursor(token: str, version: str, qkey: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode("ascii")
+        cursor_version, pos, cursor_qkey = raw.split(":")
+        start = int(pos)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Unreadable cursor")
+    if cursor_qkey != qkey:
+        raise HTTPException(status_code=400, detail="Cursor was issued for different state/bbox filters")
+    if cursor_version != version:
+        raise HTTPException(status_code=409, detail="Dataset changed since the cursor was issued; restart the export")
+    return start
+
+
+def _export_rows(ds: _Dataset, start: int, states: Optional[set], box: Optional[Tuple[float, ...]],
+                 fields: List[str], qkey: str) -> Iterator[bytes]:
+    # Sync generator: Starlette iterates it in a worker thread, one chunk in memory at a time
+    store = ds.stations
+    n = len(store)
+    need_state = states is not None or "state" in fields
+    rows = 0
+    for lo in range(start, n, EXPORT_CHUNK):
+        hi = min(lo + EXPORT_CHUNK, n)
+        positions = np.arange(lo, hi)
+        if box is not None:
+            min_lon, min_lat, max_lon, max_lat = box
+            lat, lon = store.lat[lo:hi], store.lon[lo:hi]
+            if min_lon <= max_lon:
+                in_lon = (lon >= min_lon) & (lon <= max_lon)
+            else:
+                in_lon = (lon >= min_lon) | (lon <= max_lon)
+            positions = positions[(lat >= min_lat) & (lat <= max_lat) & in_lon]
+        lines = []
+        for pos in positions.tolist():
+            rec = store.record(pos)
+            if need_state:
+                rec["state"] = _station_state(rec["name"])
+                if states is not None and rec["state"] not in states:
+                    continue
+            lines.append(_dumps({f: rec[f] for f in fields}))
+        rows += len(lines)
+        lines.append(_dumps({"_cursor": _export_cursor(ds.version, hi, qkey)}))
+        yield b"\n".join(lines) + b"\n"
+    yield _dumps({"_cursor": None, "rows": rows}) + b"\n"
+
+
+@app.get("/export/stations.ndjson")
+def export_stations(
+    state: Optional[str] = Query(None, description="Comma-separated two-letter states, e.g. OR,WA"),
+    bbox: Optional[str] = Query(None, description="minLon,minLat,maxLon,maxLat"),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of " + ",".join(EXPORT_FIELDS)),
+    cursor: Optional[str] = Query(None, description="_cursor value from an earlier export with the same filters"),
+) -> StreamingResponse:
+    ds = _dataset()
+    states = {s.strip().upper() for s in state.split(",") if s.strip()} if state else None
+    box = _parse_bbox(bbox) if bbox else None
+    cols = [f.strip() for f in fields.split(",") if f.strip()] if fields else list(EXPORT_FIELDS)
+    unknown = [f for f in cols if f not in EXPORT_FIELDS]
+    if unknown or not cols:
+        raise HTTPException(status_code=400, detail=f"fields must be a subset of {','.join(EXPORT_FIELDS)}")
+    # Cursors are positions in dataset order, only meaningful for the same dataset and filters
+    qkey = hashlib.sha1(f"{sorted(states) if states else ''}|{box}".encode("utf-8")).hexdigest()[:12]
+    start = _parse_export_cursor(cursor, ds.version, qkey) if cursor else 0
+    return StreamingResponse(_export_rows(ds, start, states, box, cols, qkey),
+                             media_type="application/x-ndjson",
+                             headers={"X-Dataset-Version": ds.version})
+
+
+@app.post("/compare")
+async def compare_systems(request: Request) -> JSONResponse:
+    _dataset()
+    try:
+        body = json.loads(await request.body())
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable body: {e}")
+    if not isinstance(body, dict) or not isinstance(body.get("locations"), list) or not body["locations"]:
+        raise HTTPException(status_code=400, detail="locations must be a non-empty array")
+    items = body["locations"]
+    params = _compare_params(body.get("params"))
+    n_params = len(params["electricity_rate"])
+    if len(items) * n_params > COMPARE_MAX_CELLS:
+        raise HTTPException(status_code=413, detail=f"Too many scenarios (max {COMPARE_MAX_CELLS:,} "
+                                                    f"locations x parameter sets)")
+    locations: List[Dict[str, Any]] = []
+    for start in range(0, len(items), BATCH_CHUNK):
+        with _bulk_upstream():
+            locations.extend(await asyncio.gather(*(_compare_location(o)
+                                                    for o in items[start:start + BATCH_CHUNK])))
+    with _stage("compute"):
+        results = await asyncio.to_thread(_compare_results, locations, params)
+    resolved = [
+        {k: ({s: float(x[s][j]) for s in SYSTEMS} if isinstance(x, dict) else x[j].item())
+         for k, x in params.items()}
+        for j in range(n_params)
+    ]
+    return _JSONResponse({"locations": locations, "params": resolved, **results})
+
+
+@app.post("/compare/monte-carlo")
+async def compare_monte_carlo(request: Request) -> JSONResponse:
+    _dataset()
+    try:
+        body = json.loads(await request.body())
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable body: {e}")
+    if not isinstance(body, dict) or not isinstance(body.get("locations"), list) or not body["locations"]:
+        raise HTTPException(status_code=400, detail="locations must be a non-empty array")
+    items = body["locations"]
+    params = body.get("params")
+    if params is not None and not isinstance(params, dict):
+        raise HTTPException(status_code=400, detail="params must be an object (one parameter set)")
+    params = _compare_params([params or {}])
+    uncertainty = body.get("uncertainty")
+    if uncertainty is not None and not isinstance(uncertainty, dict):
+        raise HTTPException(status_code=400, detail="uncertainty must be an object")
+    draws, seed = body.get("draws", 10000), body.get("seed")
+    if isinstance(draws, bool) or not isinstance(draws, int) or not 1 <= draws <= MONTE_CARLO_MAX_DRAWS:
+        raise HTTPException(status_code=400, detail=f"draws must be an integer in 1..{MONTE_CARLO_MAX_DRAWS:,}")
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int) or seed < 0):
+        raise HTTPException(status_code=400, detail="seed must be a non-negative integer")
+    if len(items) * draws > MONTE_CARLO_MAX_SAMPLES:
+        raise HTTPException(status_code=413, detail=f"Too many samples (max {MONTE_CARLO_MAX_SAMPLES:,} "
+                                                    f"locations x draws)")
+    locations: List[Dict[str, Any]] = []
+    for start in range(0, len(items), BATCH_CHUNK):
+        with _bulk_upstream():
+            locations.extend(await asyncio.gather(*(_compare_location(o)
+                                                    for o in items[start:start + BATCH_CHUNK])))
+    with _stage("compute"):
+        results = await asyncio.to_thread(_monte_carlo_results, locations, params, draws, seed, uncertainty)
+    return _JSONResponse({"locations": locations, **results})
+
+
+@app.post("/nearest/batch")
+async def nearest_batch(request: Request) -> StreamingResponse:
+    _dataset()
+    items = await _read_batch(request)
+    return StreamingResponse(_batch_records(items, points_only=True), media_type="application/x-ndjson")
+
+
+def _check_admin(token: Optional[str]) -> None:
+    if not ADMIN_TOKEN or not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+@app.post("/admin/reload")
+async def admin_reload(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    _check_admin(x_admin_token)
+    try:
+        return await _reload_dataset()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed, previous dataset kept: {e}")
 
 
+@app.post("/admin/warm")
+async def admin_warm(
+    request: Request,
+    x_admin_token: Optional[str] = Header(None),
+    max_keys: int = Query(CACHE_WARM_MAX_KEYS, ge=1, le=100000),
+) -> Dict[str, Any]:
+    _check_admin(x_admin_token)
+    _dataset()
+    text = (await request.body()).decode("utf-8", errors="replace")
+    if not text.strip():
+        if not CACHE_WARM_FILE:
+            raise HTTPException(status_code=400, detail="Empty body and no CACHE_WARM_FILE configured")
+        try:
+            text = await asyncio.to_thread(Path(CACHE_WARM_FILE).read_text, encoding="utf-8", errors="replace")
+        except OSError as e:
+            raise HTTPException(status_code=500, detail=f"Cannot read {CACHE_WARM_FILE}: {e}")
+    return await _warm_caches(_warm_keys(text, max_keys))
@@ -0,0 +1,659 @@
+#!/usr/bin/env python3
+"""
+Station storage and spatial index for nearest-station search.
+
+StationStore keeps the stations column-wise: NumPy float64 arrays for
+lat/lon/hdd65/cdd65 (NaN = missing), an (n, 3) array of unit vectors, and one
+UTF-8 string buffer with start/length offsets for station IDs and names
+(identical strings are stored once). That replaces a dict per station and
+lets batch distance work run as NumPy expressions.
+
+write_snapshot/open_snapshot persist a store plus its KD-tree layout as one
+binary file: an 8-byte magic, a little-endian u32 header length, a JSON header
+(count, dataset_version, section table), then 64-byte aligned sections. The
+reader maps the file read-only and wraps sections with np.frombuffer, so
+opening is O(1) and every worker on the host shares the same page cache. The
+KD-tree sections (slot ids, split axes, unit vectors in tree order) are
+queried in place through memoryviews; nothing is copied per process. The
+container itself (write_sections/read_sections) is shared with the climate
+raster (scripts/climate_raster.py).
+
+Stations are projected onto 3D unit vectors and stored in an implicit,
+array-backed KD-tree. Working on the unit sphere instead of raw lat/lon means
+there is no seam at the antimeridian (Wake, Guam, the Marshall Islands and the
+western Aleutians sit on both sides of +/-180) and no distortion near the pole
+(northern Alaska). Straight-line (chord) distance is monotonic in great-circle
+distance, so the nearest point by chord is the nearest point by haversine.
+
+Usage:
+  from scripts.station_index import StationKDTree, StationStore
+  store = StationStore.from_records([{"station": ..., "name": ..., "lat": ..., ...}, ...])
+  store.record(0)   # -> {"station", "name", "lat", "lon", "hdd65", "cdd65"}
+  tree = StationKDTree([(lat, lon), ...])
+  hit = tree.nearest(45.45, -122.68)   # -> (station_position, dist_km) or None
+  hits = tree.nearest_k(45.45, -122.68, 5)   # -> [(station_position, dist_km), ...] closest first
+  hits = tree.within_km(45.45, -122.68, 100.0)   # -> [(station_position, dist_km), ...] closest first
+  positions = tree.within_box(42.0, -124.6, 46.3, -116.5)   # -> [station_position, ...] input order
+  store = StationStore.from_records(iter_station_records(Path("data/master_climate_index.min.jsonl")))
+  write_snapshot(store, tree, Path("data/master_climate_index.min.bin"), version)
+  store, tree, version = open_snapshot(Path("data/master_climate_index.min.bin"))
+
+Notes:
+  - The KD-tree is built once at load time in O(n log^2 n) and is pure Python
+  - A query near the stations touches O(log n) nodes: roughly 20-100 us per nearest() for
+    ~15k stations, depending on the machine. Points far from every station (mid-ocean) prune
+    poorly and can take a few milliseconds
+  - Range queries (within_km, within_box) prune on the split planes, so their cost grows
+    with the number of stations returned, not with the size of the dataset
+"""
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import mmap
+import struct
+from math import asin, atan2, cos, degrees, pi, radians, sin, sqrt
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EARTH_KM = 6371.0
+SNAPSHOT_MAGIC = b"NOAASTN\x01"
+_ALIGN = 64
+_TIE_DOT = 1e-12  # dot products this close to the best are re-scored exactly (rounding is ~1e-16)
+MISSING_VALUES = {"NA", "N/A", "-9999", "-9999.0"}
+
+
+def to_float(value: Any) -> Optional[float]:
+    """Numeric field -> float; None for missing, blank, NA/N/A, the -9999 sentinel or junk.
+
+    Shared by the build scripts and the API so both treat the same values as missing.
+    """
+    try:
+        if value is None:
+            return None
+        if isinstance(value, str):
+            v = value.strip()
+            if not v or v.upper() in MISSING_VALUES:
+                return None
+            return float(v)
+        return float(value)
+    except Exception:
+        return None
+
+
+def station_record(obj: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Raw index record -> {"station", "name", "lat", "lon", "hdd65", "cdd65"}, None without coordinates."""
+    lat = to_float(obj.get("lat"))
+    lon = to_float(obj.get("lon"))
+    if lat is None or lon is None:
+        return None
+    return {
+        "station": obj.get("station"),
+        "name": obj.get("name"),
+        "lat": lat,
+        "lon": lon,
+        "hdd65": to_float(obj.get("hdd65")),
+        "cdd65": to_float(obj.get("cdd65")),
+    }
+
+
+def iter_station_records(path: Path) -> Iterator[Dict[str, Any]]:
+    """Station records from a JSONL index; blank and malformed lines are skipped."""
+    with path.open("r", encoding="utf-8", errors="replace") as fh:
+        for line in fh:
+            s = line.strip()
+            if not s:
+                continue
+            try:
+                rec = station_record(json.loads(s))
+            except Exception:
+                continue
+            if rec is not None:
+                yield rec
+
+
+def load_zip_centroids(paths: Sequence[Path]) -> Dict[str, Tuple[float, float]]:
+    """ZIP -> (lat, lon); accepts {"zip": [lat, lon]} or {"zip": {"lat", "lon"}} values.
+    Later paths override earlier ones; missing or unreadable files are skipped."""
+    table: Dict[str, Tuple[float, float]] = {}
+    for path in paths:
+        if not path.exists():
+            continue
+        try:
+            obj = json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            print(f"[load] skipping {path}: {e}")
+            continue
+        for z, v in obj.items():
+            if isinstance(v, dict):
+                lat, lon = to_float(v.get("lat")), to_float(v.get("lon"))
+            elif isinstance(v, (list, tuple)) and len(v) >= 2:
+                lat, lon = to_float(v[0]), to_float(v[1])
+            else:
+                continue
+            if lat is not None and lon is not None:
+                table[str(z)] = (lat, lon)
+    return table
+
+
+def dataset_version(path: Path) -> str:
+    """Short content hash of a dataset file; ties derived artifacts to their source."""
+    h = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+def _unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    la = radians(lat)
+    lo = radians(lon)
+    c = cos(la)
+    return (c * cos(lo), c * sin(lo), sin(la))
+
+
+def chord2_to_km(d2: float) -> float:
+    """Convert a squared chord length on the unit sphere to great-circle km."""
+    if d2 <= 0.0:
+        return 0.0
+    half = sqrt(d2) / 2.0
+    return 2.0 * EARTH_KM * asin(min(1.0, half))
+
+
+def km_to_chord2(km: float) -> float:
+    """Squared chord on the unit sphere for a great-circle distance (inverse of chord2_to_km)."""
+    if km <= 0.0:
+        return 0.0
+    if km >= pi * EARTH_KM:
+        return 4.0
+    c = 2.0 * sin(km / (2.0 * EARTH_KM))
+    return c * c
+
+
+def _trig_range(fn, lo: float, hi: float, peaks: Sequence[Tuple[float, float]]) -> Tuple[float, float]:
+    """Min and max of fn over [lo, hi] degrees, given fn's extrema (degrees, value)."""
+    vals = [fn(radians(lo)), fn(radians(hi))]
+    vals.extend(v for d, v in peaks if lo <= d <= hi)
+    return min(vals), max(vals)
+
+
+def _box_bounds(min_lat: float, min_lon: float, max_lat: float,
+                max_lon: float) -> Tuple[Tuple[float, ...], Tuple[float, ...]]:
+    """Axis-aligned 3D box around a lat/lon rectangle (min_lon <= max_lon) on the unit sphere."""
+    c_lo, c_hi = _trig_range(cos, min_lat, max_lat, [(0.0, 1.0)])
+    cl_lo, cl_hi = _trig_range(cos, min_lon, max_lon, [(0.0, 1.0), (-180.0, -1.0), (180.0, -1.0)])
+    sl_lo, sl_hi = _trig_range(sin, min_lon, max_lon, [(-90.0, -1.0), (90.0, 1.0)])
+    # x = cos(lat) * cos(lon), y = cos(lat) * sin(lon): bilinear, so extremes sit at the corners
+    xs = [a * b for a in (c_lo, c_hi) for b in (cl_lo, cl_hi)]
+    ys = [a * b for a in (c_lo, c_hi) for b in (sl_lo, sl_hi)]
+    eps = 1e-12
+    return ((min(xs) - eps, min(ys) - eps, sin(radians(min_lat)) - eps),
+            (max(xs) + eps, max(ys) + eps, sin(radians(max_lat)) + eps))
+
+
+def _flat_view(arr: np.ndarray, dtype: Any) -> memoryview:
+    """1-D native-order memoryview over arr (no copy for a little-endian mapped section)."""
+    arr = np.ascontiguousarray(arr, dtype=dtype)
+    return memoryview(arr).cast("B").cast(arr.dtype.char)
+
+
+def _unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    la = np.radians(lat)
+    lo = np.radians(lon)
+    c = np.cos(la)
+    return np.stack([c * np.cos(lo), c * np.sin(lo), np.sin(la)], axis=-1)
+
+
+class StationStore:
+    """Read-only columnar station table; positions are row numbers."""
+
+    NUMERIC = ("lat", "lon", "hdd65", "cdd65")
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, hdd65: np.ndarray, cdd65: np.ndarray,
+                 strings: Any, str_start: np.ndarray, str_len: np.ndarray,
+                 xyz: Optional[np.ndarray] = None) -> None:
+        self.lat = lat
+        self.lon = lon
+        self.hdd65 = hdd65
+        self.cdd65 = cdd65
+        # row i: station id at slot 2i, name at slot 2i+1; length -1 means None
+        self._strings = strings
+        self._str_start = str_start
+        self._str_len = str_len
+        self.xyz = _unit_vectors(lat, lon) if xyz is None else xyz
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "StationStore":
+        cols: Dict[str, List[float]] = {c: [] for c in cls.NUMERIC}
+        buf = bytearray()
+        interned: Dict[str, int] = {}
+        starts: List[int] = []
+        lens: List[int] = []
+        for r in records:
+            for c in cls.NUMERIC:
+                v = r.get(c)
+                cols[c].append(float("nan") if v is None else float(v))
+            for key in ("station", "name"):
+                v = r.get(key)
+                if v is None:
+                    starts.append(0)
+                    lens.append(-1)
+                    continue
+                b = str(v).encode("utf-8")
+                off = interned.get(v)
+                if off is None:
+                    off = interned[v] = len(buf)
+                    buf += b
+                starts.append(off)
+                lens.append(len(b))
+        return cls(
+            np.asarray(cols["lat"], dtype=np.float64),
+            np.asarray(cols["lon"], dtype=np.float64),
+            np.asarray(cols["hdd65"], dtype=np.float64),
+            np.asarray(cols["cdd65"], dtype=np.float64),
+            bytes(buf),
+            np.asarray(starts, dtype=np.int64),
+            np.asarray(lens, dtype=np.int32),
+        )
+
+    def __len__(self) -> int:
+        return int(self.lat.shape[0])
+
+    def _string(self, slot: int) -> Optional[str]:
+        n = int(self._str_len[slot])
+        if n < 0:
+            return None
+        start = int(self._str_start[slot])
+        return bytes(self._strings[start:start + n]).decode("utf-8")
+
+    def station(self, i: int) -> Optional[str]:
+        return self._string(2 * i)
+
+    def name(self, i: int) -> Optional[str]:
+        return self._string(2 * i + 1)
+
+    @staticmethod
+    def _value(col: np.ndarray, i: int) -> Optional[float]:
+        v = float(col[i])
+        return None if v != v else v
+
+    def record(self, i: int) -> Dict[str, Any]:
+        return {
+            "station": self.station(i),
+            "name": self.name(i),
+            "lat": float(self.lat[i]),
+            "lon": float(self.lon[i]),
+            "hdd65": self._value(self.hdd65, i),
+            "cdd65": self._value(self.cdd65, i),
+        }
+
+    def coords(self) -> List[Tuple[float, float]]:
+        return list(zip(self.lat.tolist(), self.lon.tolist()))
+
+    def nearest_many(self, coords: Sequence[Tuple[float, float]],
+                     block: int = 128) -> List[Optional[Tuple[int, float]]]:
+        """Brute-force nearest row for many points as blocked matrix products.
+
+        Max dot product of unit vectors == min great-circle distance; the
+        winner's km is then computed from the exact vector difference. Rows
+        whose dot product is within rounding of the best are re-scored the way
+        StationKDTree scores them, so ties (stations sharing coordinates) go to
+        the lowest position and the answer matches StationKDTree.nearest.
+        """
+        if not len(self) or not len(coords):
+            return [None] * len(coords)
+        q = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        qv = _unit_vectors(q[:, 0], q[:, 1])
+        pts_t = self.xyz.T
+        out: List[Optional[Tuple[int, float]]] = []
+        for s in range(0, qv.shape[0], block):
+            qb = qv[s:s + block]
+            dots = qb @ pts_t
+            rows = np.arange(qb.shape[0])
+            best = np.argmax(dots, axis=1)
+            floor = dots[rows, best] - _TIE_DOT
+            d2 = np.sum((qb - self.xyz[best]) ** 2, axis=1)
+            hits = [(int(i), chord2_to_km(float(d))) for i, d in zip(best, d2)]
+            dots[rows, best] = -np.inf  # runner-up: one more pass, and usually nowhere near
+            for r in np.flatnonzero(dots.max(axis=1) >= floor):
+                cand = np.append(np.flatnonzero(dots[r] >= floor[r]), best[r])
+                hits[r] = self._closest(float(q[s + r, 0]), float(q[s + r, 1]), cand)
+            out.extend(hits)
+        return out
+
+    def _closest(self, lat: float, lon: float, rows: Iterable[int]) -> Tuple[int, float]:
+        """Among `rows`, the (row, km) StationKDTree would pick: min chord, then lowest row."""
+        qx, qy, qz = _unit_vector(lat, lon)
+        best = (float("inf"), -1)
+        for i in rows:
+            px, py, pz = _unit_vector(float(self.lat[i]), float(self.lon[i]))
+            dx = qx - px
+            dy = qy - py
+            dz = qz - pz
+            best = min(best, (dx * dx + dy * dy + dz * dz, int(i)))
+        return best[1], chord2_to_km(best[0])
+
+
+class StationKDTree:
+    """Implicit KD-tree over (lat, lon) points projected to the unit sphere.
+
+    The tree is a permutation of the input: for every slice [lo, hi) the node
+    sits at mid = (lo + hi) // 2, everything left of it is <= on the split
+    axis, everything right of it is >=. Positions returned by queries are
+    indexes into the original input sequence.
+    """
+
+    def __init__(self, coords: Sequence[Tuple[float, float]]) -> None:
+        pts = [_unit_vector(float(lat), float(lon)) for lat, lon in coords]
+        order = list(range(len(pts)))
+        axes = [0] * len(pts)
+        self._build(pts, order, axes, 0, len(pts))
+        self._n = len(pts)
+        # Flat sequences in tree order: slot i's point is _pts[3i:3i + 3]
+        self._ids: Sequence[int] = order
+        self._pts: Sequence[float] = [c for i in order for c in pts[i]]
+        self._axes: Sequence[int] = axes
+
+    @classmethod
+    def from_layout(cls, kd_xyz: np.ndarray, ids: np.ndarray, axes: np.ndarray) -> "StationKDTree":
+        """Wrap a saved layout (see write_snapshot) without re-sorting or copying.
+
+        kd_xyz holds the unit vectors in tree order. The queries index flat
+        memoryviews over the three arrays, so a tree on mapped sections reads
+        the shared pages directly instead of building a per-process copy.
+        """
+        tree = cls.__new__(cls)
+        tree._n = int(ids.shape[0])
+        tree._ids = _flat_view(ids, np.intc)
+        tree._pts = _flat_view(kd_xyz, np.float64)
+        tree._axes = _flat_view(axes, np.int8)
+        return tree
+
+    def __len__(self) -> int:
+        return self._n
+
+    @staticmethod
+    def _build(pts, order, axes, lo: int, hi: int) -> None:
+        # Iterative to avoid recursion limits on degenerate inputs
+        stack = [(lo, hi)]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= 1:
+                continue
+            # split on the axis of largest spread in this slice
+            best_axis, best_spread = 0, -1.0
+            for ax in (0, 1, 2):
+                vals = [pts[order[i]][ax] for i in range(lo, hi)]
+                spread = max(vals) - min(vals)
+                if spread > best_spread:
+                    best_axis, best_spread = ax, spread
+            order[lo:hi] = sorted(order[lo:hi], key=lambda i: pts[i][best_axis])
+            mid = (lo + hi) >> 1
+            axes[mid] = best_axis
+            stack.append((lo, mid))
+            stack.append((mid + 1, hi))
+
+    def nearest(self, lat: float, lon: float) -> Optional[Tuple[int, float]]:
+        """Return (input position, great-circle km) of the closest point.
+
+        Equidistant points (e.g. stations sharing coordinates) go to the lowest
+        input position, the same rule as nearest_k, within_km and
+        StationStore.nearest_many.
+        """
+        if not self._n:
+            return None
+        qx, qy, qz = q = _unit_vector(lat, lon)
+        pts = self._pts
+        axes = self._axes
+        ids = self._ids
+        best_id = -1
+        best_d2 = float("inf")
+        stack = [(0, self._n, 0.0)]
+        while stack:
+            lo, hi, bound = stack.pop()
+            if lo >= hi or bound > best_d2:  # a subtree at exactly best_d2 may hold a lower id
+                continue
+            mid = (lo + hi) >> 1
+            b = 3 * mid
+            px = pts[b]
+            py = pts[b + 1]
+            pz = pts[b + 2]
+            dx = qx - px
+            dy = qy - py
+            dz = qz - pz
+            d2 = dx * dx + dy * dy + dz * dz
+            if d2 < best_d2 or (d2 == best_d2 and ids[mid] < best_id):
+                best_d2 = d2
+                best_id = ids[mid]
+            if hi - lo == 1:
+                continue
+            ax = axes[mid]
+            diff = q[ax] - pts[b + ax]
+            plane = diff * diff
+            if diff < 0:
+                stack.append((mid + 1, hi, plane))
+                stack.append((lo, mid, 0.0))
+            else:
+                stack.append((lo, mid, plane))
+                stack.append((mid + 1, hi, 0.0))
+        return best_id, chord2_to_km(best_d2)
+
+    def nearest_many(self, coords: Sequence[Tuple[float, float]]) -> List[Optional[Tuple[int, float]]]:
+        """Nearest point for each (lat, lon) in one pass; output aligned with input."""
+        nearest = self.nearest
+        return [nearest(lat, lon) for lat, lon in coords]
+
+    def nearest_k(self, lat: float, lon: float, k: int) -> List[Tuple[int, float]]:
+        """Return up to k (input position, km) pairs, closest first (ties: lowest position).
+
+        Keeps a bounded max-heap of the k best candidates; subtrees whose
+        splitting plane is farther than the current k-th best are pruned.
+        """
+        if not self._n or k <= 0:
+            return []
+        qx, qy, qz = q = _unit_vector(lat, lon)
+        pts = self._pts
+        axes = self._axes
+        ids = self._ids
+        heap: List[Tuple[float, int]] = []  # (-d2, -input position): the root is the k-th best
+        worst = float("inf")
+        stack = [(0, self._n, 0.0)]
+        while stack:
+            lo, hi, bound = stack.pop()
+            if lo >= hi or bound > worst:
+                continue
+            mid = (lo + hi) >> 1
+            b = 3 * mid
+            px = pts[b]
+            py = pts[b + 1]
+            pz = pts[b + 2]
+            dx = qx - px
+            dy = qy - py
+            dz = qz - pz
+            d2 = dx * dx + dy * dy + dz * dz
+            if len(heap) < k:
+                heapq.heappush(heap, (-d2, -ids[mid]))
+                if len(heap) == k:
+                    worst = -heap[0][0]
+            elif d2 < worst or (d2 == worst and ids[mid] < -heap[0][1]):
+                heapq.heapreplace(heap, (-d2, -ids[mid]))
+                worst = -heap[0][0]
+            if hi - lo == 1:
+                continue
+            ax = axes[mid]
+            diff = q[ax] - pts[b + ax]
+            plane = diff * diff
+            if diff < 0:
+                stack.append((mid + 1, hi, plane))
+                stack.append((lo, mid, 0.0))
+            else:
+                stack.append((lo, mid, plane))
+                stack.append((mid + 1, hi, 0.0))
+        return [(-neg_id, chord2_to_km(-neg_d2)) for neg_d2, neg_id in sorted(heap, reverse=True)]
+
+    def within_km(self, lat: float, lon: float, radius_km: float) -> List[Tuple[int, float]]:
+        """Return every (input position, km) within radius_km, closest first."""
+        if not self._n or radius_km < 0:
+            return []
+        limit = km_to_chord2(radius_km)
+        qx, qy, qz = q = _unit_vector(lat, lon)
+        pts = self._pts
+        axes = self._axes
+        found: List[Tuple[float, int]] = []
+        stack = [(0, self._n)]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) >> 1
+            b = 3 * mid
+            px = pts[b]
+            py = pts[b + 1]
+            pz = pts[b + 2]
+            dx = qx - px
+            dy = qy - py
+            dz = qz - pz
+            d2 = dx * dx + dy * dy + dz * dz
+            if d2 <= limit:
+                found.append((d2, mid))
+            if hi - lo == 1:
+                continue
+            ax = axes[mid]
+            diff = q[ax] - pts[b + ax]
+            # the far side of the split plane can only hold hits if the plane is in range
+            if diff < 0:
+                stack.append((lo, mid))
+                if diff * diff <= limit:
+                    stack.append((mid + 1, hi))
+            else:
+                stack.append((mid + 1, hi))
+                if diff * diff <= limit:
+                    stack.append((lo, mid))
+        ids = self._ids
+        found.sort(key=lambda t: (t[0], ids[t[1]]))
+        return [(ids[pos], chord2_to_km(d2)) for d2, pos in found]
+
+    def within_box(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[int]:
+        """Return input positions of points inside a lat/lon rectangle, in input order.
+
+        min_lon > max_lon means the rectangle crosses the antimeridian (e.g. 170 to -170).
+        """
+        if not self._n or min_lat > max_lat:
+            return []
+        if min_lon > max_lon:
+            return sorted(self.within_box(min_lat, min_lon, max_lat, 180.0)
+                          + self.within_box(min_lat, -180.0, max_lat, max_lon))
+        lo_b, hi_b = _box_bounds(min_lat, min_lon, max_lat, max_lon)
+        pts = self._pts
+        axes = self._axes
+        eps = 1e-9
+        found: List[int] = []
+        stack = [(0, self._n)]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) >> 1
+            b = 3 * mid
+            p = (pts[b], pts[b + 1], pts[b + 2])
+            if (lo_b[0] <= p[0] <= hi_b[0] and lo_b[1] <= p[1] <= hi_b[1]
+                    and lo_b[2] <= p[2] <= hi_b[2]):
+                # the 3D box is a superset of the rectangle: confirm in lat/lon
+                plat = degrees(asin(max(-1.0, min(1.0, p[2]))))
+                plon = degrees(atan2(p[1], p[0]))
+                if (min_lat - eps <= plat <= max_lat + eps
+                        and (min_lon - eps <= plon <= max_lon + eps
+                             or abs(plat) >= 90.0 - eps)):
+                    found.append(self._ids[mid])
+            if hi - lo == 1:
+                continue
+            ax = axes[mid]
+            v = p[ax]
+            if lo_b[ax] <= v:
+                stack.append((lo, mid))
+            if hi_b[ax] >= v:
+                stack.append((mid + 1, hi))
+        found.sort()
+        return found
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def write_sections(path: Path, magic: bytes, header: Dict[str, Any], sections: Dict[str, np.ndarray]) -> int:
+    """Write magic + u32 header length + JSON header + 64-byte aligned sections; returns bytes.
+
+    The section table (name -> [offset, dtype, shape]) is added to the header as "sections".
+    Shared by the station snapshot and the climate raster (scripts/climate_raster.py).
+    """
+    table: Dict[str, List[Any]] = {}
+    off = 0
+    for name, arr in sections.items():
+        table[name] = [off, arr.dtype.str, list(arr.shape)]
+        off = _aligned(off + arr.nbytes)
+    blob = json.dumps({**header, "sections": table}).encode("utf-8")
+    base = _aligned(len(magic) + 4 + len(blob))
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as fh:
+        fh.write(magic)
+        fh.write(struct.pack("<I", len(blob)))
+        fh.write(blob)
+        for name, arr in sections.items():
+            fh.seek(base + table[name][0])
+            fh.write(np.ascontiguousarray(arr).tobytes())
+        fh.truncate(base + off)
+    tmp.replace(path)  # atomic: readers never see a half-written file
+    return base + off
+
+
+def read_sections(path: Path, magic: bytes, kind: str) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Map a file written by write_sections read-only: (header, name -> np.frombuffer view)."""
+    with path.open("rb") as fh:
+        if fh.read(len(magic)) != magic:
+            raise ValueError(f"Not a {kind}: {path}")
+        (hlen,) = struct.unpack("<I", fh.read(4))
+        header = json.loads(fh.read(hlen).decode("utf-8"))
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    if not isinstance(header.get("sections"), dict):
+        raise ValueError(f"No section table in {path}; rebuild it")
+    base = _aligned(len(magic) + 4 + hlen)
+    sections: Dict[str, np.ndarray] = {}
+    for name, (off, dtype, shape) in header["sections"].items():
+        count = int(np.prod(shape)) if shape else 0
+        sections[name] = np.frombuffer(mm, dtype=dtype, count=count, offset=base + off).reshape(shape)
+    return header, sections
+
+
+def write_snapshot(store: StationStore, tree: StationKDTree, path: Path, version: str) -> int:
+    """Write store + KD-tree layout as a mappable binary snapshot; returns bytes written."""
+    sections = {
+        "lat": np.ascontiguousarray(store.lat, dtype="<f8"),
+        "lon": np.ascontiguousarray(store.lon, dtype="<f8"),
+        "hdd65": np.ascontiguousarray(store.hdd65, dtype="<f8"),
+        "cdd65": np.ascontiguousarray(store.cdd65, dtype="<f8"),
+        "xyz": np.ascontiguousarray(store.xyz, dtype="<f8"),
+        "str_start": np.ascontiguousarray(store._str_start, dtype="<i8"),
+        "str_len": np.ascontiguousarray(store._str_len, dtype="<i4"),
+        "kd_ids": np.asarray(tree._ids, dtype="<i4"),
+        "kd_axes": np.asarray(tree._axes, dtype="<i1"),
+        "kd_xyz": np.asarray(tree._pts, dtype="<f8").reshape(-1, 3),
+        "strings": np.frombuffer(bytes(store._strings), dtype="u1"),
+    }
+    header = {"format": 1, "count": len(store), "dataset_version": version}
+    return write_sections(path, SNAPSHOT_MAGIC, header, sections)
+
+
+def open_snapshot(path: Path) -> Tuple[StationStore, StationKDTree, str]:
+    """Map a snapshot written by write_snapshot; returns (store, tree, dataset_version)."""
+    header, sec = read_sections(path, SNAPSHOT_MAGIC, "station snapshot")
+    store = StationStore(sec["lat"], sec["lon"], sec["hdd65"], sec["cdd65"], memoryview(sec["strings"]),
+                         sec["str_start"], sec["str_len"], xyz=sec["xyz"])
+    ids = sec["kd_ids"]
+    # Snapshots from before kd_xyz was added: gather tree order once (a private copy)
+    kd_xyz = sec["kd_xyz"] if "kd_xyz" in sec else sec["xyz"][ids]
+    tree = StationKDTree.from_layout(kd_xyz, ids, sec["kd_axes"])
+    return store, tree, header["dataset_version"]
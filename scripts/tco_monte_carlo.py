@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo lifecycle cost (TCO) for the heat pump / furnace / hybrid comparison: instead of
+computeTCO's single deterministic number, sample energy-price escalation, discount rate, heat
+pump COP degradation and carbon price, and report P10/P50/P90 TCO per system and the
+probability that each system is the cheapest.
+
+Usage (library; one parameter set, any number of locations):
+  from scripts.tco_monte_carlo import simulate
+  out = simulate(hdd=[4400, 6000], heating_design=[24, 5], draws=10000, seed=1,
+                 electricity_rate=0.15, uncertainty={"gas_escalation_pct": {"dist": "normal", "mean": 3, "sd": 2}})
+  out["systems"]["hybrid"]["p50"], out["systems"]["heatPump"]["win_probability"]
+
+Usage (CLI; locations CSV with id,hdd,heating columns, one row per location):
+  python -m scripts.tco_monte_carlo --locations territory.csv --draws 10000 --seed 1 --out mc.csv
+
+Model (per draw, constant over the horizon; year 1 is today's annual cost from the
+deterministic engine, scripts/hvac_cost_engine.py):
+  electricity cost_y = kWh x rate x (1 + elec escalation)^(y-1) x (1 - COP degradation)^-(y-1)
+  gas cost_y         = therms x rate x (1 + gas escalation)^(y-1)
+  carbon cost_y      = carbon price x (kWh_y x grid t/kWh + therms x 0.0053 t/therm)
+  TCO = max(0, install - rebate) + sum_y (energy_y + maintenance + carbon_y) / (1 + r)^y
+
+Notes:
+  - Every system sees the same draws (common random numbers), so win probabilities compare
+    like with like, and the same draws are reused for every location in a request
+  - Because the draws don't depend on the location, the per-year discounting collapses into
+    four per-draw sums; each location then costs O(draws), not O(draws x years)
+  - The hybrid's heat pump share is held at its year-1 value (COP degradation raises its kWh,
+    it doesn't move the crossover)
+  - With every spread set to 0 the distribution collapses onto computeTCO's number (up to the
+    page rounding the annual cost to whole dollars first)
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import sys
+import time
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+
+from scripts.hvac_cost_engine import (GAS_T_PER_THERM, GRID_KG_PER_KWH, JS_ELECTRICITY_RATE, JS_GAS_RATE,
+                                      JS_TCO_YEARS, MAX_TCO_YEARS, PAGE_DEFAULTS, SYSTEMS, annual_costs,
+                                      annual_tons, compute_tco, js_or)
+
+PERCENTILES = (10, 50, 90)
+MAX_CELLS_PER_CHUNK = 2_000_000  # locations x draws evaluated at once (bounds peak memory)
+
+# Each input: {"dist": "fixed" | "normal" | "uniform" | "triangular", ...} with optional
+# "min"/"max" clipping. discount_pct's mean defaults to the parameter set's discount_pct.
+DEFAULT_UNCERTAINTY: Dict[str, Dict[str, Any]] = {
+    "electricity_escalation_pct": {"dist": "normal", "mean": 2.5, "sd": 1.5},
+    "gas_escalation_pct": {"dist": "normal", "mean": 2.0, "sd": 2.5},
+    "discount_pct": {"dist": "normal", "mean": None, "sd": 1.0, "min": 0.0},
+    "cop_degradation_pct": {"dist": "uniform", "low": 0.0, "high": 2.0},
+    "carbon_price": {"dist": "triangular", "low": 0.0, "mode": 0.0, "high": 100.0, "min": 0.0},
+}
+_DIST_ARGS = {"fixed": ("value",), "normal": ("mean", "sd"), "uniform": ("low", "high"),
+              "triangular": ("low", "mode", "high")}
+
+
+def resolve_uncertainty(overrides: Optional[Mapping[str, Any]], discount_pct: float) -> Dict[str, Dict[str, Any]]:
+    """Defaults merged with per-input overrides; raises ValueError on an unusable spec."""
+    overrides = overrides or {}
+    unknown = sorted(set(overrides) - set(DEFAULT_UNCERTAINTY))
+    if unknown:
+        raise ValueError(f"unknown uncertainty input(s): {', '.join(unknown)}")
+    out: Dict[str, Dict[str, Any]] = {}
+    for name, default in DEFAULT_UNCERTAINTY.items():
+        spec = overrides.get(name)
+        if spec is None:
+            spec = dict(default)
+        elif isinstance(spec, (int, float)) and not isinstance(spec, bool):
+            spec = {"dist": "fixed", "value": spec}
+        elif not isinstance(spec, Mapping):
+            raise ValueError(f"{name}: expected a number or an object")
+        elif "dist" not in spec or spec["dist"] == default["dist"]:
+            spec = {**default, **spec}
+        else:
+            spec = dict(spec)
+        if spec.get("dist") not in _DIST_ARGS:
+            raise ValueError(f"{name}: dist must be one of {', '.join(_DIST_ARGS)}")
+        if name == "discount_pct" and spec.get("mean", 0.0) is None:
+            spec["mean"] = discount_pct
+        try:
+            spec = {"dist": spec["dist"], **{k: float(spec[k]) for k in _DIST_ARGS[spec["dist"]]},
+                    **{k: float(spec[k]) for k in ("min", "max") if spec.get(k) is not None}}
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"{name}: bad or missing {e}")
+        if spec.get("sd", 0.0) < 0 or spec.get("low", 0.0) > spec.get("high", spec.get("low", 0.0)):
+            raise ValueError(f"{name}: negative sd or low > high")
+        if spec["dist"] == "triangular" and not spec["low"] <= spec["mode"] <= spec["high"]:
+            raise ValueError(f"{name}: triangular needs low <= mode <= high")
+        out[name] = spec
+    return out
+
+
+def _sample(spec: Mapping[str, float], n: int, rng: np.random.Generator) -> np.ndarray:
+    dist = spec["dist"]
+    if dist == "fixed":
+        x = np.full(n, spec["value"])
+    elif dist == "normal":
+        x = rng.normal(spec["mean"], spec["sd"], n)
+    elif dist == "uniform":
+        x = rng.uniform(spec["low"], spec["high"], n)
+    elif spec["low"] == spec["high"]:
+        x = np.full(n, spec["low"])  # numpy rejects a zero-width triangle
+    else:
+        x = rng.triangular(spec["low"], spec["mode"], spec["high"], n)
+    if "min" in spec or "max" in spec:
+        x = np.clip(x, spec.get("min", -np.inf), spec.get("max", np.inf))
+    return x
+
+
+def simulate(hdd: Any, heating_design: Any, draws: int = 10000, seed: Optional[int] = None,
+             uncertainty: Optional[Mapping[str, Any]] = None, grid_kg_per_kwh: float = GRID_KG_PER_KWH,
+             **params: Any) -> Dict[str, Any]:
+    """TCO distribution per location and system for one parameter set (keys as in
+    hvac_cost_engine.compare; missing ones take the page's initial values)."""
+    p = {**PAGE_DEFAULTS, **params}
+    for key in ("install", "maint", "rebate"):
+        p[key] = {**PAGE_DEFAULTS[key], **(params.get(key) or {})}
+    hdd = np.atleast_1d(np.asarray(hdd, dtype=np.float64))
+    heating_design = np.atleast_1d(np.asarray(heating_design, dtype=np.float64))
+    costs = annual_costs(hdd, heating_design, p["electricity_rate"], p["gas_rate"], p["cop"],
+                         p["furnace_eff"], p["crossover"], p["auto_crossover"], p["heating_load"])
+    e = float(js_or(p["electricity_rate"], JS_ELECTRICITY_RATE))
+    g = float(js_or(p["gas_rate"], JS_GAS_RATE))
+    years = int(np.floor(max(1.0, min(float(MAX_TCO_YEARS), float(js_or(p["years"], JS_TCO_YEARS))))))
+    discount_pct = float(js_or(p["discount_pct"], 0.0))
+    spec = resolve_uncertainty(uncertainty, discount_pct)
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % (2 ** 32))
+    rng = np.random.default_rng(seed)
+    sampled = {name: _sample(s, draws, rng) for name, s in spec.items()}
+
+    # Per-draw discounted sums over the horizon, shared by every location and system
+    t = np.arange(years, dtype=np.float64)  # y - 1
+    r = sampled["discount_pct"] / 100
+    df = (1 + r)[:, None] ** -(t + 1)  # (draws, years)
+    kwh_growth = (1 - np.minimum(sampled["cop_degradation_pct"], 99.0) / 100)[:, None] ** -t
+    elec_price = (1 + sampled["electricity_escalation_pct"] / 100)[:, None] ** t
+    gas_price = (1 + sampled["gas_escalation_pct"] / 100)[:, None] ** t
+    s_df = df.sum(axis=1)
+    s_kwh = (kwh_growth * df).sum(axis=1)
+    s_elec = (elec_price * kwh_growth * df).sum(axis=1)
+    s_gas = (gas_price * df).sum(axis=1)
+    carbon = sampled["carbon_price"]
+
+    n = len(np.broadcast_arrays(hdd, heating_design)[0])
+    chunk = max(1, MAX_CELLS_PER_CHUNK // max(1, draws))
+    out = {k: {f"p{q}": np.empty(n) for q in PERCENTILES} for k in SYSTEMS}
+    for k in SYSTEMS:
+        out[k]["mean"] = np.empty(n)
+        out[k]["win_probability"] = np.empty(n)
+    for start in range(0, n, chunk):
+        sl = slice(start, min(n, start + chunk))
+        tco = []
+        for k in SYSTEMS:
+            kwh = np.broadcast_to(costs[k]["kwh"], (n,))[sl][:, None]
+            therms = np.broadcast_to(costs[k]["therms"], (n,))[sl][:, None]
+            upfront = max(0.0, float(p["install"][k]) - float(p["rebate"][k]))
+            tco.append(upfront + kwh * e * s_elec + therms * g * s_gas + float(p["maint"][k]) * s_df
+                       + carbon * (kwh * (grid_kg_per_kwh / 1000) * s_kwh + therms * GAS_T_PER_THERM * s_df))
+        stacked = np.stack(tco)  # (systems, locations, draws)
+        valid = np.isfinite(stacked).all(axis=(0, 2))
+        wins = np.argmin(np.where(np.isfinite(stacked), stacked, np.inf), axis=0)
+        pct = np.percentile(stacked, PERCENTILES, axis=2)  # (q, systems, locations)
+        for i, k in enumerate(SYSTEMS):
+            for j, q in enumerate(PERCENTILES):
+                out[k][f"p{q}"][sl] = pct[j, i]
+            out[k]["mean"][sl] = stacked[i].mean(axis=1)
+            out[k]["win_probability"][sl] = np.where(valid, (wins == i).mean(axis=1), np.nan)
+
+    deterministic = compute_tco({k: costs[k]["total"] for k in SYSTEMS}, p["years"], p["discount_pct"],
+                                p["install"], p["maint"], p["rebate"], p["carbon_price"],
+                                annual_tons(costs, grid_kg_per_kwh))
+    for k in SYSTEMS:
+        out[k]["deterministic"] = np.where(np.isfinite(costs[k]["total"]), deterministic[k], np.nan)
+    return {"draws": draws, "seed": seed, "years": years, "uncertainty": spec, "systems": out}
+
+
+def main(argv: List[str]) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--locations", required=True, help="CSV with id (or zip), hdd, heating columns")
+    ap.add_argument("--draws", type=int, default=10000)
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--out", default="-", help="output CSV (default stdout)")
+    for name in ("electricity_rate", "gas_rate", "cop", "furnace_eff", "years", "discount_pct"):
+        ap.add_argument("--" + name.replace("_", "-"), type=float, default=PAGE_DEFAULTS[name])
+    args = ap.parse_args(argv)
+
+    ids: List[str] = []
+    hdd: List[float] = []
+    heating: List[float] = []
+    with open(args.locations, "r", encoding="utf-8", newline="") as fh:
+        for row in csv.DictReader(fh):
+            row = {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
+            ids.append(row.get("id") or row.get("zip") or str(len(ids)))
+            hdd.append(float(row.get("hdd") or row.get("hdd65") or "nan"))
+            heating.append(float(row.get("heating") or row.get("heating_design") or "nan"))
+
+    t0 = time.perf_counter()
+    res = simulate(hdd, heating, draws=args.draws, seed=args.seed,
+                   **{k: getattr(args, k) for k in ("electricity_rate", "gas_rate", "cop", "furnace_eff",
+                                                    "years", "discount_pct")})
+    dt = time.perf_counter() - t0
+    stats = ("deterministic", "mean", *(f"p{q}" for q in PERCENTILES), "win_probability")
+    fh = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8", newline="")
+    try:
+        w = csv.writer(fh)
+        w.writerow(["id", "hdd", "heating", *(f"{k}_{s}" for k in SYSTEMS for s in stats)])
+        for i in range(len(ids)):
+            w.writerow([ids[i], hdd[i], heating[i],
+                        *(round(float(res["systems"][k][s][i]), 4 if s == "win_probability" else 2)
+                          for k in SYSTEMS for s in stats)])
+    finally:
+        if fh is not sys.stdout:
+            fh.close()
+    print(f"[monte-carlo] {len(ids):,} locations x {args.draws:,} draws (seed {res['seed']}) in "
+          f"{dt * 1000:.1f}ms ({dt * 1000 / max(1, len(ids)):.2f}ms per location)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Bulk geocoding check: batch, /compare and cache warm-up against a healthy but slow upstream.
+
+Starts a local Zippopotam-compatible stub that answers every ZIP after --delay-ms, points the
+API at it (no SQLite geocode cache, no hot reload) with a small synthetic station file in a
+temp directory, and sends ZIPs that have no centroid, so each one needs an upstream call.
+Many more ZIPs than ZIP_GEOCODER_MAX_CONCURRENCY slots are in flight at once; every item must
+still resolve (no geocoder_unavailable), nothing may be counted as rejected, and the stub must
+never see more concurrent calls than there are slots.
+
+Usage:
+  python scripts/test_batch_geocoder.py [--zips 300] [--delay-ms 50]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+FIRST_ZIP = 60000
+
+
+def write_stations(path: Path) -> None:
+    """One station per degree over the area the stub geocodes into."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as fh:
+        for lat in range(29, 47):
+            for lon in range(-121, -104):
+                fh.write(json.dumps({"station": f"TEST{lat:02d}{-lon:03d}", "name": f"TEST {lat} {lon}",
+                                     "lat": lat + 0.5, "lon": lon + 0.5, "hdd65": 4000.0 + 50 * (lat - 29),
+                                     "cdd65": 1500.0 - 40 * (lat - 29)}) + "\n")
+
+
+class _Stub(BaseHTTPRequestHandler):
+    delay = 0.05
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+    calls = 0
+
+    def do_GET(self) -> None:
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.calls += 1
+            cls.peak = max(cls.peak, cls.active)
+        time.sleep(cls.delay)
+        zipcode = self.path.rstrip("/").rsplit("/", 1)[-1]
+        n = int(zipcode) - FIRST_ZIP
+        body = json.dumps({"post code": zipcode, "places": [
+            {"latitude": str(30.0 + (n % 150) * 0.1), "longitude": str(-120.0 + (n // 150) * 0.5)}]}).encode()
+        with cls.lock:
+            cls.active -= 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def main(argv: List[str]) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--zips", type=int, default=300, help="uncached ZIPs per check")
+    ap.add_argument("--delay-ms", type=float, default=50.0, help="stub upstream latency")
+    args = ap.parse_args(argv)
+
+    os.chdir(tempfile.mkdtemp(prefix="noaa_batch_"))  # the service reads data/ relative to cwd
+    write_stations(Path("data/master_climate_index.min.jsonl"))
+    _Stub.delay = args.delay_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.update({
+        "ZIP_GEOCODER_URL": f"http://127.0.0.1:{server.server_port}/us/{{zip}}",
+        "ZIP_GEOCODE_CACHE_DB": "",
+        "DATASET_WATCH_SECONDS": "0",
+        "NOAA_API_ADMIN_TOKEN": "test",
+    })
+    os.environ.pop("CACHE_WARM_FILE", None)
+    from fastapi.testclient import TestClient
+    import scripts.noaa_api_service as svc
+
+    n = args.zips
+    batch = [f"{FIRST_ZIP + i:05d}" for i in range(n)]
+    compare = [{"zip": f"{FIRST_ZIP + n + i:05d}"} for i in range(n)]
+    warm = "\n".join(f"{FIRST_ZIP + 2 * n + i:05d}" for i in range(n))
+    failures: List[Dict[str, Any]] = []
+    results: Dict[str, Any] = {}
+    with TestClient(svc.app) as client:
+        deadline = time.time() + 120
+        while client.get("/ready").status_code != 200:
+            if time.time() > deadline:
+                raise SystemExit("dataset did not load")
+            time.sleep(0.05)
+
+        t0 = time.perf_counter()
+        r = client.post("/lookup/batch", json=batch)
+        recs = [json.loads(line) for line in r.text.splitlines() if line.strip()]
+        bad = [rec for rec in recs if "error" in rec]
+        results["batch"] = {"items": len(recs), "errors": len(bad), "seconds": round(time.perf_counter() - t0, 2)}
+        if r.status_code != 200 or len(recs) != n or bad:
+            failures.append({"check": "batch", "status": r.status_code, "first": bad[:3]})
+
+        t0 = time.perf_counter()
+        r = client.post("/compare", json={"locations": compare})
+        locs = r.json().get("locations", []) if r.status_code == 200 else []
+        bad = [loc for loc in locs if "error" in loc]
+        results["compare"] = {"items": len(locs), "errors": len(bad), "seconds": round(time.perf_counter() - t0, 2)}
+        if r.status_code != 200 or len(locs) != n or bad:
+            failures.append({"check": "compare", "status": r.status_code, "first": bad[:3] or r.text[:200]})
+
+        r = client.post("/admin/warm", content=warm, headers={"X-Admin-Token": "test"})
+        stats = r.json() if r.status_code == 200 else {}
+        results["warm"] = stats
+        if r.status_code != 200 or stats.get("warmed") != n:
+            failures.append({"check": "warm", "status": r.status_code, "stats": stats})
+
+        rejected = [line for line in client.get("/metrics").text.splitlines()
+                    if line.startswith("noaa_api_upstream_rejected_total{") and not line.endswith(" 0")]
+        if rejected:
+            failures.append({"check": "rejected_metric", "lines": rejected})
+    server.shutdown()
+
+    if _Stub.peak > svc.UPSTREAM_MAX_CONCURRENCY:
+        failures.append({"check": "upstream_concurrency", "peak": _Stub.peak,
+                         "limit": svc.UPSTREAM_MAX_CONCURRENCY})
+    print(json.dumps({"upstream_calls": _Stub.calls, "upstream_peak_concurrency": _Stub.peak,
+                      "slots": svc.UPSTREAM_MAX_CONCURRENCY, **results, "failures": failures}, indent=2))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
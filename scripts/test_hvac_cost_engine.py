@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Parity check: scripts/hvac_cost_engine.py against the cost functions in hvac_cost_comparison.html.
+
+Pulls calculateHVACCosts, calculateSystemCosts, calculateHeatPumpEfficiency,
+computeAutoCrossoverTemperature, computeTCO and npvOfSeries out of the page, runs them in node
+against a stub DOM for a few thousand random + edge-case scenarios, and requires the Python
+engine to produce the same float64 values. The one exception is anything discounted
+(npvOfSeries, TCO): V8's Math.pow and the C library's pow may differ in the last bit, so those
+must agree to 1e-12 relative and to the whole dollar the page displays.
+
+Usage:
+  python scripts/test_hvac_cost_engine.py [--scenarios 3000] [--seed 7]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scripts.hvac_cost_engine import (SYSTEMS, annual_costs, auto_crossover_temperature,  # noqa: E402
+                                      compute_tco, heat_pump_share, js_round, npv_of_series)
+
+PAGE = Path("hvac_cost_comparison.html")
+JS_FUNCTIONS = ("getEffectiveCOP", "parseMoney", "npvOfSeries", "computeCarbonCost", "computeTCO",
+                "calculateHVACCosts", "calculateSystemCosts", "calculateHeatPumpEfficiency",
+                "computeAutoCrossoverTemperature")
+TCO_ANCHOR = "// Update UI"
+POW_FIELDS = ("npv", ".tco")
+POW_RTOL = 1e-12
+
+HARNESS = r"""
+const fs = require('fs');
+const vm = require('vm');
+const [src, scenariosPath] = [fs.readFileSync(process.argv[2], 'utf8'), process.argv[3]];
+const scenarios = JSON.parse(fs.readFileSync(scenariosPath, 'utf8'));
+let inputs = {};
+const elements = {};
+const document = {
+  getElementById(id) {
+    if (!(id in inputs)) return { value: '', checked: false, style: {}, textContent: '' };
+    if (!elements[id]) elements[id] = { value: String(inputs[id]), checked: inputs[id] === true, style: {}, textContent: '' };
+    return elements[id];
+  },
+  querySelectorAll() { return []; },
+};
+const ctx = { document, console: { log() {}, warn() {} }, Math, Number, Object, Array, String, parseFloat,
+              effMode: 'COP', elecSourceBlock: null, climateData: null, houseLoads: null };
+['displayCostBars', 'displaySystemResults', 'showWinner', 'updateTechnicalDetails'].forEach(n => ctx[n] = () => {});
+vm.createContext(ctx);
+vm.runInContext(src, ctx);
+const out = scenarios.map(s => {
+  inputs = s.inputs;
+  for (const k of Object.keys(elements)) delete elements[k];
+  ctx.climateData = s.climate;
+  ctx.houseLoads = { heating: s.heating_load, cooling: 0 };
+  ctx.__tco = null;
+  const res = vm.runInContext('calculateHVACCosts()', ctx);
+  vm.runInContext('computeTCO(__res)', Object.assign(ctx, { __res: res }));
+  const sys = {};
+  for (const k of ['heatPump', 'furnace', 'hybrid']) {
+    sys[k] = { total: res[k].total, kwh: res[k].annualKWh, therms: res[k].annualTherms, tco: ctx.__tco[k] };
+  }
+  return {
+    crossover: (x => Number.isFinite(x) ? x : 35)(parseFloat(document.getElementById('crossoverTemp').value)),
+    systems: sys,
+    share: ctx.calculateHeatPumpEfficiency(s.climate.heating, s.direct.crossover, s.climate.hdd),
+    auto: ctx.computeAutoCrossoverTemperature(s.direct.e, s.direct.g, s.direct.fe, s.direct.cop),
+    npv: ctx.npvOfSeries(s.direct.years, s.direct.rate, s.direct.series),
+  };
+});
+process.stdout.write(JSON.stringify(out));
+"""
+
+
+def extract_function(html: str, name: str) -> str:
+    m = re.search(r"\bfunction " + name + r"\s*\(", html)
+    if not m:
+        raise RuntimeError(f"function {name} not found in {PAGE}")
+    i = html.index("{", m.end())
+    depth = 0
+    for j in range(i, len(html)):
+        if html[j] == "{":
+            depth += 1
+        elif html[j] == "}":
+            depth -= 1
+            if depth == 0:
+                return html[m.start():j + 1]
+    raise RuntimeError(f"unbalanced braces in {name}")
+
+
+def make_scenarios(n: int, seed: int) -> list:
+    rng = random.Random(seed)
+    pick = rng.choice
+    out = []
+    for i in range(n):
+        edge = i % 10 == 0  # every tenth scenario exercises the fallbacks and clamps
+        heating = pick([65, 70, 64.5, -40, 0]) if edge else rng.randint(-30, 60)
+        s = {
+            "climate": {"hdd": pick([0, -10, 1, 12000]) if edge else rng.randint(50, 11000),
+                        "cdd": rng.randint(0, 4500), "heating": heating, "cooling": rng.randint(75, 110)},
+            "heating_load": pick([0, 1, 120000]) if edge else rng.choice([30000, 45000, 50000, 60000, 80000]),
+            "inputs": {
+                "electricityRate": pick([0, 0.005, 0.6]) if edge else round(rng.uniform(0.06, 0.45), 3),
+                "gasRate": pick([0, 0.005, 4.0]) if edge else round(rng.uniform(0.6, 3.5), 2),
+                "heatPumpCOP": pick([0, 1.0, 2.5, 6]) if edge else round(rng.uniform(2.0, 4.5), 1),
+                "furnaceEfficiency": pick([0, 40, 120]) if edge else rng.randint(80, 98),
+                "crossoverTemp": pick(["", 65, 70, -50, 35.5]) if edge else rng.randint(20, 50),
+                "autoCrossover": rng.random() < 0.5,
+                "includeTCO": True,
+                "tcoYears": pick([0, 0.5, 31, 7.9]) if edge else rng.randint(1, 30),
+                "tcoDiscount": pick([0, -2, 25]) if edge else rng.choice([0, 2.5, 3, 5, 7]),
+                "tcoInstallHP": rng.randint(5000, 20000), "tcoInstallF": rng.randint(2500, 8000),
+                "tcoInstallH": rng.randint(8000, 25000),
+                "tcoMaintHP": rng.randint(0, 400), "tcoMaintF": rng.randint(0, 400),
+                "tcoMaintH": rng.randint(0, 500),
+                "tcoRebateHP": pick([0, 2000, 30000]), "tcoRebateF": pick([0, 500]),
+                "tcoRebateH": pick([0, 2000, 30000]),
+                "tcoCarbonPrice": pick([0, 50]),
+            },
+        }
+        s["direct"] = {
+            "crossover": rng.uniform(-20, 70), "e": s["inputs"]["electricityRate"], "g": s["inputs"]["gasRate"],
+            "fe": s["inputs"]["furnaceEfficiency"], "cop": s["inputs"]["heatPumpCOP"],
+            "years": rng.randint(1, 30), "rate": rng.choice([0, 3, 4.5, 12]),
+            "series": [round(rng.uniform(-500, 5000), 2) for _ in range(30)],
+        }
+        out.append(s)
+    return out
+
+
+def run_js(scenarios: list) -> list:
+    html = PAGE.read_text(encoding="utf-8", errors="replace")
+    src = "\n".join(extract_function(html, name) for name in JS_FUNCTIONS)
+    if TCO_ANCHOR not in src:
+        raise RuntimeError(f"computeTCO no longer contains {TCO_ANCHOR!r}; update the parity harness")
+    src = src.replace(TCO_ANCHOR, "__tco = tco; " + TCO_ANCHOR, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [Path(tmp, "harness.js"), Path(tmp, "page.js"), Path(tmp, "scenarios.json")]
+        for p, text in zip(paths, (HARNESS, src, json.dumps(scenarios))):
+            p.write_text(text, encoding="utf-8")
+        res = subprocess.run(["node", *map(str, paths)], capture_output=True, text=True, check=True)
+    return json.loads(res.stdout)
+
+
+def run_py(scenarios: list) -> list:
+    col = lambda f: np.array([f(s) for s in scenarios], dtype=np.float64)  # noqa: E731
+    num = lambda v: float(v) if v != "" else float("nan")  # noqa: E731
+    inp = lambda key: col(lambda s: num(s["inputs"][key]))  # noqa: E731
+    costs = annual_costs(
+        hdd=col(lambda s: s["climate"]["hdd"]), heating_design=col(lambda s: s["climate"]["heating"]),
+        electricity_rate=inp("electricityRate"), gas_rate=inp("gasRate"), cop=inp("heatPumpCOP"),
+        furnace_eff=inp("furnaceEfficiency"), crossover=inp("crossoverTemp"),
+        auto_crossover=np.array([s["inputs"]["autoCrossover"] for s in scenarios]),
+        heating_load=col(lambda s: s["heating_load"]),
+    )
+    per_sys = lambda prefix: {k: inp(prefix + suffix) for k, suffix in  # noqa: E731
+                              zip(SYSTEMS, ("HP", "F", "H"))}
+    tco = compute_tco({k: costs[k]["total"] for k in SYSTEMS}, inp("tcoYears"), inp("tcoDiscount"),
+                      per_sys("tcoInstall"), per_sys("tcoMaint"), per_sys("tcoRebate"),
+                      inp("tcoCarbonPrice"))
+    share = heat_pump_share(col(lambda s: s["climate"]["heating"]), col(lambda s: s["direct"]["crossover"]),
+                            col(lambda s: s["climate"]["hdd"]))
+    auto = auto_crossover_temperature(col(lambda s: s["direct"]["e"]), col(lambda s: s["direct"]["g"]),
+                                      col(lambda s: s["direct"]["fe"]), col(lambda s: s["direct"]["cop"]))
+    npv = npv_of_series(col(lambda s: s["direct"]["years"]), col(lambda s: s["direct"]["rate"]),
+                        np.array([s["direct"]["series"] for s in scenarios], dtype=np.float64))
+    out = []
+    for i in range(len(scenarios)):
+        out.append({
+            "crossover": costs["crossover"][i],
+            "systems": {k: {"total": costs[k]["total"][i], "kwh": costs[k]["kwh"][i],
+                            "therms": costs[k]["therms"][i], "tco": tco[k][i]} for k in SYSTEMS},
+            "share": share[i], "auto": auto[i], "npv": npv[i],
+        })
+    return out
+
+
+def _flat(rec: dict, prefix: str = ""):
+    for k, v in rec.items():
+        if isinstance(v, dict):
+            yield from _flat(v, f"{prefix}{k}.")
+        else:
+            yield prefix + k, v
+
+
+def same(field: str, js, py) -> bool:
+    py = float(py)
+    if js is None:  # JSON null: JS null/NaN/Infinity
+        return not math.isfinite(py)
+    js = float(js)
+    if js == py:
+        return True
+    if field.endswith(POW_FIELDS):
+        return abs(js - py) <= POW_RTOL * abs(js) and js_round(js) == js_round(py)
+    return False
+
+
+def main(argv) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scenarios", type=int, default=3000)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args(argv)
+
+    scenarios = make_scenarios(args.scenarios, args.seed)
+    js, py = run_js(scenarios), run_py(scenarios)
+    mismatches = []
+    for i, (a, b) in enumerate(zip(js, py)):
+        fa, fb = dict(_flat(a)), dict(_flat(b))
+        for key in fa:
+            if not same(key, fa[key], fb[key]):
+                mismatches.append({"scenario": i, "field": key, "js": fa[key], "py": float(fb[key])})
+    print(json.dumps({"scenarios": len(scenarios), "fields_checked": len(scenarios) * len(dict(_flat(js[0]))),
+                      "mismatches": len(mismatches), "first": mismatches[:5]}, indent=2))
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
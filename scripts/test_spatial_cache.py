@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Parity check: the API's quantized-cell nearest-station search against the KD-tree, with ties.
+
+Loads a synthetic station file through the service's own loader (in a temp directory) where
+many stations share coordinates, then for random queries (near stations, exactly on shared
+coordinates, across the antimeridian and anywhere on the globe) requires:
+  - the cell-cache search (_nearest_k) to return exactly ds.index.nearest_k's positions and km,
+    at each --cell-deg (by default the service's 0.01 and a coarse 0.25)
+  - ds.index.nearest / nearest_k to match a brute-force scan ranked by (squared chord, position)
+  - StationStore.nearest_many (the /lookup/batch path) to pick the same station as nearest()
+so /nearest, the precomputed ZIP table and batch lookups all break ties toward the lowest
+station position.
+
+Usage:
+  python scripts/test_spatial_cache.py [--stations 3000] [--queries 3000] [--cell-deg 0.01 0.25] [--seed 11]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from math import cos, radians, sin
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+KS = (1, 2, 3, 8)
+CELL_DEGS = (0.01, 0.25)  # SPATIAL_CACHE_CELL_DEG: the service default, and cells holding many stations
+KM_TOL = 1e-9
+
+
+def make_stations(n: int, rng: random.Random) -> List[Tuple[float, float]]:
+    pts = [(rng.uniform(24, 50), rng.uniform(-125, -66)) for _ in range(n // 2)]
+    pts += [(rng.uniform(50, 56), rng.choice([rng.uniform(172, 180), rng.uniform(-180, -165)]))
+            for _ in range(n // 10)]
+    pts += [(rng.uniform(-60, 75), rng.uniform(-180, 180)) for _ in range(n // 10)]
+    # Shared coordinates: co-located stations, including runs of several at one site
+    while len(pts) < n:
+        site = rng.choice(pts)
+        pts.extend([site] * rng.randint(1, 4))
+    pts = pts[:n]
+    rng.shuffle(pts)
+    return pts
+
+
+def write_stations(path: Path, pts: List[Tuple[float, float]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as fh:
+        for i, (lat, lon) in enumerate(pts):
+            fh.write(json.dumps({"station": f"TEST{i:06d}", "name": f"TEST {i}", "lat": lat, "lon": lon,
+                                 "hdd65": float(i % 9000), "cdd65": float(i % 3000)}) + "\n")
+
+
+def make_queries(n: int, pts: List[Tuple[float, float]], rng: random.Random) -> List[Tuple[float, float]]:
+    q: List[Tuple[float, float]] = []
+    while len(q) < n:
+        kind = len(q) % 4
+        lat, lon = rng.choice(pts)
+        if kind == 0:
+            q.append((lat, lon))  # exactly on a (possibly shared) station
+        elif kind == 1:
+            q.append((max(-90.0, min(90.0, lat + rng.uniform(-0.3, 0.3))),
+                      ((lon + rng.uniform(-0.3, 0.3) + 180.0) % 360.0) - 180.0))
+        elif kind == 2:
+            q.append((rng.uniform(50, 56), rng.choice([179.9, -179.9]) + rng.uniform(-0.1, 0.1)))
+        else:
+            q.append((rng.uniform(-90, 90), rng.uniform(-180, 180)))
+    return q
+
+
+def unit(lat: float, lon: float) -> Tuple[float, float, float]:
+    la, lo = radians(lat), radians(lon)
+    c = cos(la)
+    return (c * cos(lo), c * sin(lo), sin(la))
+
+
+def brute(lat: float, lon: float, xyz: List[Tuple[float, float, float]]) -> List[Tuple[float, int]]:
+    qx, qy, qz = unit(lat, lon)
+    out = []
+    for i, (px, py, pz) in enumerate(xyz):
+        dx = qx - px
+        dy = qy - py
+        dz = qz - pz
+        out.append((dx * dx + dy * dy + dz * dz, i))
+    out.sort()
+    return out
+
+
+def main(argv: List[str]) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--stations", type=int, default=3000)
+    ap.add_argument("--queries", type=int, default=3000)
+    ap.add_argument("--cell-deg", type=float, nargs="+", default=list(CELL_DEGS),
+                    help="SPATIAL_CACHE_CELL_DEG values to check the cell cache at")
+    ap.add_argument("--seed", type=int, default=11)
+    args = ap.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    pts = make_stations(args.stations, rng)
+    os.chdir(tempfile.mkdtemp(prefix="noaa_cells_"))  # the service reads data/ relative to cwd
+    write_stations(Path("data/master_climate_index.min.jsonl"), pts)
+    os.environ.update({"SPATIAL_CACHE_CELL_DEG": str(args.cell_deg[0]), "DATASET_WATCH_SECONDS": "0"})
+    import scripts.noaa_api_service as svc
+    from scripts.station_index import chord2_to_km
+
+    ds = svc._load_dataset()
+    xyz = [unit(lat, lon) for lat, lon in pts]
+    queries = make_queries(args.queries, pts, rng)
+    mismatches: List[Dict[str, Any]] = []
+    ties = 0
+    for lat, lon in queries:
+        scan = brute(lat, lon, xyz)
+        ties += scan[0][0] == scan[1][0]
+        for k in KS:
+            want = [(i, chord2_to_km(d2)) for d2, i in scan[:k]]
+            tree = ds.index.nearest_k(lat, lon, k)
+            if [i for i, _ in tree] != [i for i, _ in want] or any(
+                    abs(a - b) > KM_TOL for (_, a), (_, b) in zip(tree, want)):
+                mismatches.append({"query": [lat, lon], "check": f"tree_vs_scan:{k}", "tree": tree, "scan": want})
+        one = ds.index.nearest(lat, lon)
+        if one is None or one[0] != scan[0][1]:
+            mismatches.append({"query": [lat, lon], "check": "nearest_vs_scan", "tree": one, "scan": scan[0][::-1]})
+    cells_cached = {}
+    for deg in args.cell_deg:
+        # The module reads SPATIAL_CACHE_CELL_DEG once; cell keys don't carry the size, so start empty
+        svc.SPATIAL_CELL_DEG = deg
+        svc._CELL_CACHE.clear()
+        for lat, lon in queries:
+            for k in KS:
+                tree = ds.index.nearest_k(lat, lon, k)
+                cells = svc._nearest_k(ds, lat, lon, k)
+                if cells != tree:
+                    mismatches.append({"query": [lat, lon], "check": f"cells_vs_tree:{deg}:{k}", "cells": cells,
+                                       "tree": tree})
+        cells_cached[str(deg)] = len(svc._CELL_CACHE.items())
+    batch = ds.stations.nearest_many(queries)
+    for (lat, lon), hit in zip(queries, batch):
+        one = ds.index.nearest(lat, lon)
+        if hit is None or one is None or hit[0] != one[0] or abs(hit[1] - one[1]) > 1e-6:
+            mismatches.append({"query": [lat, lon], "check": "nearest_many_vs_tree", "batch": hit, "tree": one})
+    print(json.dumps({"stations": len(pts), "queries": len(queries), "tied_queries": ties,
+                      "cells_cached": cells_cached, "mismatches": len(mismatches),
+                      "first": mismatches[:5]}, indent=2))
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
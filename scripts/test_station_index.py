@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Parity check: StationKDTree against a brute-force haversine scan (the original linear search).
+
+Builds a tree over random stations (plus clusters straddling the antimeridian and around both
+poles, and points exactly on +/-180 and +/-90), then for random queries requires nearest(),
+nearest_k() and within_km() to return the same stations and distances as scanning every
+station with the haversine formula. Distances must agree to 1e-6 km; where two stations are
+that close to a tie the order between them is not checked.
+
+Usage:
+  python scripts/test_station_index.py [--stations 5000] [--queries 2000] [--seed 7]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+from math import atan2, cos, radians, sin, sqrt
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scripts.station_index import EARTH_KM, StationKDTree  # noqa: E402
+
+KM_TOL = 1e-6
+KS = (1, 2, 5, 17)
+
+
+def hav(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
+    return EARTH_KM * 2 * atan2(sqrt(a), sqrt(max(0.0, 1 - a)))
+
+
+def make_points(n: int, rng: random.Random) -> List[Tuple[float, float]]:
+    pts = [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(n // 2)]
+    pts += [(rng.uniform(40, 60), rng.choice([rng.uniform(170, 180), rng.uniform(-180, -170)]))
+            for _ in range(n // 6)]  # Aleutians-style cluster across the antimeridian
+    pts += [(rng.choice([1, -1]) * rng.uniform(80, 90), rng.uniform(-180, 180)) for _ in range(n // 6)]
+    pts += [(rng.uniform(24, 50), rng.uniform(-125, -66)) for _ in range(n - len(pts) - 6)]
+    pts += [(90.0, 0.0), (-90.0, 123.0), (0.0, 180.0), (0.0, -180.0), (52.0, 179.999), (52.0, -179.999)]
+    return pts
+
+
+def make_queries(n: int, rng: random.Random) -> List[Tuple[float, float]]:
+    q = [(90.0, 45.0), (-90.0, -45.0), (52.0, 180.0), (52.0, -180.0), (0.0, 0.0)]
+    while len(q) < n:
+        kind = len(q) % 4
+        if kind == 0:
+            q.append((rng.uniform(-90, 90), rng.uniform(-180, 180)))
+        elif kind == 1:
+            q.append((rng.uniform(45, 55), rng.choice([179.5, -179.5]) + rng.uniform(-0.5, 0.5)))
+        elif kind == 2:
+            q.append((rng.choice([1, -1]) * rng.uniform(85, 90), rng.uniform(-180, 180)))
+        else:
+            q.append((rng.uniform(24, 50), rng.uniform(-125, -66)))
+    return q
+
+
+def same_ranking(got: List[Tuple[int, float]], want: List[Tuple[int, float]], n: int) -> bool:
+    """got vs the first n of the full brute-force ranking `want`."""
+    if len(got) != min(n, len(want)):
+        return False
+    for (_gp, gkm), (_wp, wkm) in zip(got, want):
+        if abs(gkm - wkm) > KM_TOL:
+            return False
+    # ids must match wherever the brute-force ranking has no near-tie around them
+    for i, (gp, _gkm) in enumerate(got):
+        wp, wkm = want[i]
+        tied = any(abs(want[j][1] - wkm) <= KM_TOL for j in (i - 1, i + 1) if 0 <= j < len(want))
+        if gp != wp and not tied:
+            return False
+    return True
+
+
+def main(argv: List[str]) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--stations", type=int, default=5000)
+    ap.add_argument("--queries", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    pts = make_points(args.stations, rng)
+    tree = StationKDTree(pts)
+    mismatches = []
+    for lat, lon in make_queries(args.queries, rng):
+        scan = sorted(((hav(lat, lon, plat, plon), i) for i, (plat, plon) in enumerate(pts)))
+        want = [(i, km) for km, i in scan]
+        checks = [("nearest", [tree.nearest(lat, lon)], 1)]
+        checks += [(f"nearest_k:{k}", tree.nearest_k(lat, lon, k), k) for k in KS]
+        radius = want[min(len(want), 20) - 1][1] + 1.0
+        checks.append(("within_km", tree.within_km(lat, lon, radius), sum(1 for w in want if w[1] <= radius)))
+        for name, got, n in checks:
+            if not same_ranking(got, want, n):
+                mismatches.append({"query": [lat, lon], "check": name, "tree": got[:3], "scan": want[:3]})
+    print(json.dumps({"stations": len(pts), "queries": args.queries, "mismatches": len(mismatches),
+                      "first": mismatches[:5]}, indent=2))
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])